@@ -0,0 +1,83 @@
+"""
+Load benchmark: pd.read_excel vs the streaming openpyxl reader
+
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --sizes 10000 100000 --blank-rows 5000
+
+Each case writes a synthetic workbook and loads all three sheets with one
+reader in a fresh process, so peak RSS (ru_maxrss) covers that load alone.
+"baseline MB" is the process after imports; "peak MB" is the high-water mark.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from waza_dashboard.load import parse_sheet, read_sheet, read_sheet_pandas
+from waza_dashboard.schema import SHEETS
+from synthetic import make_club, write_workbook
+
+READERS = {"read_excel": read_sheet_pandas, "streaming": read_sheet}
+
+
+def _rss_mb():
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+
+def load_once(reader, path):
+    """Load every sheet of path with one reader; runs in the child process"""
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    rows = {}
+    for dataset in SHEETS:
+        df, _ = parse_sheet(path, dataset, READERS[reader])
+        rows[dataset] = len(df)
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "baseline_mb": baseline, "peak_mb": _rss_mb(), "rows": rows}
+
+
+def run_case(reader, path):
+    out = subprocess.run([sys.executable, __file__, "--child", reader, path],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000],
+                        help="numbers of result rows to benchmark")
+    parser.add_argument("--blank-rows", type=int, default=2000,
+                        help="formatted empty rows under each sheet's data")
+    parser.add_argument("--child", nargs=2, metavar=("READER", "WORKBOOK"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(load_once(*args.child)))
+        return
+
+    print(f"{'rows':>10}  {'reader':<11} {'time (s)':>9} {'baseline MB':>12} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "club.xlsx")
+        for n in args.sizes:
+            write_workbook(make_club(n), path, blank_rows=args.blank_rows)
+            counts = {}
+            for reader in READERS:
+                case = run_case(reader, path)
+                counts[reader] = case["rows"]
+                print(f"{n:>10}  {reader:<11} {case['seconds']:>9.2f} {case['baseline_mb']:>12.1f} "
+                      f"{case['peak_mb']:>9.1f}")
+            if counts["read_excel"] != counts["streaming"]:
+                print(f"Row counts differ: {counts}")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
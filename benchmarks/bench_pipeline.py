@@ -0,0 +1,255 @@
+"""
+End-to-end benchmark: synthetic workbook -> build_dashboard -> index.html
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes 1000 100000 --mode sharded
+
+For each size a synthetic club workbook is written, then one build runs in a
+fresh process (so peak RSS covers that build and its parse workers). Each
+run records build wall time, peak RSS, the per-stage profile, output size and
+the cost of parsing the page's embedded data: JSON.parse time per data
+section plus V8 compile time of the inline scripts, measured with node when
+it is installed (Python's json.loads otherwise).
+
+Every run is appended to pipeline_results.jsonl (next to this script) with
+the git commit and generator hash, and compared with the latest earlier run
+of the same size from a different version.
+
+    python benchmarks/bench_pipeline.py --sizes 1000000 --low-memory --max-rss 500
+
+--low-memory builds with the Results sheet read in chunks (see
+waza_dashboard.low_memory); --max-rss exits non-zero if a build's
+peak RSS goes over the given number of MB.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import waza_dashboard as wd
+from waza_dashboard import templates
+from waza_dashboard.cache import _generator_version
+from waza_dashboard.low_memory import LOW_MEMORY_CHUNK_ROWS
+from waza_dashboard.shards import SHARD_DIR
+from synthetic import make_club, write_workbook
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline_results.jsonl")
+
+# Embedded data in the page: (name, text before it, text after it)
+DATA_MARKERS = [
+    ("search index", templates.SCRIPT_OPEN, templates.TABLE_ROWS_OPEN),
+    ("athlete rows", templates.TABLE_ROWS_OPEN, templates.TABLE_ROWS_NEXT),
+    ("meet rows", templates.TABLE_ROWS_NEXT, templates.TABLE_ROWS_CLOSE),
+    ("results", templates.INLINE_DATA_OPEN, templates.PR_INDEX_OPEN),
+    ("pr index", templates.PR_INDEX_OPEN, templates.PROGRESSION_OPEN_JS),
+    ("progression", templates.PROGRESSION_OPEN_JS, templates.RANKINGS_OPEN_JS),
+    ("rankings", templates.RANKINGS_OPEN_JS, templates.MEET_INDEX_OPEN_JS),
+    ("meet index", templates.MEET_INDEX_OPEN_JS, templates.INLINE_DATA_CLOSE),
+    ("shard manifest", templates.SHARDED_DATA_OPEN, templates.SHARDED_DATA_CLOSE),
+]
+
+# Median JSON.parse time per data section and V8 compile time of the inline
+# scripts (a comment makes each compile miss V8's cache)
+NODE_PARSE = r"""
+const fs = require('fs');
+const vm = require('vm');
+const [page, markersFile, repeats] = process.argv.slice(1);
+const html = fs.readFileSync(page, 'utf8');
+function median(fn) {
+    const times = [];
+    for (let i = 0; i < Number(repeats); i++) {
+        const start = process.hrtime.bigint();
+        fn(i);
+        times.push(Number(process.hrtime.bigint() - start) / 1e6);
+    }
+    return times.sort((a, b) => a - b)[times.length >> 1];
+}
+const scripts = [...html.matchAll(/<script>([\s\S]*?)<\/script>/g)].map(m => m[1]).join('\n;\n');
+const out = { parser: 'node ' + process.version, compile_ms: median(i => new vm.Script(scripts + '\n//' + i)), sections_ms: {} };
+for (const [name, before, after] of JSON.parse(fs.readFileSync(markersFile, 'utf8'))) {
+    const start = html.indexOf(before);
+    const end = start < 0 ? -1 : html.indexOf(after, start + before.length);
+    if (end >= 0) {
+        const text = html.slice(start + before.length, end);
+        out.sections_ms[name] = median(() => JSON.parse(text));
+    }
+}
+console.log(JSON.stringify(out));
+"""
+
+
+def _peak_rss_mb(who):
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+
+def build_once(workbook, output_file, mode, jobs, chunk_rows=None):
+    """One build with the profiler on; runs in the child process"""
+    wd.PROFILER.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        wd.build_dashboard(workbook, output_file, mode=mode, jobs=jobs, chunk_rows=chunk_rows)
+    seconds = time.perf_counter() - start
+    return {
+        "wall_s": seconds,
+        "peak_rss_mb": max(_peak_rss_mb(resource.RUSAGE_SELF), _peak_rss_mb(resource.RUSAGE_CHILDREN)),
+        "stages": {name: round(entry["seconds"], 4) for name, entry in wd.PROFILER.stages.items()},
+    }
+
+
+def parse_cost(page, repeats=5):
+    """Parse cost of the page's embedded data (see NODE_PARSE); falls back to Python if node fails"""
+    node = shutil.which("node")
+    if node:
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(DATA_MARKERS, f)
+        try:
+            # Pages of a million results need more than node's default heap
+            out = subprocess.run([node, "--max-old-space-size=8192", "-e", NODE_PARSE, page, f.name, str(repeats)],
+                                 check=True, capture_output=True, text=True).stdout
+            return json.loads(out)
+        except subprocess.CalledProcessError as err:
+            print(f"node could not parse {page} ({err.returncode}); using Python's json instead")
+        finally:
+            os.remove(f.name)
+
+    with open(page, encoding='utf-8') as f:
+        html = f.read()
+    sections = {}
+    for name, before, after in DATA_MARKERS:
+        start = html.find(before)
+        end = html.find(after, start + len(before)) if start >= 0 else -1
+        if end >= 0:
+            text = html[start + len(before):end]
+            times = []
+            for _ in range(repeats):
+                t = time.perf_counter()
+                json.loads(text)
+                times.append((time.perf_counter() - t) * 1000)
+            sections[name] = sorted(times)[len(times) // 2]
+    return {"parser": "python json", "compile_ms": None, "sections_ms": sections}
+
+
+def _folder_bytes(folder):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(folder) for name in names)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_run(record, path=RESULTS_FILE):
+    """Latest earlier record of the same size and mode (and low-memory setting) from a different generator version"""
+    if not os.path.exists(path):
+        return None
+    match = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            old = json.loads(line)
+            if (old["rows"], old["mode"], old.get("low_memory")) \
+                    == (record["rows"], record["mode"], record["low_memory"]) \
+                    and old["generator"] != record["generator"]:
+                match = old
+    return match
+
+
+def _change(new, old):
+    return f"{(new - old) / old:+.0%}" if old else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000, 1_000_000],
+                        help="numbers of result rows to benchmark")
+    parser.add_argument("--mode", choices=sorted(wd.PAGE_SECTIONS), default="single")
+    parser.add_argument("--jobs", type=int, default=None, help="passed to the build (default: one per CPU)")
+    parser.add_argument("--low-memory", nargs="?", type=int, const=LOW_MEMORY_CHUNK_ROWS, metavar="ROWS",
+                        help="build with the Results sheet read ROWS rows at a time (as --low-memory does)")
+    parser.add_argument("--max-rss", type=float, metavar="MB",
+                        help="exit non-zero if a build's peak RSS is above this many MB")
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSON-lines file the runs are appended to")
+    parser.add_argument("--child", nargs=5, metavar=("WORKBOOK", "OUTPUT", "MODE", "JOBS", "CHUNK_ROWS"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        workbook, output_file, mode, jobs, chunk_rows = args.child
+        print(json.dumps(build_once(workbook, output_file, mode, int(jobs) or None, int(chunk_rows) or None)))
+        return
+
+    commit = _git_commit()
+    generator = _generator_version()[:12]
+    print(f"{'rows':>9} {'build s':>8} {'peak MB':>8} {'page KB':>9} {'data KB':>9} "
+          f"{'parse ms':>9} {'compile ms':>10}")
+    over_limit = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            frames = make_club(n)
+            workbook = os.path.join(tmp, f"club-{n}.xlsx")
+            write_workbook(frames, workbook)
+            output_file = os.path.join(tmp, f"site-{n}", "index.html")
+            os.makedirs(os.path.dirname(output_file))
+
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", workbook, output_file,
+                                  args.mode, str(args.jobs or 0), str(args.low_memory or 0)],
+                                 check=True, capture_output=True, text=True).stdout
+            record = {
+                "date": datetime.now().isoformat(timespec='seconds'),
+                "commit": commit,
+                "generator": generator,
+                "mode": args.mode,
+                "low_memory": args.low_memory,
+                "rows": n,
+                "athletes": len(frames["athletes"]),
+                "meets": len(frames["meets"]),
+                **json.loads(out.splitlines()[-1]),
+                "page_bytes": os.path.getsize(output_file),
+                "shard_bytes": _folder_bytes(os.path.join(os.path.dirname(output_file), SHARD_DIR)),
+                "parse": parse_cost(output_file),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+            }
+            parse_ms = sum(record["parse"]["sections_ms"].values())
+            compile_ms = record["parse"]["compile_ms"]
+            print(f"{n:>9} {record['wall_s']:>8.2f} {record['peak_rss_mb']:>8.0f} "
+                  f"{record['page_bytes'] / 1024:>9.1f} {record['shard_bytes'] / 1024:>9.1f} {parse_ms:>9.1f} "
+                  f"{'-' if compile_ms is None else f'{compile_ms:.1f}':>10}")
+
+            old = previous_run(record, args.results)
+            if old:
+                print(f"{'':>9} vs {old['commit'] or old['generator']}: build {_change(record['wall_s'], old['wall_s'])}, "
+                      f"peak {_change(record['peak_rss_mb'], old['peak_rss_mb'])}, "
+                      f"page {_change(record['page_bytes'], old['page_bytes'])}")
+            with open(args.results, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+            if args.max_rss is not None and record["peak_rss_mb"] > args.max_rss:
+                over_limit.append(f"{n} rows: peak RSS {record['peak_rss_mb']:.0f} MB > {args.max_rss:.0f} MB")
+
+            shutil.rmtree(os.path.dirname(output_file))
+            os.remove(workbook)
+    print(f"Results appended to {args.results}")
+    if over_limit:
+        sys.exit("Memory ceiling exceeded:\n  " + "\n  ".join(over_limit))
+
+
+if __name__ == "__main__":
+    main()
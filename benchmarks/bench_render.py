@@ -0,0 +1,74 @@
+"""
+Render benchmark: the page (and shards) of each output mode
+
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --sizes 10000 100000 --modes single sharded
+
+Each case renders every section of the mode from already loaded frames and
+writes the page (plus its shards and assets) into a temporary folder, the
+part of a build that comes after load_data(). Time is measured on a plain
+run; peak memory is the tracemalloc peak of a second, traced run. Output is
+the size of everything written. The build's progress lines are not shown.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import waza_dashboard as wd
+from waza_dashboard.page import write_page
+from synthetic import make_club
+
+
+def render(frames, mode, output_file):
+    """Render and write the page of mode, as build_dashboard does after loading"""
+    output_dir = os.path.dirname(output_file)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sections = wd.render_sections(frames, set(wd.PAGE_SECTIONS[mode]), output_dir, mode)
+        write_page(output_file, sections, datetime(2025, 1, 1), mode)
+
+
+def folder_size(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(folder) for name in names)
+
+
+def run_case(mode, frames, folder):
+    output_file = os.path.join(folder, "index.html")
+
+    start = time.perf_counter()
+    render(frames, mode, output_file)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    render(frames, mode, output_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, folder_size(folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="numbers of result rows to benchmark")
+    parser.add_argument("--modes", nargs="+", choices=list(wd.PAGE_SECTIONS), default=list(wd.PAGE_SECTIONS),
+                        help="output modes to render (default: all)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'mode':<8} {'time (s)':>9} {'peak MB':>9} {'output MB':>10}")
+    for n in args.sizes:
+        frames = make_club(n)
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as folder:
+                seconds, peak, size = run_case(mode, frames, folder)
+            print(f"{n:>10}  {mode:<8} {seconds:>9.2f} {peak / 1e6:>9.1f} {size / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
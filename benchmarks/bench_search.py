@@ -0,0 +1,115 @@
+"""
+Search index benchmark and consistency check
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --sizes 1000 100000
+
+For each size the results table of a synthetic club is indexed with
+waza_dashboard.build_search_index(). The script reports build time,
+index size and query time against a substring scan of the displayed rows
+(what the page does without an index), and exits with status 1 if any
+representative query returns different rows than the substring scan. The
+queries include parts of words ("arroll"), result values and the hidden
+Season column, which must find nothing the table does not show.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import waza_dashboard as wd
+from waza_dashboard.results import numeric_results
+from waza_dashboard.search import _day_text, _result_text
+from synthetic import make_club
+
+
+def display_rows(results_with_dates):
+    """Upper-cased text of each Results table row as the page shows it"""
+    columns = [
+        results_with_dates['ATHLETE'].astype(str),
+        results_with_dates['EVENT'].astype(str),
+        _result_text(numeric_results(results_with_dates)).fillna(''),
+        results_with_dates['MEET'].fillna('').astype(str),
+        _day_text(results_with_dates['DATE']).fillna(''),
+    ]
+    text = columns[0]
+    for column in columns[1:]:
+        text = text + " " + column
+    return text.str.upper().tolist()
+
+
+def representative_queries(frames, results_with_dates):
+    athlete = frames["athletes"]['Athlete'].iloc[3]
+    meet = frames["meets"].sort_values('DATE')['Meet'].iloc[-1]
+    day = frames["meets"]['DATE'].iloc[0]
+    result = _result_text(numeric_results(results_with_dates)).dropna().iloc[0]
+    return [
+        athlete,
+        athlete.split()[-1],
+        athlete.split()[-1][1:],
+        athlete.lower(),
+        f"{athlete.split()[0]} ",
+        result,
+        result[1:],
+        f"{athlete.split()[-1]} 800",
+        "Indoor",
+        "800",
+        "hurdles",
+        "60m hurdles",
+        "javelin",
+        meet,
+        day.strftime('%Y'),
+        day.strftime('%Y-%m'),
+        day.strftime('%Y-%m-%d'),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="numbers of result rows to benchmark")
+    args = parser.parse_args()
+
+    mismatches = 0
+    print(f"{'rows':>10} {'build (s)':>10} {'index MB':>9} {'text MB':>8} {'index ms/q':>11} {'scan ms/q':>10}")
+    for n in args.sizes:
+        frames = make_club(n)
+        meets_df = frames["meets"].sort_values('DATE', ascending=False, na_position='last')
+        results = wd.merge_results(frames["results"], meets_df)
+        rows = display_rows(results)
+
+        start = time.perf_counter()
+        index = wd.build_search_index(wd.table_search_fields("resultsTable", results))
+        build = time.perf_counter() - start
+        index_size = len(json.dumps(index, separators=(',', ':')))
+        text_size = sum(len(row) + 1 for row in rows)
+
+        queries = representative_queries(frames, results)
+        index_time = scan_time = 0.0
+        for query in queries:
+            start = time.perf_counter()
+            found = wd.search_rows(index, query, lambda row, rows=rows: rows[row])
+            index_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            needle = query.strip().upper()
+            expected = [i for i, text in enumerate(rows) if needle in text]
+            scan_time += time.perf_counter() - start
+
+            if found != expected:
+                mismatches += 1
+                print(f"MISMATCH at {n} rows for {query!r}: index {len(found)} rows, substring {len(expected)} rows")
+
+        print(f"{n:>10} {build:>10.2f} {index_size / 1e6:>9.1f} {text_size / 1e6:>8.1f} "
+              f"{index_time * 1000 / len(queries):>11.1f} {scan_time * 1000 / len(queries):>10.1f}")
+
+    if mismatches:
+        sys.exit(1)
+    print("All representative queries match the substring search")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Synthetic club data for benchmarks
+
+Frames have the same columns as the cleaned sheets that
+waza_dashboard.load_data() returns; write_workbook() saves them as an
+.xlsx laid out like the real one. Names look like the real workbook's
+("Zoe Ghanbari", "LAB 2 - 2024") so search benchmarks see realistic tokens.
+"""
+import string
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
+
+# Event: (relative frequency, best mark, weakest mark) - seconds for running
+# events, meters for field events. Sprints are the most common entries.
+EVENT_MARKS = {
+    '60': (8, 7.4, 11.5), '100': (10, 11.8, 19.0), '200': (10, 24.0, 38.0), '400': (8, 55.0, 95.0),
+    '800': (7, 125.0, 230.0), '1500': (4, 260.0, 460.0), '1600': (4, 280.0, 500.0),
+    '3000': (2, 580.0, 1050.0), '60m hurdles': (3, 9.0, 14.5), '80m hurdles': (2, 12.5, 20.0),
+    'shot': (4, 13.0, 4.0), 'javelin': (2, 45.0, 10.0), 'longJump': (5, 6.3, 2.5), 'hiJump': (3, 1.85, 0.95),
+}
+EVENTS = list(EVENT_MARKS)
+
+FIRST_NAMES = ['Aria', 'Elijah', 'Mateo', 'Zoe', 'Isla', 'Luke', 'Micah', 'Silas', 'Nolan', 'Josh',
+               'Yash', 'Lilianna', 'Giacomo', 'Aubrey', 'Brennan', 'Jaxon', 'Anthony', 'Michael',
+               'Maya', 'Ethan', 'Grace', 'Owen', 'Nora', 'Caleb', 'Ruby', 'Levi', 'Hazel', 'Ezra']
+LAST_NAMES = ['Simmons', 'Pearse', 'Alegre', 'Ghanbari', 'Krips', 'Carroll', 'Prevost', 'Parzen',
+              'Jagtap', 'Molinari', 'Kirby', 'Reeder', 'Gatt', 'Shaieb', 'Novak', 'Okafor', 'Lindqvist',
+              'Moreau', 'Tanaka', 'Whitfield', 'Brennan', 'Castillo', 'Dvorak', 'Haddad']
+MEET_SERIES = ['LAB', 'Lab Holiday Invite', 'Motor City Classic', 'EITI Invitational', 'Mighty Mile',
+               'AAU Region 12 Qualifier', 'Junior Olympic Games', 'D Hall', 'Coach P Summer Games']
+
+
+def _athlete_names(n):
+    # First x last x middle initial gives ~17k distinct names; beyond that a
+    # second initial keeps them unique without putting digits in names
+    names = [f"{first} {middle}. {last}"
+             for middle in string.ascii_uppercase for last in LAST_NAMES for first in FIRST_NAMES]
+    if n > len(names):
+        names = [f"{first} {a}.{b}. {last}" for a in string.ascii_uppercase for b in string.ascii_uppercase
+                 for last in LAST_NAMES for first in FIRST_NAMES]
+    return names[:n]
+
+
+def _meet_dates(rng, n_meets):
+    """Meet days over ten seasons: indoor meets December-March, outdoor April-July, mostly weekends"""
+    years = rng.integers(2015, 2025, n_meets)
+    indoor = rng.random(n_meets) < 0.4
+    # Days into the season; indoor seasons start on December 1st of the year before
+    start = pd.to_datetime(np.where(indoor, years - 1, years).astype(str) + np.where(indoor, '-12-01', '-04-01'))
+    dates = start + pd.to_timedelta(rng.integers(0, 120, n_meets), unit='D')
+    saturday = dates + pd.to_timedelta((5 - dates.dayofweek) % 7, unit='D')
+    dates = dates.where(rng.random(n_meets) < 0.2, saturday)
+    return dates, np.where(indoor, 'Indoor', 'Outdoor')
+
+
+def make_club(n_results, n_athletes=None, n_meets=None, seed=0, time_cells=0.05):
+    """
+    Return {"athletes", "meets", "results"} DataFrames with n_results results.
+
+    Each athlete competes over a few consecutive seasons and improves over
+    them; events follow EVENT_MARKS' frequencies and mark ranges. A
+    time_cells fraction of results over a minute are Excel-style time values
+    (datetime.time), as in the real workbook.
+    """
+    rng = np.random.default_rng(seed)
+    n_athletes = n_athletes or max(10, n_results // 25)
+    n_meets = n_meets or max(5, n_results // 200)
+
+    athletes = pd.DataFrame({
+        'Athlete': _athlete_names(n_athletes),
+        'BirthDate': pd.Timestamp('2005-01-01') + pd.to_timedelta(rng.integers(0, 15 * 365, n_athletes), unit='D'),
+        'Gender': rng.choice(['F', 'M'], n_athletes),
+    })
+
+    meet_dates, seasons = _meet_dates(rng, n_meets)
+    series = pd.Series(np.array(MEET_SERIES)[rng.integers(0, len(MEET_SERIES), n_meets)])
+    years = pd.Series(meet_dates.year)
+    # "LAB 3 - 2021": meets of a series are numbered within each year
+    number = series.groupby([series, years]).cumcount() + 1
+    meets = pd.DataFrame({
+        'Meet': series + " " + number.astype(str) + " - " + years.astype(str),
+        'DATE': meet_dates,
+        'Track Size': seasons,
+    })
+    meets['Season'] = meets['Track Size']
+
+    # Athletes enter at some meet (in date order) and stay for a span of meets
+    by_date = np.argsort(meet_dates.to_numpy(), kind='stable')
+    span = np.maximum(1, (n_meets * rng.uniform(0.15, 0.5, n_athletes)).astype(int))
+    first = (rng.random(n_athletes) * (n_meets - span + 1)).astype(int)
+    athlete = rng.integers(0, n_athletes, n_results)
+    progress = rng.random(n_results)
+    meet = by_date[first[athlete] + (progress * span[athlete]).astype(int)]
+
+    weights = np.array([EVENT_MARKS[e][0] for e in EVENTS], dtype=float)
+    event = rng.choice(len(EVENTS), n_results, p=weights / weights.sum())
+    best = np.array([EVENT_MARKS[e][1] for e in EVENTS])[event]
+    weakest = np.array([EVENT_MARKS[e][2] for e in EVENTS])[event]
+    # 0 = weakest mark, 1 = best; talent plus improvement over the athlete's span
+    quality = np.clip(rng.beta(2, 3, n_athletes)[athlete] + 0.3 * progress + rng.normal(0, 0.05, n_results), 0, 1)
+    marks = pd.Series(np.round(weakest + (best - weakest) * quality, 2), dtype=object)
+
+    as_time = (marks.astype(float) >= 60) & (rng.random(n_results) < time_cells)
+    marks[as_time] = [(datetime.min + timedelta(seconds=v)).time() for v in marks[as_time]]
+
+    results = pd.DataFrame({
+        'ATHLETE': athletes['Athlete'].to_numpy()[athlete],
+        'MEET': meets['Meet'].to_numpy()[meet],
+        'EVENT': np.array(EVENTS)[event],
+        'Result (Seconds / Meters)': marks,
+    })
+    return {"athletes": athletes, "meets": meets, "results": results}
+
+
+def write_workbook(frames, path, blank_rows=0):
+    """
+    Save make_club() frames as Athletes/Events/Results sheets.
+
+    blank_rows formatted-but-empty rows are added under each sheet's data, as
+    hand-edited workbooks often have.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    fill = PatternFill("solid", fgColor="FFFFCC")
+    for sheet, dataset in (("Athletes", "athletes"), ("Events", "meets"), ("Results", "results")):
+        df = frames[dataset]
+        ws = wb.create_sheet(sheet)
+        ws.append(list(df.columns))
+        for row in df.itertuples(index=False):
+            ws.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row])
+        for _ in range(blank_rows):
+            empty = []
+            for _ in df.columns:
+                cell = WriteOnlyCell(ws)
+                cell.fill = fill
+                empty.append(cell)
+            ws.append(empty)
+    wb.save(path)
@@ -1,590 +1,162 @@
 """
 Generate a static HTML dashboard from Excel data
 Run this whenever you update the Excel file
-"""
-import openpyxl
-import pandas as pd
-from datetime import datetime
-import json
-
-# Load Excel file
-print("Loading Excel data...")
-excel_file = "data to add.xlsx"
-
-# Read sheets
-athletes_df = pd.read_excel(excel_file, sheet_name="Athletes")
-meets_df = pd.read_excel(excel_file, sheet_name="Events")  # Actually contains meets
-results_df = pd.read_excel(excel_file, sheet_name="Results")
-
-# Clean data - remove empty rows
-athletes_df = athletes_df.dropna(subset=['Athlete'])
-meets_df = meets_df.dropna(subset=['Meet'])
-results_df = results_df.dropna(subset=['ATHLETE', 'EVENT'])
-
-# Convert EVENT column to string for consistent comparison
-results_df['EVENT'] = results_df['EVENT'].astype(str)
-
-# Merge results with meets to get dates
-results_with_dates = results_df.merge(
-    meets_df[['Meet', 'DATE']],
-    left_on='MEET',
-    right_on='Meet',
-    how='left'
-)
-
-# Sort meets by date (newest first)
-meets_df = meets_df.sort_values('DATE', ascending=False, na_position='last')
-
-# Sort results by date (newest first)
-results_with_dates = results_with_dates.sort_values('DATE', ascending=False, na_position='last')
 
-print(f"Loaded: {len(athletes_df)} athletes, {len(meets_df)} meets, {len(results_df)} results")
-
-# Generate HTML dashboard
-html_content = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>WAZA Track Club - Results Dashboard</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-        }
-        h1 {
-            color: white;
-            text-align: center;
-            margin-bottom: 30px;
-            font-size: 2.5rem;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }
-        .stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-        .stat-card {
-            background: white;
-            padding: 25px;
-            border-radius: 10px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-            text-align: center;
-        }
-        .stat-number {
-            font-size: 3rem;
-            font-weight: bold;
-            color: #667eea;
-        }
-        .stat-label {
-            color: #666;
-            margin-top: 10px;
-            font-size: 1rem;
-        }
-        .section {
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-            margin-bottom: 30px;
-        }
-        h2 {
-            color: #333;
-            margin-bottom: 20px;
-            padding-bottom: 10px;
-            border-bottom: 2px solid #667eea;
-        }
-        .search-box {
-            width: 100%;
-            padding: 12px 20px;
-            font-size: 16px;
-            border: 2px solid #ddd;
-            border-radius: 5px;
-            margin-bottom: 20px;
-        }
-        .search-box:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }
-        th {
-            background: #667eea;
-            color: white;
-            padding: 12px;
-            text-align: left;
-            font-weight: 600;
-        }
-        td {
-            padding: 12px;
-            border-bottom: 1px solid #eee;
-        }
-        tr:hover {
-            background: #f8f9fa;
-        }
-        .pr-badge {
-            background: #ffd700;
-            color: #333;
-            padding: 4px 8px;
-            border-radius: 4px;
-            font-weight: bold;
-            font-size: 0.85rem;
-        }
-        .footer {
-            text-align: center;
-            color: white;
-            margin-top: 40px;
-            padding: 20px;
-        }
-        .tabs {
-            display: flex;
-            gap: 10px;
-            margin-bottom: 20px;
-        }
-        .tab {
-            padding: 10px 20px;
-            background: #f0f0f0;
-            border: none;
-            border-radius: 5px;
-            cursor: pointer;
-            font-size: 16px;
-        }
-        .tab.active {
-            background: #667eea;
-            color: white;
-        }
-        .tab-content {
-            display: none;
-        }
-        .tab-content.active {
-            display: block;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🏃 WAZA Track Club - Results Dashboard</h1>
-
-        <div class="stats">
-            <div class="stat-card">
-                <div class="stat-number">""" + str(len(athletes_df)) + """</div>
-                <div class="stat-label">Athletes</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number">""" + str(len(meets_df)) + """</div>
-                <div class="stat-label">Meets</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number">""" + str(len(results_df)) + """</div>
-                <div class="stat-label">Results</div>
-            </div>
-        </div>
-
-        <div class="section">
-            <div class="tabs">
-                <button class="tab active" onclick="showTab('athletes')">Athletes</button>
-                <button class="tab" onclick="showTab('meets')">Meets</button>
-                <button class="tab" onclick="showTab('results')">Results</button>
-                <button class="tab" onclick="showTab('prs')">Personal Records</button>
-                <button class="tab" onclick="showTab('progression')">Progression</button>
-            </div>
-
-            <div id="athletes-content" class="tab-content active">
-                <h2>Athletes</h2>
-                <input type="text" class="search-box" id="athleteSearch" placeholder="Search athletes..." onkeyup="filterTable('athletesTable', 'athleteSearch')">
-                <table id="athletesTable">
-                    <thead>
-                        <tr>
-                            <th>Name</th>
-                            <th>Birth Date</th>
-                            <th>Gender</th>
-                        </tr>
-                    </thead>
-                    <tbody>
+    python generate_dashboard.py                 # full rebuild
+    python generate_dashboard.py --incremental   # reuse cached sheets/sections, skip if unchanged
+    python generate_dashboard.py --watch         # rebuild on every save, preview with live reload
+    python generate_dashboard.py --profile       # per-stage timing/memory report in build-profile.json
+    python generate_dashboard.py --minify --precompress   # smallest output for static hosting
+    python generate_dashboard.py --db results.sqlite --import  # import changed sheets, build from the database
+    python generate_dashboard.py --athlete-pages         # also a static profile page per athlete in athletes/
+    python generate_dashboard.py --low-memory            # stream the Results sheets in chunks; less memory
+
+This script is only the command line; the build itself is the waza_dashboard
+package (see its docstring for running the stages from Python).
 """
-
-# Add athletes
-for _, athlete in athletes_df.iterrows():
-    name = athlete.get('Athlete', '')
-    birth = athlete.get('BirthDate', '')
-    gender = athlete.get('Gender', '')
-
-    html_content += f"""
-                        <tr>
-                            <td>{name}</td>
-                            <td>{birth}</td>
-                            <td>{gender}</td>
-                        </tr>
-    """
-
-html_content += """
-                    </tbody>
-                </table>
-            </div>
-
-            <div id="meets-content" class="tab-content">
-                <h2>Meets</h2>
-                <input type="text" class="search-box" id="meetSearch" placeholder="Search meets..." onkeyup="filterTable('meetsTable', 'meetSearch')">
-                <table id="meetsTable">
-                    <thead>
-                        <tr>
-                            <th>Meet Name</th>
-                            <th>Date</th>
-                            <th>Location</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-"""
-
-# Add meets
-for _, meet in meets_df.iterrows():
-    name = meet.get('Meet', '')
-    date = meet.get('DATE', '')
-    season = meet.get('Season', '')
-
-    html_content += f"""
-                        <tr>
-                            <td>{name}</td>
-                            <td>{date}</td>
-                            <td>{season}</td>
-                        </tr>
-    """
-
-html_content += """
-                    </tbody>
-                </table>
-            </div>
-
-            <div id="results-content" class="tab-content">
-                <h2>All Results</h2>
-                <input type="text" class="search-box" id="resultSearch" placeholder="Search results..." onkeyup="filterTable('resultsTable', 'resultSearch')">
-                <table id="resultsTable">
-                    <thead>
-                        <tr>
-                            <th>Athlete</th>
-                            <th>Event</th>
-                            <th>Result</th>
-                            <th>Meet</th>
-                            <th>Date</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-"""
-
-# Add results (with dates from merged dataframe)
-for _, result in results_with_dates.iterrows():
-    athlete = result.get('ATHLETE', '')
-    event = result.get('EVENT', '')
-    performance = result.get('Result (Seconds / Meters)', '')
-    meet = result.get('MEET', '')
-    date = result.get('DATE', '')
-    # Format date if it exists
-    if pd.notna(date):
-        try:
-            date_str = pd.to_datetime(date).strftime('%Y-%m-%d')
-        except:
-            date_str = str(date)
+import argparse
+import cProfile
+import os
+
+from waza_dashboard.athletes import ATHLETE_PAGE_DIR
+from waza_dashboard.build import (
+    EXCEL_FILE, OUTPUT_FILE, PROFILE_FILE, build_dashboard, output_files, output_sizes, print_output_changes,
+    print_size_report, watch,
+)
+from waza_dashboard.cache import CACHE_DIR
+from waza_dashboard.database import import_workbooks
+from waza_dashboard.low_memory import LOW_MEMORY_CHUNK_ROWS
+from waza_dashboard.page import ASSET_DIR, SERVICE_WORKER_FILE
+from waza_dashboard.profiling import PROFILER
+from waza_dashboard.results import VALIDATION_FILE
+from waza_dashboard.sections import PAGE_SECTIONS
+from waza_dashboard.shards import SHARD_DIR
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the WAZA results dashboard from the Excel workbook(s)")
+    parser.add_argument("--input", nargs="+", default=[EXCEL_FILE], metavar="PATH",
+                        help=f"workbooks and/or directories of workbooks to combine (default: {EXCEL_FILE})")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="processes used to parse sheets (default: one per CPU when there is more than one "
+                             "workbook, otherwise none; 1 = no process pool)")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"reuse sheets and sections cached in {CACHE_DIR}/ and skip the rebuild "
+                             "when the workbook has not changed")
+    parser.add_argument("--payload-report", action="store_true",
+                        help="compare the size and parse time of the embedded results payload "
+                             "against the old row-oriented JSON")
+    parser.add_argument("--mode", choices=sorted(PAGE_SECTIONS), default="single",
+                        help="single: one self-contained page (default); sharded: a shell page plus "
+                             f"JSON shards in {SHARD_DIR}/ that are fetched on demand; app: sharded, with the "
+                             f"CSS and script as cacheable files in {ASSET_DIR}/ and a service worker for "
+                             "offline use")
+    parser.add_argument("--best-per-meet", action="store_true",
+                        help="progression chart: plot each athlete's best mark per meet rather than every result")
+    parser.add_argument("--athlete-pages", action="store_true",
+                        help=f"also write a static profile page per athlete (PRs, season bests, results and "
+                             f"progression charts) to {ATHLETE_PAGE_DIR}/ next to the page")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running: rebuild when a workbook is saved and serve the output "
+                             "with live reload")
+    parser.add_argument("--port", type=int, default=8000,
+                        help="port of the --watch preview server (default: 8000)")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_FILE, metavar="REPORT",
+                        help=f"time and measure memory of each build stage and write a JSON report "
+                             f"(default: {PROFILE_FILE})")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="also dump cProfile stats to FILE (view with snakeviz or python -m pstats)")
+    parser.add_argument("--minify", action="store_true",
+                        help="strip indentation, blank lines and comments from the page's HTML, CSS and script")
+    parser.add_argument("--precompress", action="store_true",
+                        help="also write .gz (and .br, if the brotli module is installed) copies of the page "
+                             "and shards for the web server to serve directly")
+    parser.add_argument("--validate", nargs="?", const=VALIDATION_FILE, metavar="REPORT",
+                        help="list results that are unreadable, in the wrong unit or far out of line for "
+                             f"their event in a CSV file (default: {VALIDATION_FILE})")
+    parser.add_argument("--db", metavar="PATH",
+                        help="build from this SQLite results database instead of reading the workbooks")
+    parser.add_argument("--import", dest="import_db", action="store_true",
+                        help="with --db: first import the --input workbooks into the database (only sheets "
+                             "changed since the last import are read)")
+    parser.add_argument("--changes", metavar="FILE",
+                        help="list the output files this build added, changed or removed in FILE "
+                             "(A/M/D, tab, path relative to the page) for deploying only those")
+    parser.add_argument("--low-memory", nargs="?", type=int, const=LOW_MEMORY_CHUNK_ROWS, metavar="ROWS",
+                        help="read the Results sheets ROWS rows at a time (default: "
+                             f"{LOW_MEMORY_CHUNK_ROWS}) and work through them about as many at a time; for very "
+                             "large histories (memory then grows only with the numbers of athletes, meets and "
+                             "distinct marks)")
+    parser.add_argument("--output", default=OUTPUT_FILE,
+                        help=f"page to write (default: {OUTPUT_FILE}); shards go next to it")
+    args = parser.parse_args(argv)
+    if args.import_db and not args.db:
+        parser.error("--import needs --db")
+    if args.low_memory is not None:
+        conflicts = [flag for flag, used in (("--db", args.db), ("--incremental", args.incremental),
+                                             ("--watch", args.watch), ("--athlete-pages", args.athlete_pages),
+                                             ("--payload-report", args.payload_report)) if used]
+        if conflicts:
+            parser.error(f"--low-memory cannot be combined with {', '.join(conflicts)}")
+        if args.low_memory < 1:
+            parser.error("--low-memory needs a positive number of rows")
+
+    output_file = args.output
+    if args.watch:
+        watch(args.input, output_file, mode=args.mode, jobs=args.jobs, per_meet=args.best_per_meet,
+              port=args.port, database=args.db, athlete_pages=args.athlete_pages)
+        return
+    if args.import_db:
+        import_workbooks(args.input, args.db, args.jobs)
+    if args.profile:
+        PROFILER.start()
+    # --minify/--precompress builds report how much smaller they are than what they replace
+    size_report = args.minify or args.precompress
+    sizes_before = output_sizes(output_file) if size_report else None
+    files_before = output_files(output_file)
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler:
+        profiler.enable()
+    built = build_dashboard(args.input, output_file, incremental=args.incremental,
+                            report_payload=args.payload_report, mode=args.mode, jobs=args.jobs,
+                            per_meet=args.best_per_meet, minify=args.minify, compress=args.precompress,
+                            database=args.db, validation_report=args.validate,
+                            athlete_pages=args.athlete_pages, chunk_rows=args.low_memory)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        print(f"cProfile stats written to {args.cprofile}")
+    if args.profile:
+        PROFILER.report(args.profile, output_file)
+    if not built:
+        if args.changes:
+            print_output_changes(files_before, files_before, args.changes)
+        return
+    print_output_changes(files_before, output_files(output_file), args.changes)
+    if size_report:
+        print_size_report(sizes_before, output_sizes(output_file))
+
+    print(f"\n[OK] Dashboard generated: {output_file}")
+    if args.mode != "single":
+        print(f"Data shards: {os.path.join(os.path.dirname(output_file), SHARD_DIR)}")
+        print(f"The {args.mode} page fetches its data, so preview it over HTTP: python -m http.server")
+    if args.athlete_pages:
+        print(f"Athlete pages: {os.path.join(os.path.dirname(output_file), ATHLETE_PAGE_DIR, 'index.html')}")
+    print(f"\nTo view: Open {output_file} in your browser")
+    if args.db:
+        print(f"To update: Edit the Excel file and run this script again with --db {args.db} --import")
     else:
-        date_str = ''
-
-    html_content += f"""
-                        <tr>
-                            <td>{athlete}</td>
-                            <td>{event}</td>
-                            <td>{performance}</td>
-                            <td>{meet}</td>
-                            <td>{date_str}</td>
-                        </tr>
-    """
-
-html_content += """
-                    </tbody>
-                </table>
-            </div>
-
-            <div id="prs-content" class="tab-content">
-                <h2>Personal Records</h2>
-                <p style="color: #666; margin-bottom: 20px;">Select an athlete to see their personal records:</p>
-                <select id="prAthlete" class="search-box" onchange="showPRs()">
-                    <option value="">-- Select Athlete --</option>
-"""
-
-# Add athlete options for PR lookup
-for _, athlete in athletes_df.iterrows():
-    name = athlete.get('Athlete', '')
-    if pd.notna(name):
-        html_content += f'<option value="{name}">{name}</option>\n'
-
-html_content += """
-                </select>
-                <div id="prTable"></div>
-            </div>
-
-            <div id="progression-content" class="tab-content">
-                <h2>Progression Over Time</h2>
-                <p style="color: #666; margin-bottom: 20px;">Select an event and athletes to view progression:</p>
-
-                <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin-bottom: 20px;">
-                    <div>
-                        <label style="display: block; margin-bottom: 10px; font-weight: 600;">Event:</label>
-                        <select id="progressionEvent" class="search-box">
-                            <option value="">-- Select Event --</option>
-"""
-
-# Add unique events for progression
-unique_events = [str(e) for e in results_df['EVENT'].unique() if pd.notna(e)]
-unique_events = sorted(unique_events)
-for event in unique_events:
-    html_content += f'<option value="{event}">{event}</option>\n'
-
-html_content += """
-                        </select>
-                    </div>
-                    <div>
-                        <label style="display: block; margin-bottom: 10px; font-weight: 600;">Athletes (hold Ctrl/Cmd to select multiple):</label>
-                        <select id="progressionAthletes" class="search-box" multiple style="height: 150px;">
-"""
-
-# Add athlete options for progression
-for _, athlete in athletes_df.iterrows():
-    name = athlete.get('Athlete', '')
-    if pd.notna(name):
-        html_content += f'<option value="{name}">{name}</option>\n'
-
-html_content += """
-                        </select>
-                    </div>
-                </div>
-                <button onclick="updateProgression()" style="width: 100%; padding: 15px; background: #667eea; color: white; border: none; border-radius: 5px; font-size: 16px; font-weight: 600; cursor: pointer; margin-bottom: 20px;">Generate Chart</button>
-                <div id="progressionChart" style="width: 100%; height: 500px;"></div>
-            </div>
-        </div>
-
-        <div class="footer">
-            <p>Last updated: """ + datetime.now().strftime("%B %d, %Y at %I:%M %p") + """</p>
-            <p style="margin-top: 10px;">WAZA Track Club © 2025</p>
-        </div>
-    </div>
-
-    <script>
-        // Tab switching
-        function showTab(tabName) {
-            // Hide all tabs
-            document.querySelectorAll('.tab-content').forEach(content => {
-                content.classList.remove('active');
-            });
-            document.querySelectorAll('.tab').forEach(tab => {
-                tab.classList.remove('active');
-            });
-
-            // Show selected tab
-            document.getElementById(tabName + '-content').classList.add('active');
-            event.target.classList.add('active');
-        }
-
-        // Table filtering
-        function filterTable(tableId, searchId) {
-            const input = document.getElementById(searchId);
-            const filter = input.value.toUpperCase();
-            const table = document.getElementById(tableId);
-            const tr = table.getElementsByTagName('tr');
-
-            for (let i = 1; i < tr.length; i++) {
-                let txtValue = tr[i].textContent || tr[i].innerText;
-                if (txtValue.toUpperCase().indexOf(filter) > -1) {
-                    tr[i].style.display = '';
-                } else {
-                    tr[i].style.display = 'none';
-                }
-            }
-        }
-
-        // Store all results for PR calculation (with dates)
-        const allResults = """ + results_with_dates.to_json(orient='records', date_format='iso') + """;
-
-        // Show PRs for selected athlete
-        function showPRs() {
-            const athleteName = document.getElementById('prAthlete').value;
-            const prTableDiv = document.getElementById('prTable');
-
-            if (!athleteName) {
-                prTableDiv.innerHTML = '';
-                return;
-            }
-
-            // Filter results for this athlete
-            const athleteResults = allResults.filter(r => r.ATHLETE === athleteName);
-
-            if (athleteResults.length === 0) {
-                prTableDiv.innerHTML = '<p style="color: #999; margin-top: 20px;">No results found for this athlete.</p>';
-                return;
-            }
-
-            // Group by event and find best
-            const prs = {};
-            athleteResults.forEach(result => {
-                const event = result.EVENT;
-                const performance = result['Result (Seconds / Meters)'];
-                if (!prs[event]) {
-                    prs[event] = result;
-                } else {
-                    // For time events (lower is better), for distance events (higher is better)
-                    // Simple comparison - assumes lower is better
-                    if (performance < prs[event]['Result (Seconds / Meters)']) {
-                        prs[event] = result;
-                    }
-                }
-            });
-
-            // Build PR table
-            let html = '<table style="margin-top: 20px;"><thead><tr><th>Event</th><th>PR</th><th>Meet</th><th>Date</th></tr></thead><tbody>';
-            Object.keys(prs).sort().forEach(event => {
-                const pr = prs[event];
-                const date = pr.DATE ? new Date(pr.DATE).toLocaleDateString() : 'N/A';
-                html += `<tr>
-                    <td>${event}</td>
-                    <td><span class="pr-badge">${pr['Result (Seconds / Meters)']}</span></td>
-                    <td>${pr.MEET}</td>
-                    <td>${date}</td>
-                </tr>`;
-            });
-            html += '</tbody></table>';
-            prTableDiv.innerHTML = html;
-        }
-
-        // Progression chart
-        function updateProgression() {
-            const event = document.getElementById('progressionEvent').value;
-            const athleteSelect = document.getElementById('progressionAthletes');
-            const selectedAthletes = Array.from(athleteSelect.selectedOptions).map(opt => opt.value);
-
-            if (!event || selectedAthletes.length === 0) {
-                document.getElementById('progressionChart').innerHTML = '<p style="color: #999; padding: 40px; text-align: center;">Select an event and at least one athlete to view progression</p>';
-                return;
-            }
-
-            // Filter results for selected event and athletes
-            // EVENT is already converted to string in Python, but double-check here
-            const eventResults = allResults.filter(r => {
-                const eventMatch = String(r.EVENT) === String(event);
-                const athleteMatch = selectedAthletes.includes(r.ATHLETE);
-                const hasDate = r.DATE != null && r.DATE !== '';
-                return eventMatch && athleteMatch && hasDate;
-            });
-
-            console.log('Selected event:', event);
-            console.log('Selected athletes:', selectedAthletes);
-            console.log('Filtered results:', eventResults.length);
-            console.log('Sample result EVENT type:', eventResults.length > 0 ? typeof eventResults[0].EVENT : 'none');
-
-            if (eventResults.length === 0) {
-                // More detailed error message
-                const allEventsForAthletes = allResults.filter(r => selectedAthletes.includes(r.ATHLETE));
-                const uniqueEvents = [...new Set(allEventsForAthletes.map(r => String(r.EVENT)))];
-                document.getElementById('progressionChart').innerHTML =
-                    `<p style="color: #999; padding: 40px; text-align: center;">
-                        No results found for ${event} with selected athletes.<br>
-                        <small>Available events for selected athletes: ${uniqueEvents.join(', ')}</small>
-                    </p>`;
-                return;
-            }
-
-            // Group by athlete
-            const traces = [];
-            selectedAthletes.forEach(athlete => {
-                const athleteResults = eventResults
-                    .filter(r => r.ATHLETE === athlete)
-                    .sort((a, b) => new Date(a.DATE) - new Date(b.DATE));
-
-                if (athleteResults.length > 0) {
-                    traces.push({
-                        x: athleteResults.map(r => new Date(r.DATE)),
-                        y: athleteResults.map(r => r['Result (Seconds / Meters)']),
-                        mode: 'lines+markers',
-                        name: athlete,
-                        type: 'scatter',
-                        text: athleteResults.map(r => r.MEET),
-                        hovertemplate: '<b>%{text}</b><br>Date: %{x|%Y-%m-%d}<br>Time: %{y}<extra></extra>'
-                    });
-                }
-            });
-
-            // Helper function to format seconds as MM:SS.xx
-            function formatTime(seconds) {
-                const mins = Math.floor(seconds / 60);
-                const secs = (seconds % 60).toFixed(2);
-                return mins > 0 ? `${mins}:${secs.padStart(5, '0')}` : `${secs}s`;
-            }
-
-            const layout = {
-                title: event + ' Progression',
-                xaxis: { title: 'Date' },
-                yaxis: {
-                    title: 'Performance',
-                    autorange: 'reversed',  // Lower is better for time events
-                    tickformat: '',
-                    tickmode: 'auto',
-                    ticksuffix: ''
-                },
-                hovermode: 'closest',
-                showlegend: true,
-                plot_bgcolor: '#f8f9fa',
-                paper_bgcolor: 'white'
-            };
-
-            // Update hover template to show formatted time
-            traces.forEach(trace => {
-                trace.hovertemplate = '<b>%{text}</b><br>Date: %{x|%Y-%m-%d}<br>Time: %{customdata}<extra></extra>';
-                trace.customdata = trace.y.map(formatTime);
-            });
-
-            const config = {
-                responsive: true,
-                displayModeBar: true
-            };
-
-            Plotly.newPlot('progressionChart', traces, layout, config).then(function(gd) {
-                // Format y-axis tick labels as MM:SS.xx
-                const yaxis = gd._fullLayout.yaxis;
-                const tickvals = yaxis.tickvals;
-                const ticktext = tickvals.map(formatTime);
-
-                Plotly.relayout(gd, {
-                    'yaxis.tickvals': tickvals,
-                    'yaxis.ticktext': ticktext
-                });
-            });
-        }
-    </script>
-</body>
-</html>
-"""
+        print("To update: Edit the Excel file and run this script again")
+    print("\nTo deploy to pearseprojects.org:")
+    if args.mode == "app":
+        print(f"1. Upload {output_file}, {SERVICE_WORKER_FILE} and the {SHARD_DIR} and {ASSET_DIR} folders "
+              "next to it to your web server")
+    elif args.mode == "sharded":
+        print(f"1. Upload {output_file} and the {SHARD_DIR} folder next to it to your web server")
+    else:
+        print(f"1. Upload {output_file} to your web server")
+    print("2. Configure DNS to point waza.pearseprojects.org to it")
 
-# Write HTML file
-output_file = "index.html"
-with open(output_file, 'w', encoding='utf-8') as f:
-    f.write(html_content)
 
-print(f"\n[OK] Dashboard generated: {output_file}")
-print(f"\nTo view: Open {output_file} in your browser")
-print(f"To update: Edit the Excel file and run this script again")
-print(f"\nTo deploy to pearseprojects.org:")
-print(f"1. Upload {output_file} to your web server")
-print(f"2. Configure DNS to point waza.pearseprojects.org to it")
+if __name__ == "__main__":
+    main()
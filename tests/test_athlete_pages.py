@@ -0,0 +1,38 @@
+"""
+An athlete's profile only depends on the rows athlete_hashes() covers
+
+Incremental builds only render the pages whose hash changed, so editing one
+athlete's results must not change anyone else's profile.
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import waza_dashboard as wd
+
+# A result without a Season counts towards the calendar year ("2024")
+RESULTS = pd.DataFrame({
+    'ATHLETE': ["Zoe Ghanbari", "Zoe Ghanbari", "Luke Pearse"],
+    'EVENT': ['800', '60', '800'],
+    'Result (Seconds / Meters)': [150.5, 8.9, 140.0],
+    'MEET': ["LAB 1 - 2024", "LAB 2 - 2024", "Mighty Mile"],
+    'DATE': pd.to_datetime(['2024-01-10', '2024-02-01', '2024-06-01']),
+    'Season': [None, 'Indoor', None],
+})
+
+
+def test_other_athletes_results_leave_a_profile_unchanged():
+    # Luke's result moves from after Zoe's Indoor 2024 results to before
+    # them; Zoe's seasons stay in the order of Zoe's own results
+    edited = RESULTS.copy()
+    edited.loc[2, 'DATE'] = pd.Timestamp('2024-01-05')
+
+    before = wd.athlete_profiles(RESULTS)
+    after = wd.athlete_profiles(edited)
+    assert wd.athlete_hashes(RESULTS)["Zoe Ghanbari"] == wd.athlete_hashes(edited)["Zoe Ghanbari"]
+    assert before["Zoe Ghanbari"] == after["Zoe Ghanbari"]
+    assert [row[0] for row in before["Zoe Ghanbari"]["season_bests"]] == ["Indoor 2024", "2024"]
+    assert wd.athlete_hashes(RESULTS)["Luke Pearse"] != wd.athlete_hashes(edited)["Luke Pearse"]
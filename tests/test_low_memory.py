@@ -0,0 +1,120 @@
+"""
+A low-memory build writes the same files as a normal build
+
+render_low_memory() reads the Results sheet in chunks and works through it
+a group of athletes at a time; its page and shards must be byte-identical to
+the ones render_sections() gives, in every output mode, and its peak memory
+must stay under a ceiling however large the history.
+"""
+import contextlib
+import filecmp
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pandas as pd
+import waza_dashboard as wd
+from synthetic import make_club, write_workbook
+
+# Small enough to be quick, several chunks of CHUNK_ROWS rows; the larger
+# events are worked through in several groups of athletes
+RESULTS = 3_000
+CHUNK_ROWS = 200
+
+# Peak RSS of a low-memory build of LARGE_RESULTS results of one event, above
+# that of the interpreter with pandas, numpy and openpyxl imported (a normal
+# build of them needs about 50 MB, and a build loading each event whole as
+# much)
+LARGE_RESULTS = 60_000
+LARGE_CHUNK_ROWS = 2_000
+MAX_RSS_MB = 40
+
+PEAK_RSS = """
+import contextlib, io, resource, sys
+import numpy, openpyxl, pandas
+import waza_dashboard as wd
+
+def peak_mb():
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+workbook, output_file, chunk_rows = sys.argv[1:]
+baseline = peak_mb()
+with contextlib.redirect_stdout(io.StringIO()):
+    wd.build_dashboard(workbook, output_file, mode="sharded", jobs=1, chunk_rows=int(chunk_rows))
+print(peak_mb() - baseline)
+"""
+
+
+@pytest.fixture(scope="module")
+def workbook(tmp_path_factory):
+    path = tmp_path_factory.mktemp("workbook") / "club.xlsx"
+    write_workbook(make_club(RESULTS), path, blank_rows=3)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def repeated_meets_workbook(tmp_path_factory):
+    """Meets listed on several dates, one of them without a date: a full build lists their results once per date"""
+    frames = make_club(RESULTS)
+    meets = frames["meets"]
+    extra = meets.iloc[[0, 2, 4]].copy()
+    extra['DATE'] = [meets['DATE'].iloc[0] - pd.Timedelta(days=30), meets['DATE'].iloc[2] + pd.Timedelta(days=3),
+                     pd.NaT]
+    frames["meets"] = pd.concat([meets, extra], ignore_index=True)
+    path = tmp_path_factory.mktemp("workbook") / "repeated.xlsx"
+    write_workbook(frames, path)
+    return str(path)
+
+
+def build(workbook, folder, mode, chunk_rows=None):
+    output_file = os.path.join(folder, wd.OUTPUT_FILE)
+    with contextlib.redirect_stdout(io.StringIO()):
+        wd.build_dashboard(workbook, output_file, mode=mode, jobs=1, chunk_rows=chunk_rows)
+    return output_file
+
+
+def differences(left, right):
+    """Paths of the files under left that differ from right or exist on one side only"""
+    compare = filecmp.dircmp(left, right)
+    found = [os.path.join(left, name) for name in compare.left_only + compare.right_only + compare.funny_files]
+    _, mismatch, errors = filecmp.cmpfiles(left, right, compare.common_files, shallow=False)
+    found += [os.path.join(left, name) for name in mismatch + errors]
+    for name in compare.common_dirs:
+        found += differences(os.path.join(left, name), os.path.join(right, name))
+    return found
+
+
+@pytest.mark.parametrize("mode", ["single", "sharded", "app"])
+def test_low_memory_build_matches_normal_build(workbook, tmp_path, mode):
+    normal = build(workbook, tmp_path / "normal", mode)
+    low_memory = build(workbook, tmp_path / "low-memory", mode, chunk_rows=CHUNK_ROWS)
+    assert os.path.getsize(normal) > 0
+    assert differences(os.path.dirname(normal), os.path.dirname(low_memory)) == []
+
+
+@pytest.mark.parametrize("mode", ["single", "sharded", "app"])
+def test_low_memory_build_lists_repeated_meets_like_normal_build(repeated_meets_workbook, tmp_path, mode):
+    normal = build(repeated_meets_workbook, tmp_path / "normal", mode)
+    low_memory = build(repeated_meets_workbook, tmp_path / "low-memory", mode, chunk_rows=CHUNK_ROWS)
+    assert differences(os.path.dirname(normal), os.path.dirname(low_memory)) == []
+
+
+def test_low_memory_build_peak_rss(tmp_path):
+    pytest.importorskip("resource")
+    frames = make_club(LARGE_RESULTS)
+    frames["results"]['EVENT'] = '100'
+    workbook = tmp_path / "large.xlsx"
+    write_workbook(frames, workbook)
+    # A fresh process, so the peak covers this build alone
+    out = subprocess.run([sys.executable, "-c", PEAK_RSS, str(workbook), str(tmp_path / "page" / wd.OUTPUT_FILE),
+                          str(LARGE_CHUNK_ROWS)], check=True, capture_output=True, text=True, cwd=ROOT).stdout
+    assert float(out) < MAX_RSS_MB
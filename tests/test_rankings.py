@@ -0,0 +1,95 @@
+"""
+The single-file page works out the same leaderboards as the build
+
+The page only embeds the all-time boards (see render_rankings); the
+eventBoards() of its script must give every other board exactly as
+compute_leaderboards does, for marks entered as text and for athletes
+without a gender or birth date.
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pandas as pd
+import waza_dashboard as wd
+from waza_dashboard import templates
+from waza_dashboard.schema import RESULT_COLUMN
+from waza_dashboard.sections import leaderboard_index, render_results_json, render_rankings
+from synthetic import make_club, write_workbook
+
+RESULTS = 3_000
+
+# Prints every event's boards as the page works them out
+PRINT_BOARDS = """
+(async () => {
+    const events = {};
+    for (const event of Object.keys(rankingIndex.events)) {
+        const rankings = await getRankings(event);
+        events[event] = {higher_is_better: rankings.higher_is_better,
+                         boards: eventBoards(event, rankings.higher_is_better)};
+    }
+    console.log(JSON.stringify({filters: rankingFilters, events: events}));
+})();
+"""
+
+
+def script_function(name):
+    """The source of a function of the page script"""
+    text = templates.SCRIPT_OPEN
+    start = text.index(f"function {name}(")
+    depth = 0
+    for end in range(text.index("{", start), len(text)):
+        depth += {"{": 1, "}": -1}.get(text[end], 0)
+        if depth == 0:
+            return text[start:end + 1]
+
+
+@pytest.fixture(scope="module")
+def workbook(tmp_path_factory):
+    frames = make_club(RESULTS)
+    results = frames["results"]
+    # Marks entered as text, results without a mark, meets without a date
+    # and athletes without a gender or birth date
+    marks = results[RESULT_COLUMN].iloc[::7]
+    results.loc[marks.index, RESULT_COLUMN] = [f"{v // 60:.0f}:{v % 60:04.1f}" if isinstance(v, float) else v
+                                               for v in marks]
+    results.loc[results.index[3::50], RESULT_COLUMN] = "DNF"
+    frames["meets"].loc[frames["meets"].index[:2], 'DATE'] = pd.NaT
+    athletes = frames["athletes"]
+    athletes.loc[athletes.index[:10], 'Gender'] = None
+    athletes.loc[athletes.index[10:20], 'BirthDate'] = pd.NaT
+    path = tmp_path_factory.mktemp("workbook") / "club.xlsx"
+    write_workbook(frames, path)
+    return str(path)
+
+
+def test_page_boards_match_build(workbook):
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    with contextlib.redirect_stdout(io.StringIO()):
+        frames = wd.load_data([workbook], jobs=1)
+    results_with_dates = wd.sort_results(wd.merge_results(frames["results"], wd.sort_meets(frames["meets"])))
+    expected = leaderboard_index(results_with_dates, frames["athletes"])
+
+    inline = templates.INLINE_DATA_CLOSE
+    script = "\n".join([
+        script_function("decodeResults"),
+        script_function("formatDay"),
+        "const allResults = decodeResults(" + "".join(render_results_json(results_with_dates)) + ");",
+        "const rankingIndex = " + "".join(render_rankings(results_with_dates, frames["athletes"])) + ";",
+        inline[:inline.index("function getMeet(")],
+        PRINT_BOARDS,
+    ])
+    out = subprocess.run([node, "-e", script], check=True, capture_output=True, text=True).stdout
+    assert json.loads(out) == json.loads(json.dumps(expected))
@@ -0,0 +1,85 @@
+"""
+The build-time search index finds the same rows as a substring scan
+
+search_rows() answers a query the way the page's searchIndex() does; every
+query here must return exactly the rows whose displayed text contains it.
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import waza_dashboard as wd
+
+RESULTS = pd.DataFrame({
+    'ATHLETE': ["Zoe Ghanbari", "Luke O'Brien", "Ana Smith-Jones", "Zoe Carroll", "Luke O'Brien",
+                "Ana Smith-Jones", "Micah Carroll", "Zoe Ghanbari", "Micah Carroll"],
+    'EVENT': ['800', '60m hurdles', 'shot', '800', '1600', 'longJump', '60', '60m hurdles', '800'],
+    'Result (Seconds / Meters)': [150.5, 11.2, 7.0, 162.25, 330.0, 3.9, 8.4, None, "2:41.7"],
+    'MEET': ["LAB 2 - 2024", "Motor City Classic", "LAB 2 - 2024", "D Hall", None,
+             "Motor City Classic", "LAB 2 - 2024", "D Hall", "D Hall"],
+    'DATE': pd.to_datetime(['2024-01-13', '2024-02-03', '2024-01-13', '2023-12-09', None,
+                            '2024-02-03', '2024-01-13', '2023-12-09', '2023-12-09']),
+})
+
+
+def displayed_rows(results):
+    """Upper-cased text of each Results table row, as the page shows it"""
+    columns = [column.fillna('').astype(str) for column in wd.table_search_fields("resultsTable", results)]
+    text = columns[0]
+    for column in columns[1:]:
+        text = text + " " + column
+    return text.str.upper().tolist()
+
+
+@pytest.fixture(scope="module")
+def index():
+    return wd.build_search_index(wd.table_search_fields("resultsTable", RESULTS))
+
+
+@pytest.mark.parametrize("query", [
+    "Zoe Ghanbari",     # several words
+    "zoe carroll",      # several words, lower case
+    "800 LAB",          # words from different columns
+    "O'Brien",          # punctuation inside a word
+    "Smith-Jones",
+    "- 2024",           # punctuation and a number
+    "-",                # no letters or digits at all
+    "arroll",           # part of a word
+    "60m hurd",         # part of the last word
+    "150.5",            # a result value
+    "2:41",             # part of a result entered as text
+    "2024-01",          # part of a date
+    "  Carroll  ",      # surrounding whitespace
+    "Indoor",           # nothing the table shows
+])
+def test_index_matches_substring_scan(index, query):
+    rows = displayed_rows(RESULTS)
+    phrase = query.strip().upper()
+    expected = [row for row, text in enumerate(rows) if phrase in text]
+    assert wd.search_rows(index, query, lambda row: rows[row]) == expected
+
+
+@pytest.mark.parametrize("query", ["", "   ", "\t"])
+def test_whitespace_only_query_filters_nothing(index, query):
+    assert wd.search_rows(index, query, lambda row: "") is None
+
+
+def test_postings_cover_every_row(index):
+    rows = set()
+    for postings in index["postings"]:
+        row = 0
+        for delta in postings:
+            row += delta
+            rows.add(row)
+    assert index["rows"] == len(RESULTS)
+    assert rows == set(range(len(RESULTS)))
+
+
+def test_results_are_searched_as_entered(index):
+    rows = displayed_rows(RESULTS)
+    assert rows[-1] == "MICAH CARROLL 800 2:41.7 D HALL 2023-12-09"
+    assert wd.search_rows(index, "161.7", lambda row: rows[row]) == []
@@ -0,0 +1,52 @@
+"""
+Build the WAZA results dashboard from the Excel workbooks
+
+generate_dashboard.py is the command line; the build is split into modules
+by stage, and importing them only defines things (numpy, pandas and
+openpyxl are imported by the functions that use them, so --help and an
+incremental build that finds nothing changed never load them):
+
+    schema      the sheets and columns read from the workbooks
+    load        read, clean and combine the sheets; merge results with their meets
+    results     parse result marks into seconds or meters, and check them
+    aggregate   PRs, progression series, leaderboards, meet and season summaries
+    search      build-time search indexes of the page's tables
+    sections    the page's HTML sections and JSON data, and the shards of sharded builds
+    shards      content-hashed shard files and their precompressed copies
+    page        the page around the sections, and the app mode's assets
+    athletes    static profile pages per athlete
+    low_memory  the build that reads the Results sheets in chunks
+    database    the SQLite results database
+    cache       sheet fingerprints and the incremental build cache
+    build       the whole build, and watch mode's rebuild loop
+    profiling   per-stage timing and memory (--profile)
+    templates   the page's HTML, CSS and JavaScript
+    watch       the --watch file watcher and preview server
+
+Each stage can be run on its own:
+
+    import waza_dashboard as wd
+    frames = wd.load_data(wd.find_workbooks("results/"))             # load + clean the sheets
+    results = wd.merge_results(frames["results"], frames["meets"])   # results with meet dates
+    prs = wd.compute_prs(results)                                    # aggregate (also progression_series,
+                                                                     # compute_leaderboards, validate_results)
+    wd.build_dashboard("results/", "site/index.html", mode="sharded", jobs=4)   # the whole build
+"""
+from .aggregate import compute_leaderboards, compute_meet_stats, compute_prs, progression_series
+from .athletes import athlete_hashes, athlete_profiles, write_athlete_pages
+from .build import EXCEL_FILE, OUTPUT_FILE, build_dashboard
+from .database import ResultsDatabase, import_workbooks
+from .load import find_workbooks, load_data, merge_results, sort_meets, sort_results
+from .low_memory import render_low_memory
+from .profiling import PROFILER
+from .results import parse_results, validate_results
+from .search import build_search_index, search_rows, table_search_fields
+from .sections import PAGE_SECTIONS, render_sections
+
+__all__ = [
+    "EXCEL_FILE", "OUTPUT_FILE", "PAGE_SECTIONS", "PROFILER", "ResultsDatabase", "athlete_hashes", "athlete_profiles",
+    "build_dashboard", "build_search_index", "compute_leaderboards", "compute_meet_stats", "compute_prs",
+    "find_workbooks", "import_workbooks", "load_data", "merge_results", "parse_results", "progression_series",
+    "render_low_memory", "render_sections", "search_rows", "sort_meets", "sort_results", "table_search_fields",
+    "validate_results", "write_athlete_pages",
+]
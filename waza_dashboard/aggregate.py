@@ -0,0 +1,562 @@
+"""
+Aggregates of the results
+
+Personal records, progression series, leaderboards and the per-meet and
+per-season team summaries, each worked out from the merged results (see
+merge_results) in a few grouped passes.
+"""
+import itertools
+
+from .results import event_metadata, numeric_results
+from .schema import RESULT_COLUMN
+
+
+# Progression series longer than this are downsampled (LTTB) for the chart
+PROGRESSION_MAX_POINTS = 250
+
+# Leaderboards: athletes per board, and the age groups (label, oldest age;
+# None = no limit). Age is the age an athlete turns in the year of the meet,
+# as in youth track.
+LEADERBOARD_SIZE = 10
+
+AGE_GROUPS = (("8 & under", 8), ("9-10", 10), ("11-12", 12), ("13-14", 14), ("15-16", 16),
+              ("17-18", 18), ("19 & over", None))
+
+# Leaderboards ignoring a season, gender or age group use this label for it
+ALL = "All"
+
+# Meet details: the mark that beat an athlete's earlier best in the event,
+# and their first mark in an event
+PR_FLAG = 1
+
+FIRST_FLAG = 2
+
+
+def compute_prs(results_with_dates):
+    """
+    Best result per (athlete, event) using each event's scoring direction.
+
+    Ties go to the earliest date the mark was reached, then to the meet
+    first by name. Returns one row per PR with ATHLETE, EVENT, the original
+    result, its numeric value, MEET and DATE.
+    """
+    df = results_with_dates[['ATHLETE', 'EVENT', RESULT_COLUMN, 'MEET', 'DATE']].copy()
+    df['value'] = numeric_results(results_with_dates)
+    df = df[df['value'].notna()]
+
+    higher = event_metadata(df['EVENT'])['higher_is_better']
+    sign = df['EVENT'].astype(str).map(higher).map({True: -1.0, False: 1.0})
+    df['score'] = df['value'] * sign
+
+    df = df.sort_values(['ATHLETE', 'EVENT', 'score', 'DATE', 'MEET'], na_position='last', kind='mergesort')
+    return df.drop_duplicates(['ATHLETE', 'EVENT']).drop(columns='score').reset_index(drop=True)
+
+
+def season_labels(results_with_dates):
+    """
+    Season each result counts towards, e.g. "Indoor 2024".
+
+    Indoor meets in November and December belong to the next year's indoor
+    season, as the meet names in the workbook have it ("Lab Holiday Invite -
+    2024" is held in December 2023).
+    """
+    import pandas as pd
+    dates = pd.to_datetime(results_with_dates['DATE'], errors='coerce')
+    if 'Season' not in results_with_dates:
+        return dates.dt.year.astype('Int64').astype(str)
+    season = results_with_dates['Season'].astype(object).fillna('').astype(str)
+    next_year = (season.str.lower() == 'indoor') & (dates.dt.month >= 11)
+    year = dates.dt.year.astype('Int64') + next_year.astype(int)
+    return (season + " " + year.astype(str)).str.strip()
+
+
+def result_seasons(results_with_dates):
+    """season_labels of each result as an array, None without a date"""
+    import pandas as pd
+    # Seasons are worked out once per meet date
+    occasion_columns = [c for c in ('DATE', 'Season') if c in results_with_dates]
+    df = results_with_dates[occasion_columns].assign(DATE=pd.to_datetime(results_with_dates['DATE'], errors='coerce'))
+    occasions = df.drop_duplicates()
+    occasions['season'] = season_labels(occasions).where(occasions['DATE'].notna(), None)
+    return df.merge(occasions, how='left', on=occasion_columns)['season'].to_numpy()
+
+
+def previous_seasons(seasons):
+    """The season before each of a Series of season labels of the same kind ("Indoor 2023" for "Indoor 2024")"""
+    import pandas as pd
+    label = seasons.str.rsplit(' ', n=1)
+    kind, year = label.str[0].where(label.str.len() > 1, ''), pd.to_numeric(label.str[-1], errors='coerce')
+    return (kind + ' ' + (year - 1).astype('Int64').astype(str)).str.strip()
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positions of the points Largest-Triangle-Three-Buckets keeps out of x, y.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    import numpy as np
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # Averages of every bucket, plus the last point as the bucket after the last
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    sizes = np.diff(edges)
+    next_x = (np.add.reduceat(x[:-1], edges[:-1]) / sizes).tolist()[1:] + [x[-1]]
+    next_y = (np.add.reduceat(y[:-1], edges[:-1]) / sizes).tolist()[1:] + [y[-1]]
+    x = x.tolist()
+    y = y.tolist()
+    edges = edges.tolist()
+
+    keep = [0]
+    a = 0
+    for i in range(n_out - 2):
+        ax, ay, nx, ny = x[a], y[a], next_x[i], next_y[i]
+        best_area = -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs((ax - nx) * (y[j] - ay) - (ax - x[j]) * (ny - ay))
+            if area > best_area:
+                best_area, a = area, j
+        keep.append(a)
+    keep.append(n - 1)
+    return np.array(keep, dtype=np.int64)
+
+
+def progression_series(results_with_dates, per_meet=False, max_points=PROGRESSION_MAX_POINTS):
+    """
+    Ready-to-plot progression series for every (event, athlete).
+
+    Returns {event: {"higher_is_better": bool, "meets": [name, ...],
+    "series": {athlete: series}}} where each series holds date-sorted lists:
+    day (days since 1970-01-01), y (the result), best (PR to date),
+    season_best (season best to date) and meet (ids into that event's meets,
+    -1 if unknown). With per_meet only each meet's best mark is kept.
+    Series longer than max_points are downsampled with LTTB after the
+    running bests are computed, so the envelopes stay exact.
+    """
+    import numpy as np
+    import pandas as pd
+    columns = [c for c in ('ATHLETE', 'EVENT', 'MEET', 'DATE', RESULT_COLUMN, 'Season') if c in results_with_dates]
+    df = results_with_dates[columns].copy()
+    df['value'] = numeric_results(results_with_dates)
+    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+    df = df[df['value'].notna() & df['DATE'].notna()]
+    if len(df) == 0:
+        return {}
+
+    df['EVENT'] = df['EVENT'].astype(str)
+    higher = event_metadata(df['EVENT'])['higher_is_better']
+    df['higher'] = df['EVENT'].map(higher).astype(bool)
+    df['score'] = df['value'] * np.where(df['higher'], -1.0, 1.0)
+    df['season'] = season_labels(df)
+
+    if per_meet:
+        df = df.sort_values('score', kind='mergesort').drop_duplicates(['EVENT', 'ATHLETE', 'MEET', 'DATE'])
+
+    df = df.sort_values(['EVENT', 'ATHLETE', 'DATE'], kind='mergesort')
+    sign = np.where(df['higher'], -1.0, 1.0)
+    df['best'] = df.groupby(['EVENT', 'ATHLETE'], observed=True, sort=False)['score'].cummin() * sign
+    df['season_best'] = df.groupby(['EVENT', 'ATHLETE', 'season'], observed=True, sort=False)['score'].cummin() * sign
+    return progression_from_points(df, max_points)
+
+
+def progression_from_points(df, max_points=PROGRESSION_MAX_POINTS):
+    """
+    The progression_series of its points: EVENT, ATHLETE, MEET, DATE, value,
+    higher (whether higher is better in the event), best and season_best of
+    every mark plotted, sorted by event, athlete and date.
+    """
+    import numpy as np
+    import pandas as pd
+    if len(df) == 0:
+        return {}
+
+    # Series boundaries in the sorted frame; only long series are downsampled
+    event = df['EVENT'].to_numpy()
+    athlete = df['ATHLETE'].astype(str).to_numpy()
+    starts = np.flatnonzero(np.r_[True, (event[1:] != event[:-1]) | (athlete[1:] != athlete[:-1])])
+    ends = np.r_[starts[1:], len(df)]
+    if (ends - starts).max() > max_points:
+        days = df['DATE'].to_numpy().astype('datetime64[D]').astype(float)
+        values = df['value'].to_numpy()
+        keep = []
+        for start, end in zip(starts, ends):
+            if end - start > max_points:
+                keep.append(start + lttb_indices(days[start:end], values[start:end], max_points))
+            else:
+                keep.append(np.arange(start, end))
+        df = df.iloc[np.concatenate(keep)]
+        lengths = [len(k) for k in keep]
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+    # Meets are numbered within each event (rows of an event are contiguous)
+    meet_ids = np.empty(len(df), dtype=np.int64)
+    event_meets = {}
+    event = df['EVENT'].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, event[1:] != event[:-1], True])
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        meet_ids[start:end], names = pd.factorize(df['MEET'].iloc[start:end])
+        event_meets[event[start]] = [str(name) for name in names]
+
+    columns = {
+        "day": df['DATE'].to_numpy().astype('datetime64[D]').astype('int64').tolist(),
+        "y": df['value'].tolist(),
+        "best": df['best'].tolist(),
+        "season_best": df['season_best'].tolist(),
+        "meet": meet_ids.tolist(),
+    }
+    events = df['EVENT'].tolist()
+    athletes = df['ATHLETE'].astype(str).tolist()
+    higher = df['higher'].tolist()
+
+    progression = {}
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        event = events[start]
+        entry = progression.setdefault(event, {"higher_is_better": higher[start], "meets": event_meets[event],
+                                               "series": {}})
+        entry["series"][athletes[start]] = {name: values[start:end] for name, values in columns.items()}
+    return progression
+
+
+def age_group_codes(ages):
+    """Index into AGE_GROUPS of each age (the age an athlete turns that year); -1 if unknown"""
+    import numpy as np
+    ages = np.asarray(ages, dtype=float)
+    limits = [oldest for _, oldest in AGE_GROUPS if oldest is not None]
+    return np.where(np.isnan(ages), -1, np.searchsorted(limits, ages, side='left'))
+
+
+def athlete_details(athletes_df=None):
+    """
+    gender (the text, None if blank) and birth_year of the athletes of the
+    Athletes sheet, indexed by name as text; an athlete listed twice has the
+    details of their first row.
+    """
+    import numpy as np
+    import pandas as pd
+    if athletes_df is None or 'Athlete' not in athletes_df:
+        return pd.DataFrame({'gender': pd.Series(dtype=object), 'birth_year': pd.Series(dtype=float)})
+    people = athletes_df.drop_duplicates('Athlete')
+    gender = np.full(len(people), None, dtype=object)
+    birth_year = np.full(len(people), np.nan)
+    if 'Gender' in people:
+        text = people['Gender'].astype(object).where(people['Gender'].notna(), '').astype(str).str.strip()
+        gender = text.where(text != '', None).to_numpy(dtype=object)
+    if 'BirthDate' in people:
+        birth_year = pd.to_datetime(people['BirthDate'], errors='coerce').dt.year.to_numpy(dtype=float)
+    return pd.DataFrame({'gender': gender, 'birth_year': birth_year},
+                        index=pd.Index(people['Athlete'].astype(str), dtype=object))
+
+
+def compute_leaderboards(results_with_dates, athletes_df=None, size=LEADERBOARD_SIZE):
+    """
+    Top `size` athletes of every event per season, gender and age group.
+
+    Each athlete appears once per board, with their best mark for it (ties go
+    to the earliest date); marks are ranked by the event's scoring direction
+    and equal marks share a rank, so a board can run past `size`. Every
+    dimension also has boards that ignore it, labelled ALL (the ALL season is
+    all-time). Returns one row per place with EVENT, season, gender,
+    age_group, rank, ATHLETE, the original result, MEET and DATE, in board
+    and rank order.
+    """
+    import numpy as np
+    df, boards, names = _leaderboard_places(results_with_dates, athletes_df, size)
+    board = ['EVENT', 'season', 'gender', 'age_group']
+    marks = df[[RESULT_COLUMN, 'MEET', 'DATE']].iloc[boards['row'].to_numpy()].reset_index(drop=True)
+    boards = boards.reset_index(drop=True)
+    for column in board + ['ATHLETE']:
+        # -2 (ALL) picks the label appended after the names
+        labels = np.array(list(names[column]) + [ALL], dtype=object)
+        boards[column] = labels[np.where(boards[column] == -2, len(labels) - 1, boards[column])]
+    boards[[RESULT_COLUMN, 'MEET', 'DATE']] = marks
+    return boards[board + ['rank', 'ATHLETE', RESULT_COLUMN, 'MEET', 'DATE']].reset_index(drop=True)
+
+
+def leaderboard_entries(results_with_dates, athletes_df=None, size=LEADERBOARD_SIZE):
+    """
+    The results that place on a board of compute_leaderboards, in their
+    order. The boards of just these results are the same, so the boards of a
+    large history can be worked out a part of its athletes at a time: from
+    the entries of every part together, each part in the order the whole
+    history lists it.
+    """
+    import numpy as np
+    df, boards, _ = _leaderboard_places(results_with_dates, athletes_df, size)
+    return results_with_dates.iloc[np.unique(df['position'].to_numpy()[boards['row'].to_numpy()])]
+
+
+def _leaderboard_places(results_with_dates, athletes_df, size):
+    """
+    (results with a numeric mark, their places on the boards as codes into
+    names, names) for compute_leaderboards; `row` is the position of a
+    place's mark in those results and `position` of a result in results_with_dates.
+    """
+    import numpy as np
+    import pandas as pd
+    columns = [c for c in ('ATHLETE', 'EVENT', 'MEET', 'DATE', RESULT_COLUMN, 'Season') if c in results_with_dates]
+    df = results_with_dates[columns].copy()
+    df['value'] = numeric_results(results_with_dates)
+    df['position'] = np.arange(len(df))
+    df = df[df['value'].notna()]
+    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+
+    # Everything is grouped on integer codes (-1 = unknown, -2 = ALL), with
+    # the labels of each column kept in `names`; hashing strings is slow
+    names = {}
+    athlete, athletes = pd.factorize(df['ATHLETE'], sort=True)
+    names['ATHLETE'] = [str(name) for name in athletes]
+    event, events = pd.factorize(df['EVENT'].astype(str), sort=True)
+    names['EVENT'] = list(events)
+    higher = event_metadata(events)['higher_is_better'].to_numpy()
+    df['score'] = df['value'].to_numpy() * np.where(higher[event], -1.0, 1.0)
+
+    season, names['season'] = pd.factorize(result_seasons(df), sort=True)
+
+    # Gender and birth year are looked up once per athlete
+    people = athlete_details(athletes_df).reindex(names['ATHLETE'])
+    gender, genders = pd.factorize(people['gender'], sort=True)
+    names['gender'] = list(genders)
+    birth_year = people['birth_year'].to_numpy(dtype=float)
+    names['age_group'] = [label for label, _ in AGE_GROUPS]
+
+    dimensions = ['season', 'gender', 'age_group']
+    board = ['EVENT'] + dimensions
+    codes = pd.DataFrame({
+        'EVENT': event,
+        'season': season,
+        'gender': gender[athlete],
+        'age_group': age_group_codes(df['DATE'].dt.year.to_numpy(dtype=float) - birth_year[athlete]),
+        'ATHLETE': athlete,
+        'score': df['score'].to_numpy(),
+        'DATE': df['DATE'].to_numpy(),
+        'row': np.arange(len(df)),
+    })
+
+    # Each athlete's best per finest board first; coarser boards only pick
+    # among those bests, so the full results are sorted once
+    codes = codes.sort_values(['score', 'DATE'], na_position='last', kind='mergesort')
+    best = codes.drop_duplicates(board + ['ATHLETE'])
+
+    boards = []
+    for rollup in itertools.product((False, True), repeat=len(dimensions)):
+        part = best.copy()
+        for column, rolled in zip(dimensions, rollup):
+            if rolled:
+                part[column] = -2
+        # Unknown season/gender/age only count towards the ALL boards
+        part = part[(part[dimensions] != -1).all(axis=1)].drop_duplicates(board + ['ATHLETE'])
+        part['rank'] = part.groupby(board, sort=False)['score'].rank(method='min').astype(int)
+        boards.append(part[part['rank'] <= size])
+
+    boards = pd.concat(boards, ignore_index=True)
+    return df, boards.sort_values(board + ['rank', 'DATE'], na_position='last', kind='mergesort'), names
+
+
+def flag_marks(results_with_dates):
+    """
+    Which marks beat an athlete's earlier best or were their first in an
+    event, and how athlete-events changed from season to season (see
+    compute_meet_stats).
+
+    Only an athlete's own results in an event matter, so a large history can
+    be flagged a part of its athletes at a time. Returns (marks, changes):
+    marks holds ATHLETE, EVENT, MEET, DATE, season (see season_labels; None
+    without a date), row (position in results_with_dates) and flag of every
+    result - PR_FLAG, FIRST_FLAG, 0, or -1 for a result that is no meet entry
+    (no numeric mark, meet or date).
+
+    Earlier bests come from one cumulative-best scan over each athlete's
+    marks in an event, so the work grows with the number of results rather
+    than with their square.
+    """
+    import numpy as np
+    import pandas as pd
+    columns = [c for c in ('ATHLETE', 'EVENT', 'MEET', 'DATE', 'Season') if c in results_with_dates]
+    df = results_with_dates[columns].reset_index(drop=True)
+    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+    values = numeric_results(results_with_dates).to_numpy()
+    df['row'] = np.arange(len(df))
+
+    df['season'] = result_seasons(df)
+
+    # Everything below groups on integer codes (-1 = missing); meets are
+    # numbered by name, which decides between two meets on the same day
+    athlete = pd.factorize(df['ATHLETE'])[0]
+    event, events = pd.factorize(df['EVENT'].astype(str).where(df['EVENT'].notna(), None))
+    meet = pd.factorize(df['MEET'].astype(str).where(df['MEET'].notna(), None), sort=True)[0]
+    higher = event_metadata(pd.Index(events))['higher_is_better'].to_numpy(dtype=bool)
+    codes = pd.DataFrame({'athlete': athlete, 'event': event, 'meet': meet,
+                          'score': values * np.where(higher[event], -1.0, 1.0), 'DATE': df['DATE'].to_numpy(),
+                          'row': df['row'].to_numpy()})
+
+    # Each athlete's best mark per event and meet, in date order
+    marks = codes[(codes[['athlete', 'event', 'meet']] >= 0).all(axis=1) & codes['score'].notna()
+                  & codes['DATE'].notna()]
+    marks = marks.sort_values(['athlete', 'event', 'DATE', 'meet', 'score'], kind='mergesort')
+    best = marks.drop_duplicates(['athlete', 'event', 'DATE', 'meet'])
+    earlier = best.groupby(['athlete', 'event'], sort=False)['score'].cummin()
+    earlier = earlier.groupby([best['athlete'], best['event']], sort=False).shift(1)
+    flag = np.full(len(df), -1)
+    flag[marks['row'].to_numpy()] = 0
+    flag[best['row'].to_numpy()] = np.select([earlier.isna(), best['score'] < earlier], [FIRST_FLAG, PR_FLAG], 0)
+    df['flag'] = flag
+
+    # Season bests against the previous season of the same kind
+    season_best = (marks.assign(season=df['season'].to_numpy()[marks['row'].to_numpy()])
+                   .groupby(['athlete', 'event', 'season'], sort=False)['score'].min().reset_index())
+    season_best['previous'] = previous_seasons(season_best['season'])
+    pairs = season_best.merge(season_best[['athlete', 'event', 'season', 'score']],
+                              left_on=['athlete', 'event', 'previous'], right_on=['athlete', 'event', 'season'],
+                              suffixes=('', '_previous'))
+    pairs['change'] = (pairs['score_previous'] - pairs['score']) / pairs['score_previous'].abs() * 100
+    changes = pairs.loc[np.isfinite(pairs['change']), ['season', 'change']].reset_index(drop=True)
+    return df.drop(columns=[c for c in ('Season',) if c in df]), changes
+
+
+class TeamSummary:
+    """
+    The per-meet and per-season counts of compute_meet_stats, added up a
+    frame of flagged results (see flag_marks) at a time; frames come in the
+    order the results are listed.
+
+    Meets are kept by name, so a meet listed on several dates is one meet
+    over all of them, as in a full build. meets() counts the athletes and
+    events of the meets it lists and forgets their names, so going through a
+    large history a meet is only asked for once all its results are added.
+    """
+
+    def __init__(self):
+        self._meets = {}
+        self._seasons = {}
+
+    def add(self, marks):
+        import pandas as pd
+        entered = marks[marks['MEET'].notna().to_numpy()]
+        meet = entered['MEET'].astype(object).to_numpy()
+        grouped = entered.groupby(meet, sort=False)
+        flag = entered['flag'].to_numpy()
+        for name, date, season, athletes, events, results, prs, first_marks in zip(
+                grouped.size().index, grouped['DATE'].min(), grouped['season'].first(), grouped['ATHLETE'].unique(),
+                grouped['EVENT'].unique(), grouped.size(), pd.Series(flag == PR_FLAG).groupby(meet, sort=False).sum(),
+                pd.Series(flag == FIRST_FLAG).groupby(meet, sort=False).sum()):
+            counts = self._meets.get(name)
+            if counts is None:
+                counts = self._meets[name] = {"DATE": pd.NaT, "season": None, "athletes": set(), "events": set(),
+                                              "results": 0, "prs": 0, "first_marks": 0}
+            if pd.notna(date) and (pd.isna(counts["DATE"]) or date < counts["DATE"]):
+                counts["DATE"] = date
+            if counts["season"] is None and pd.notna(season):
+                counts["season"] = season
+            counts["athletes"].update(athletes)
+            counts["events"].update(events)
+            counts["results"] += int(results)
+            counts["prs"] += int(prs)
+            counts["first_marks"] += int(first_marks)
+
+        dated = marks[marks['season'].notna().to_numpy()]
+        season = dated['season'].to_numpy()
+        grouped = dated.groupby(season, sort=False)
+        for label, meets, athletes, results, prs, latest in zip(
+                grouped.size().index, grouped['MEET'].unique(), grouped['ATHLETE'].unique(), grouped.size(),
+                pd.Series(dated['flag'].to_numpy() == PR_FLAG).groupby(season, sort=False).sum(),
+                grouped['DATE'].max()):
+            counts = self._seasons.get(label)
+            if counts is None:
+                counts = self._seasons[label] = {"meets": set(), "athletes": set(), "results": 0, "prs": 0,
+                                                 "latest": pd.NaT}
+            counts["meets"].update(meet for meet in meets if pd.notna(meet))
+            counts["athletes"].update(athletes)
+            counts["results"] += int(results)
+            counts["prs"] += int(prs)
+            if pd.notna(latest) and (pd.isna(counts["latest"]) or latest > counts["latest"]):
+                counts["latest"] = latest
+
+    def meets(self, names=None):
+        """
+        Per meet: DATE (its first date), season, athletes, events, results,
+        prs and first_marks (see compute_meet_stats), newest first; or the
+        given meets, in that order.
+        """
+        import pandas as pd
+        newest_first = names is None
+        names = list(self._meets) if newest_first else list(names)
+        listed = [self._meets[name] for name in names]
+        for counts in listed:
+            for column in ("athletes", "events"):
+                if isinstance(counts[column], set):
+                    counts[column] = len(counts[column])
+        meets = pd.DataFrame({
+            'DATE': pd.to_datetime([counts["DATE"] for counts in listed]),
+            'season': pd.Series([counts["season"] for counts in listed], dtype=object),
+            **{column: [counts[column] for counts in listed]
+               for column in ("athletes", "events", "results", "prs", "first_marks")},
+        })
+        meets.index = pd.Index(names, dtype=object, name='MEET')
+        if newest_first:
+            meets = meets.sort_values('DATE', ascending=False, na_position='last', kind='mergesort')
+        return meets
+
+    def season_counts(self):
+        """Per season: meets, athletes, results, prs and latest (its last date), see compare_seasons"""
+        import pandas as pd
+        seasons = self._seasons.values()
+        return pd.DataFrame({
+            'meets': [len(counts["meets"]) for counts in seasons],
+            'athletes': [len(counts["athletes"]) for counts in seasons],
+            'results': [counts["results"] for counts in seasons],
+            'prs': [counts["prs"] for counts in seasons],
+            'latest': pd.to_datetime([counts["latest"] for counts in seasons]),
+        }, index=pd.Index(list(self._seasons), dtype=object))
+
+
+def compute_meet_stats(results_with_dates):
+    """
+    Team summaries per meet and per season, and the PRs set at each meet.
+
+    Returns {"entries": ..., "meets": ..., "seasons": ..., "changes": ...}:
+
+    entries  one row per result with a numeric mark: `row` (its position in
+             results_with_dates), MEET, and `flag` - PR_FLAG for the athlete's
+             best mark at the meet if it beat their earlier best in the
+             event, FIRST_FLAG for their first mark in the event, else 0
+    meets    per MEET: DATE, season, athletes, events, results, prs, first_marks
+    seasons  per season, newest first: meets, athletes, results, prs, and for
+             athlete-events also in the previous season of the same kind
+             ("Indoor 2023" for "Indoor 2024"): compared, improved (share
+             whose season best got better) and improvement (median change of
+             the season best in percent, positive = better)
+    changes  season and change of each of those athlete-events
+
+    See flag_marks and TeamSummary, which work these out a part of the
+    results at a time.
+    """
+    import pandas as pd
+    marks, changes = flag_marks(results_with_dates)
+    entered = marks[marks['flag'] >= 0]
+    entries = pd.DataFrame({'row': entered['row'].to_numpy(), 'MEET': entered['MEET'].to_numpy(),
+                            'flag': entered['flag'].to_numpy()})
+    summary = TeamSummary()
+    summary.add(marks)
+    return {"entries": entries, "meets": summary.meets(),
+            "seasons": compare_seasons(summary.season_counts(), changes), "changes": changes}
+
+
+def compare_seasons(seasons, changes):
+    """
+    Add compared, improved and improvement (see compute_meet_stats) to the
+    per-season counts, from the season and change of every athlete-event
+    compared with its previous season; newest season first.
+    """
+    compared = changes.groupby('season')['change']
+    seasons['compared'] = compared.size().reindex(seasons.index).fillna(0).astype(int)
+    seasons['improved'] = (changes['change'] > 0).groupby(changes['season']).mean().reindex(seasons.index) * 100
+    seasons['improvement'] = compared.median().reindex(seasons.index)
+    seasons = seasons.sort_values('latest', ascending=False, kind='mergesort').drop(columns='latest')
+    seasons.index.name = 'season'
+    return seasons
@@ -0,0 +1,372 @@
+"""
+Static profile pages per athlete (--athlete-pages)
+
+Only the pages of athletes whose results changed since the last build are
+rendered again (see athlete_hashes).
+"""
+import itertools
+import json
+import os
+import re
+import urllib.parse
+from html import escape
+
+from .aggregate import progression_series, season_labels
+from .cache import _generator_version
+from .load import run_jobs
+from .page import minify_chunk
+from .results import display_results, event_metadata, numeric_results
+from .schema import RESULT_COLUMN
+from .sections import pr_index, _runs
+from .shards import COMPRESSED_SUFFIXES, precompress, remove_compressed, write_if_changed
+from .templates import ATHLETE_PAGE
+
+
+# --athlete-pages writes one static profile page per athlete in this folder
+# next to the page, rendered this many athletes per process pool task
+ATHLETE_PAGE_DIR = "athletes"
+
+ATHLETE_PAGE_BATCH = 200
+
+# Kept in the athlete page folder: the file and a hash of the profile of each
+# athlete's page, so pages of athletes whose results did not change are not
+# rendered again
+ATHLETE_PAGE_LOG = "pages.json"
+
+
+def athlete_profiles(results_with_dates, athletes_df=None, per_meet=False, prs=None):
+    """
+    What each athlete's profile page shows:
+
+        {athlete: {"details": {"BirthDate": 'YYYY-MM-DD', "Gender": ...},
+                   "prs": [[event, result, meet, 'YYYY-MM-DD'], ...],
+                   "season_bests": [[season, event, result, meet, 'YYYY-MM-DD'], ...],
+                   "results": [['YYYY-MM-DD', event, result, meet], ...],
+                   "progression": {event: {"higher_is_better": bool, "day": [...], "y": [...], "best": [...]}}}}
+
+    Season bests are newest season first (by the athlete's last result in
+    it) and results newest first. Athletes are listed by name; everyone in
+    athletes_df or with a result gets a profile. prs: see pr_index; per_meet:
+    see progression_series.
+    """
+    import numpy as np
+    import pandas as pd
+    profiles = {}
+
+    def profile(athlete):
+        return profiles.setdefault(athlete, {"details": {}, "prs": [], "season_bests": [], "results": [],
+                                             "progression": {}})
+
+    if athletes_df is not None and 'Athlete' in athletes_df:
+        people = athletes_df[athletes_df['Athlete'].notna()].drop_duplicates('Athlete')
+        details = pd.DataFrame({
+            'BirthDate': (pd.to_datetime(people['BirthDate'], errors='coerce').dt.strftime('%Y-%m-%d')
+                          if 'BirthDate' in people else None),
+            'Gender': people['Gender'].astype(object) if 'Gender' in people else None,
+        }, index=people.index)
+        details = details.where(details.notna(), None).to_dict('records')
+        for athlete, detail in zip(people['Athlete'].astype(str).tolist(), details):
+            profile(athlete)["details"] = detail
+
+    # Rows are grouped by athlete with a stable sort, so each athlete's rows
+    # keep their order
+    results = results_with_dates[results_with_dates['ATHLETE'].notna()]
+    results = results.sort_values('ATHLETE', kind='mergesort')
+    records = pd.DataFrame({
+        'day': pd.to_datetime(results['DATE'], errors='coerce').dt.strftime('%Y-%m-%d').astype(object),
+        'EVENT': results['EVENT'].astype(object),
+        'result': display_results(results[RESULT_COLUMN]),
+        'MEET': results['MEET'].astype(object),
+    })
+    records = records.where(records.notna(), None).values.tolist()
+    for athlete, rows in _runs(results['ATHLETE'], records):
+        profile(athlete)["results"] = rows
+
+    for athlete, rows in pr_index(results_with_dates, prs).items():
+        profile(str(athlete))["prs"] = rows
+
+    # Best mark per athlete, event and season (ties go to the earliest date)
+    columns = [c for c in ('ATHLETE', 'EVENT', 'MEET', 'DATE', RESULT_COLUMN, 'Season') if c in results]
+    df = results[columns].copy()
+    df['value'] = numeric_results(results)
+    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+    df = df[df['value'].notna() & df['DATE'].notna()]
+    if len(df):
+        df['EVENT'] = df['EVENT'].astype(str)
+        higher = event_metadata(df['EVENT'])['higher_is_better']
+        df['score'] = df['value'] * np.where(df['EVENT'].map(higher).astype(bool), -1.0, 1.0)
+        df['season'] = season_labels(df)
+        # Seasons are ordered by the athlete's own last result in them, so a
+        # page only depends on that athlete's rows (see athlete_hashes)
+        df['season_end'] = df.groupby([df['ATHLETE'].astype(str), 'season'])['DATE'].transform('max')
+        df = df.sort_values(['score', 'DATE'], kind='mergesort').drop_duplicates(['ATHLETE', 'EVENT', 'season'])
+        df = df.sort_values(['ATHLETE', 'season_end', 'EVENT'], ascending=[True, False, True], kind='mergesort')
+        records = pd.DataFrame({
+            'season': df['season'].astype(object),
+            'EVENT': df['EVENT'].astype(object),
+            'result': display_results(df[RESULT_COLUMN]),
+            'MEET': df['MEET'].astype(object),
+            'day': df['DATE'].dt.strftime('%Y-%m-%d').astype(object),
+        })
+        records = records.where(records.notna(), None).values.tolist()
+        for athlete, rows in _runs(df['ATHLETE'], records):
+            profile(athlete)["season_bests"] = rows
+
+    for event, entry in progression_series(results_with_dates, per_meet).items():
+        for athlete, series in entry["series"].items():
+            profile(str(athlete))["progression"][event] = {"higher_is_better": entry["higher_is_better"],
+                                                           "day": series["day"], "y": series["y"],
+                                                           "best": series["best"]}
+    return dict(sorted(profiles.items()))
+
+
+def athlete_hashes(results_with_dates, athletes_df=None):
+    """
+    {athlete: hash of the rows their profile page is built from}, for
+    everyone athlete_profiles gives a profile.
+
+    Rows are hashed all at once and summed per athlete, so finding the pages
+    that need rendering costs far less than building every profile.
+    """
+    import pandas as pd
+    def summed(df, keys):
+        rows = pd.util.hash_pandas_object(df, index=False)
+        return rows.groupby(keys.astype(str).to_numpy(), sort=False).sum()
+
+    results = results_with_dates[results_with_dates['ATHLETE'].notna()]
+    columns = [c for c in ('EVENT', 'MEET', 'DATE', RESULT_COLUMN, 'Season') if c in results]
+    hashes = {athlete: f"{value:016x}" for athlete, value in summed(results[columns], results['ATHLETE']).items()}
+    if athletes_df is not None and 'Athlete' in athletes_df:
+        people = athletes_df[athletes_df['Athlete'].notna()].drop_duplicates('Athlete')
+        columns = [c for c in ('BirthDate', 'Gender') if c in people]
+        for athlete, value in summed(people[columns], people['Athlete']).items():
+            hashes[athlete] = hashes.get(athlete, "") + f":{value:016x}"
+    return hashes
+
+
+def athlete_page_files(athletes):
+    """{athlete: file name}: a readable slug of the name, numbered if two names give the same slug"""
+    files = {}
+    taken = {"index"}
+    for athlete in sorted(athletes):
+        slug = re.sub(r'[^a-z0-9]+', '-', str(athlete).lower()).strip('-') or 'athlete'
+        name = slug
+        number = 2
+        while name in taken:
+            name = f"{slug}-{number}"
+            number += 1
+        taken.add(name)
+        files[athlete] = f"{name}.html"
+    return files
+
+
+def format_mark(value, higher_is_better):
+    """A mark as the page's chart labels show it: meters, or seconds as M:SS.xx over a minute"""
+    if higher_is_better:
+        return f"{value:.2f} m"
+    minutes, seconds = divmod(value, 60)
+    return f"{int(minutes)}:{seconds:05.2f}" if minutes else f"{seconds:.2f}s"
+
+
+def progression_svg(series, higher_is_better, width=600, height=160):
+    """
+    Inline SVG chart of a progression series (see athlete_profiles): every
+    mark, and the PR to date as a step line. Better marks are higher up.
+    """
+    import numpy as np
+    left, right, top, bottom = 64, 10, 10, 24
+    days, values, best = series["day"], series["y"], series["best"]
+    # Plain lists: most series are a handful of points, too few for numpy to pay off
+    span = days[-1] - days[0]
+    x = [left + ((day - days[0]) / span if span else 0.5) * (width - left - right) for day in days]
+    low, high = min(values), max(values)
+    if low == high:
+        low, high = low - 1, high + 1
+    plot_height = (height - top - bottom) / (high - low)
+
+    def scale(marks):
+        if higher_is_better:
+            return [top + (high - v) * plot_height for v in marks]
+        return [top + (v - low) * plot_height for v in marks]
+
+    def points(xs, ys):
+        return " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(xs, ys))
+
+    marks_y, best_y = scale(values), scale(best)
+    better, worse = (high, low) if higher_is_better else (low, high)
+    first, last = (str(np.datetime64(int(day), 'D')) for day in (days[0], days[-1]))
+    parts = [
+        f'<svg viewBox="0 0 {width} {height}" role="img">',
+        f'<path d="M{left},{top}V{height - bottom}H{width - right}" stroke="#ddd" fill="none"/>',
+        f'<text class="axis" x="{left - 6}" y="{top + 8}" text-anchor="end">'
+        f'{format_mark(better, higher_is_better)}</text>',
+        f'<text class="axis" x="{left - 6}" y="{height - bottom}" text-anchor="end">'
+        f'{format_mark(worse, higher_is_better)}</text>',
+        f'<text class="axis" x="{left}" y="{height - 6}">{first}</text>',
+        f'<text class="axis" x="{width - right}" y="{height - 6}" text-anchor="end">{last}</text>',
+    ]
+    if len(days) == 1:
+        parts.append(f'<circle class="mark" cx="{x[0]:.1f}" cy="{marks_y[0]:.1f}" r="3"/>')
+    else:
+        # PR to date as steps: level until the next mark, then up to it
+        step_x = [x[0]] + [v for v in x[1:] for _ in (0, 1)]
+        step_y = [b for b in best_y[:-1] for _ in (0, 1)] + [best_y[-1]]
+        parts.append(f'<polyline class="marks" points="{points(x, marks_y)}"/>')
+        parts.append(f'<polyline class="best" points="{points(step_x, step_y)}"/>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _html_table(headers, rows):
+    # The cells are escaped in one go, with control characters standing in
+    # for the cell and row breaks
+    head = "".join(f"<th>{escape(header)}</th>" for header in headers)
+    text = "\x01".join("\x00".join(map(_cell_text, row)) for row in rows)
+    body = escape(text).replace("\x00", "</td><td>").replace("\x01", "</td></tr>\n<tr><td>")
+    body = f"<tr><td>{body}</td></tr>\n" if rows else ""
+    return f"<table>\n<thead><tr>{head}</tr></thead>\n<tbody>\n{body}</tbody>\n</table>\n"
+
+
+def _page_section(title, body):
+    return f'        <div class="section">\n            <h2>{title}</h2>\n{body}        </div>\n'
+
+
+def render_athlete_page(athlete, profile, dashboard):
+    """HTML of an athlete's profile page (see athlete_profiles); dashboard is the main page's URL"""
+    details = profile["details"]
+    facts = []
+    if details.get("Gender"):
+        facts.append(escape(str(details["Gender"])))
+    if details.get("BirthDate"):
+        facts.append(f"Born {details['BirthDate']}")
+    events = {record[1] for record in profile["results"]}
+    facts.append(f"{len(profile['results'])} results in {len(events)} events")
+
+    sections = []
+    if profile["prs"]:
+        sections.append(_page_section("Personal records", _html_table(
+            ("Event", "Result", "Meet", "Date"), profile["prs"])))
+    if profile["progression"]:
+        charts = "".join(f"<h3>{escape(event)}</h3>\n{progression_svg(series, series['higher_is_better'])}\n"
+                         for event, series in profile["progression"].items())
+        sections.append(_page_section("Progression", charts))
+    if profile["season_bests"]:
+        sections.append(_page_section("Season bests", _html_table(
+            ("Season", "Event", "Result", "Meet", "Date"), profile["season_bests"])))
+    if profile["results"]:
+        sections.append(_page_section("All results", _html_table(
+            ("Date", "Event", "Result", "Meet"), profile["results"])))
+    else:
+        sections.append(_page_section("Results", "<p>No results yet.</p>\n"))
+    return ATHLETE_PAGE.substitute(title=escape(athlete), dashboard=escape(dashboard), details=" &middot; ".join(facts),
+                                   sections="".join(sections))
+
+
+def render_athlete_pages(batch, dashboard, minify=False):
+    """Pages of a batch of (athlete, profile) pairs; one process pool task of write_athlete_pages"""
+    pages = [render_athlete_page(athlete, profile, dashboard) for athlete, profile in batch]
+    return [minify_chunk("html", page) for page in pages] if minify else pages
+
+
+def render_athlete_index(results_with_dates, files, dashboard):
+    """HTML of the athlete page folder's index.html: every athlete (files' keys) with a link to their page"""
+    import pandas as pd
+    results = results_with_dates[results_with_dates['ATHLETE'].notna()]
+    athletes = results['ATHLETE'].astype(str).to_numpy()
+    grouped = results.groupby(athletes, sort=False)
+    summary = pd.DataFrame({
+        'events': grouped['EVENT'].nunique(),
+        'results': grouped.size(),
+        'latest': pd.to_datetime(grouped['DATE'].max(), errors='coerce').dt.strftime('%Y-%m-%d'),
+    }).reindex(list(files))
+    summary['events'] = summary['events'].fillna(0).astype(int)
+    summary['results'] = summary['results'].fillna(0).astype(int)
+    summary['latest'] = summary['latest'].fillna('')
+
+    rows = [f'<tr><td><a href="{urllib.parse.quote(files[athlete])}">{escape(athlete)}</a></td>'
+            f'<td>{events}</td><td>{count}</td><td>{latest}</td></tr>\n'
+            for athlete, events, count, latest in zip(summary.index, summary['events'], summary['results'],
+                                                       summary['latest'])]
+    table = ("<table>\n<thead><tr><th>Athlete</th><th>Events</th><th>Results</th><th>Latest result</th></tr></thead>\n"
+             f"<tbody>\n{''.join(rows)}</tbody>\n</table>\n")
+    return ATHLETE_PAGE.substitute(title="Athletes", dashboard=escape(dashboard),
+                                   details=f"{len(files)} athletes", sections=_page_section("Athletes", table))
+
+
+def write_athlete_pages(results_with_dates, output_file, athletes_df=None, per_meet=False, prs=None, jobs=None,
+                        minify=False, compress=False):
+    """
+    Write a static profile page per athlete, plus an index.html of them all,
+    to ATHLETE_PAGE_DIR next to output_file.
+
+    Only pages of athletes whose rows changed since the last build (see
+    athlete_hashes) are rendered, in a process pool of `jobs` processes (see
+    run_jobs). Pages of athletes no longer in the data are removed. minify
+    and compress as for the main page. Returns the number of pages rendered.
+    """
+    folder = os.path.join(os.path.dirname(os.path.abspath(output_file)), ATHLETE_PAGE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    dashboard = f"../{urllib.parse.quote(os.path.basename(output_file))}"
+    hashes = athlete_hashes(results_with_dates, athletes_df)
+    files = athlete_page_files(hashes)
+
+    index = render_athlete_index(results_with_dates, files, dashboard)
+    write_if_changed(os.path.join(folder, "index.html"), minify_chunk("html", index) if minify else index)
+
+    # Any change to this script or to how pages are written renders every page again
+    version = f"{_generator_version()}:{dashboard}:{'per-meet' if per_meet else 'all'}{':minify' if minify else ''}"
+    log_path = os.path.join(folder, ATHLETE_PAGE_LOG)
+    try:
+        with open(log_path, encoding='utf-8') as f:
+            log = json.load(f)
+    except (OSError, ValueError):
+        log = {}
+    written = log.get("pages", {}) if log.get("version") == version else {}
+    stale = sorted(athlete for athlete in hashes
+                   if written.get(athlete) != [files[athlete], hashes[athlete]]
+                   or not os.path.exists(os.path.join(folder, files[athlete])))
+
+    if stale:
+        # Profiles are only built for the athletes whose pages are rendered
+        if len(stale) < len(hashes):
+            results_with_dates = results_with_dates[results_with_dates['ATHLETE'].astype(str).isin(stale)]
+            if athletes_df is not None and 'Athlete' in athletes_df:
+                athletes_df = athletes_df[athletes_df['Athlete'].astype(str).isin(stale)]
+            if prs is not None:
+                prs = prs[prs['ATHLETE'].astype(str).isin(stale)]
+        profiles = athlete_profiles(results_with_dates, athletes_df, per_meet, prs)
+        tasks = [([(athlete, profiles[athlete]) for athlete in stale[start:start + ATHLETE_PAGE_BATCH]], dashboard,
+                  minify)
+                 for start in range(0, len(stale), ATHLETE_PAGE_BATCH)]
+        pages = itertools.chain.from_iterable(run_jobs(render_athlete_pages, tasks, jobs))
+        for athlete, page in zip(stale, pages):
+            write_if_changed(os.path.join(folder, files[athlete]), page)
+
+    keep = set(files.values()) | {"index.html"}
+    removed = 0
+    for file_name in os.listdir(folder):
+        page = file_name
+        for suffix in COMPRESSED_SUFFIXES:
+            page = page.removesuffix(suffix)
+        if page.endswith(".html") and page not in keep:
+            os.remove(os.path.join(folder, file_name))
+            removed += file_name == page
+    for page in keep:
+        if compress:
+            precompress(os.path.join(folder, page))
+        else:
+            remove_compressed(os.path.join(folder, page))
+
+    write_if_changed(log_path, json.dumps(
+        {"version": version, "pages": {athlete: [files[athlete], hashes[athlete]] for athlete in hashes}},
+        ensure_ascii=False))
+    print(f"Athlete pages: {len(hashes)} athletes, {len(stale)} rendered, {removed} removed")
+    return len(stale)
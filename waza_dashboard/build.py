@@ -0,0 +1,251 @@
+"""
+The whole build
+
+Load, check, render and write the dashboard, reusing what an incremental
+cache holds; and watch mode's rebuild loop.
+"""
+import json
+import os
+import tempfile
+
+from .athletes import ATHLETE_PAGE_DIR, write_athlete_pages
+from .cache import (
+    BuildCache, MemoryCache, dataset_fingerprints, _generator_version, _section_key, workbook_fingerprints,
+)
+from .database import ResultsDatabase, import_workbooks
+from .load import find_workbooks, load_data, merge_results, sort_meets
+from .low_memory import render_low_memory
+from .page import ASSET_DIR, SERVICE_WORKER_FILE, results_date, write_page
+from .profiling import PROFILER
+from .results import print_validation, validate_results
+from .sections import PAGE_SECTIONS, SHARD_SECTIONS, payload_report, render_sections
+from .shards import COMPRESSED_SUFFIXES, SHARD_DIR, shards_exist
+
+
+EXCEL_FILE = "data to add.xlsx"
+
+OUTPUT_FILE = "index.html"
+
+PROFILE_FILE = "build-profile.json"
+
+
+def output_sizes(output_file):
+    """Bytes of the page and of its shard, asset and athlete page folders, with their precompressed copies"""
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    groups = {os.path.basename(output_file): [output_file] if os.path.exists(output_file) else []}
+    for folder in (SHARD_DIR, ASSET_DIR, ATHLETE_PAGE_DIR):
+        groups[f"{folder}/"] = [os.path.join(root, name) for root, _, names in os.walk(os.path.join(output_dir, folder))
+                                for name in names if not name.endswith(COMPRESSED_SUFFIXES)]
+    sizes = {}
+    for group, paths in groups.items():
+        entry = sizes[group] = {"files": len(paths), "raw": 0, **{suffix: 0 for suffix in COMPRESSED_SUFFIXES}}
+        for path in paths:
+            entry["raw"] += os.path.getsize(path)
+            for suffix in COMPRESSED_SUFFIXES:
+                if os.path.exists(path + suffix):
+                    entry[suffix] += os.path.getsize(path + suffix)
+    return sizes
+
+
+def output_files(output_file):
+    """
+    {path relative to the page's folder: (size, modification time)} of every
+    file the build writes: the page, the service worker, and everything in
+    the shard, asset and athlete page folders (with precompressed copies).
+
+    Files whose contents did not change are never rewritten, so comparing
+    this before and after a build tells which files changed.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    paths = [os.path.abspath(output_file), os.path.join(output_dir, SERVICE_WORKER_FILE)]
+    paths = [path + suffix for path in paths for suffix in ("",) + COMPRESSED_SUFFIXES]
+    for folder in (SHARD_DIR, ASSET_DIR, ATHLETE_PAGE_DIR):
+        paths += [os.path.join(root, name) for root, _, names in os.walk(os.path.join(output_dir, folder))
+                  for name in names]
+    files = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files[os.path.relpath(path, output_dir).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def print_output_changes(before, after, changes_file=None):
+    """
+    Print how many output files this build added, changed and removed (see
+    output_files); changes_file lists them, one "A|M|D<tab>path" line each,
+    for a deploy script to upload and delete just those.
+    """
+    changes = sorted([("A", path) for path in after.keys() - before.keys()]
+                     + [("M", path) for path in after.keys() & before.keys() if after[path] != before[path]]
+                     + [("D", path) for path in before.keys() - after.keys()], key=lambda change: change[1])
+    counts = {status: sum(1 for change in changes if change[0] == status) for status in "AMD"}
+    print(f"\nOutput: {counts['A']} added, {counts['M']} changed, {counts['D']} removed, "
+          f"{len(after) - counts['A'] - counts['M']} unchanged")
+    for status, path in changes[:10]:
+        print(f"  {status} {path}")
+    if len(changes) > 10:
+        print(f"  ... and {len(changes) - 10} more")
+    if changes_file:
+        with open(changes_file, 'w', encoding='utf-8') as f:
+            f.writelines(f"{status}\t{path}\n" for status, path in changes)
+        print(f"Changed files listed in {changes_file}")
+
+
+def print_size_report(before, after):
+    """Print the output sizes of this build next to the build it replaced (see output_sizes)"""
+    def kb(size):
+        return f"{size / 1024:,.1f} KB"
+
+    print("\nOutput size (previous build -> this build):")
+    for group, new in after.items():
+        old = before[group]
+        if not (old["files"] or new["files"]):
+            continue
+        change = f" ({(new['raw'] - old['raw']) / old['raw']:+.0%})" if old["raw"] else ""
+        line = (f"  {group:<12} {old['files']:>5} -> {new['files']:<5} files  "
+                f"{kb(old['raw'])} -> {kb(new['raw'])}{change}")
+        for suffix in COMPRESSED_SUFFIXES:
+            if old[suffix] or new[suffix]:
+                line += f", {suffix} {kb(old[suffix])} -> {kb(new[suffix])}"
+        print(line)
+
+
+def build_dashboard(inputs=EXCEL_FILE, output_file=OUTPUT_FILE, incremental=False, report_payload=False,
+                    mode="single", jobs=None, per_meet=False, cache=None, minify=False, compress=False,
+                    database=None, validation_report=None, athlete_pages=False, chunk_rows=None):
+    """
+    Build the dashboard; returns False if an incremental build found nothing to do.
+
+    inputs is a workbook, a directory of workbooks, or a list of either; all
+    workbooks are combined into one all-time dashboard. In "sharded" and "app"
+    mode the data shards (and the app mode's assets) are written next to output_file. per_meet plots each
+    athlete's best mark per meet instead of every result. cache replaces the
+    on-disk BuildCache that incremental builds use (watch mode passes a
+    MemoryCache). minify strips whitespace from the page; compress writes
+    .gz/.br copies of the page and shards. With a database (see
+    ResultsDatabase) the data is read from it and inputs are not used.
+    Every build checks the results (see validate_results) and prints what it
+    found; validation_report is a CSV file to list the flagged rows in.
+    athlete_pages also writes a profile page per athlete (see
+    write_athlete_pages). chunk_rows makes a low-memory build that reads the
+    Results sheets that many rows at a time (see render_low_memory); it
+    cannot be combined with a cache, a database, athlete_pages or
+    report_payload.
+    """
+    if chunk_rows is not None and (incremental or cache is not None or database is not None or athlete_pages
+                                   or report_payload):
+        raise ValueError("A low-memory build (chunk_rows) reads the workbooks in one pass; it cannot use a cache "
+                         "or a database, write athlete pages or report on the payload")
+    if database is not None:
+        workbooks = [database]
+        print(f"Loading results database {database}...")
+    else:
+        workbooks = find_workbooks(inputs)
+        print(f"Loading Excel data from {len(workbooks)} workbook(s)...")
+    page_sections = PAGE_SECTIONS[mode]
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+
+    if chunk_rows is not None:
+        with tempfile.TemporaryDirectory(prefix="dashboard-") as folder:
+            sections, updated = render_low_memory(workbooks, folder, output_dir, mode, per_meet, compress,
+                                                  chunk_rows, jobs, validation_report)
+            write_page(output_file, sections, updated, mode, minify, compress)
+        return True
+
+    if cache is None and incremental:
+        cache = BuildCache()
+    fingerprints = sheet_fingerprints = version = None
+    if cache is not None:
+        with PROFILER.stage("fingerprint"):
+            if database is not None:
+                with ResultsDatabase(database) as db:
+                    sheet_fingerprints = {os.path.abspath(database): db.fingerprints()}
+            else:
+                sheet_fingerprints = workbook_fingerprints(workbooks)
+            fingerprints = dataset_fingerprints(sheet_fingerprints)
+        version = (f"{_generator_version()}:{mode}:{'per-meet' if per_meet else 'all'}"
+                   f"{':minify' if minify else ''}{':compress' if compress else ''}"
+                   f"{':athlete-pages' if athlete_pages else ''}")
+        if cache.is_current(sheet_fingerprints, version, output_file):
+            print(f"No changes in {', '.join(workbooks)} since the last build - {output_file} left untouched")
+            return False
+
+    with PROFILER.stage("load"):
+        if database is not None:
+            with ResultsDatabase(database) as db:
+                frames = db.load(per_meet)
+        else:
+            frames = load_data(workbooks, sheet_fingerprints, cache, jobs)
+    print(f"Loaded: {len(frames['athletes'])} athletes, {len(frames['meets'])} meets, {len(frames['results'])} results")
+    with PROFILER.stage("validate"):
+        print_validation(validate_results(frames['results']), validation_report)
+    if report_payload:
+        meets_df = sort_meets(frames['meets'])
+        payload_report(merge_results(frames['results'], meets_df))
+
+    sections = {}
+    keys = {}
+    if cache is not None:
+        for section in page_sections:
+            keys[section] = _section_key(section, fingerprints, version, output_dir)
+            html = cache.get_section(section, keys[section])
+            # Another build may have rewritten or removed the shards since
+            if html is not None and section in SHARD_SECTIONS and not shards_exist(json.loads(html), output_dir):
+                html = None
+            if html is not None:
+                sections[section] = html
+
+    stale = set(page_sections) - set(sections)
+    if cache is not None:
+        print(f"Re-rendering {len(stale)} of {len(page_sections)} sections: {', '.join(sorted(stale)) or 'none'}")
+    rendered = render_sections(frames, stale, output_dir, mode, per_meet, compress)
+    if cache is not None:
+        # Cached sections have to be kept whole
+        rendered = {name: part if isinstance(part, str) else "".join(part)
+                    for name, part in rendered.items()}
+    sections.update(rendered)
+
+    write_page(output_file, sections, results_date(frames), mode, minify, compress)
+
+    if athlete_pages:
+        with PROFILER.stage("athlete pages"):
+            results_with_dates = frames.get("results_with_dates")
+            if results_with_dates is None:
+                meets_df = sort_meets(frames['meets'])
+                results_with_dates = merge_results(frames['results'], meets_df)
+            write_athlete_pages(results_with_dates, output_file, frames['athletes'], per_meet, frames.get("prs"),
+                                jobs, minify, compress)
+
+    if cache is not None:
+        cache.save(sheet_fingerprints, version, output_file,
+                   {name: (keys[name], html) for name, html in sections.items()})
+    return True
+
+
+def watch(inputs=EXCEL_FILE, output_file=OUTPUT_FILE, mode="single", jobs=None, per_meet=False, port=8000,
+          database=None, athlete_pages=False):
+    """
+    Rebuild the dashboard whenever a workbook is saved and serve it with live reload.
+
+    Parsed sheets and rendered sections stay in memory between builds, so a
+    save only re-parses the sheets and re-renders the sections it changed.
+    With a database, each save first imports the changed sheets into it and
+    the page is built from the database. Runs until Ctrl+C (see
+    waza_dashboard.watch.watch_and_serve).
+    """
+    from waza_dashboard.watch import watch_and_serve
+
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+    options = dict(mode=mode, jobs=jobs, per_meet=per_meet, cache=MemoryCache(), database=database,
+                   athlete_pages=athlete_pages)
+
+    def rebuild():
+        if database is not None:
+            import_workbooks(inputs, database, jobs)
+        return build_dashboard(inputs, output_file, **options)
+
+    rebuild()
+    watch_and_serve(inputs, output_file, rebuild, port)
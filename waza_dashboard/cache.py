@@ -0,0 +1,235 @@
+"""
+Incremental builds
+
+Sheets are fingerprinted without parsing any cells. BuildCache keeps the
+parsed sheets and the rendered sections of the last build, each keyed by the
+fingerprints of the sheets it depends on and by the generator's own code.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+
+from .schema import SHEETS
+from .sections import SECTION_INPUTS, SHARD_SECTIONS
+from .shards import shards_exist
+
+
+CACHE_DIR = ".dashboard_cache"
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _sheet_parts(zf):
+    """Map sheet name -> worksheet XML path inside the xlsx zip"""
+    rels = {}
+    for rel in ET.fromstring(zf.read("xl/_rels/workbook.xml.rels")):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = "xl/" + target
+        rels[rel.get("Id")] = target
+
+    parts = {}
+    for node in ET.fromstring(zf.read("xl/workbook.xml")).iter():
+        if _local_name(node.tag) != "sheet":
+            continue
+        rel_id = next((v for k, v in node.attrib.items() if _local_name(k) == "id"), None)
+        if rel_id in rels:
+            parts[node.get("name")] = rels[rel_id]
+    return parts
+
+
+def fingerprint_sheets(excel_file):
+    """
+    Hash every sheet of the workbook without parsing any cells.
+
+    A sheet's hash covers its worksheet XML, the shared strings it references
+    and the workbook styles (number formats decide what is a date), so editing
+    one sheet leaves the fingerprints of the others untouched.
+    """
+    with zipfile.ZipFile(excel_file) as zf:
+        names = set(zf.namelist())
+        styles = zf.read("xl/styles.xml") if "xl/styles.xml" in names else b""
+        shared = []
+        if "xl/sharedStrings.xml" in names:
+            shared = re.findall(rb"<si>.*?</si>", zf.read("xl/sharedStrings.xml"), re.S)
+
+        fingerprints = {}
+        for sheet_name, part in _sheet_parts(zf).items():
+            xml = zf.read(part)
+            h = hashlib.sha256(xml)
+            h.update(hashlib.sha256(styles).digest())
+            if shared:
+                used = re.findall(rb'<c [^>]*t="s"[^>]*>\s*<v>(\d+)</v>', xml)
+                for idx in sorted({int(i) for i in used}):
+                    if idx < len(shared):
+                        h.update(b"%d:" % idx + shared[idx])
+            fingerprints[sheet_name] = h.hexdigest()
+    return fingerprints
+
+
+def _generator_version():
+    # Any change to a module of this package (code or page templates)
+    # invalidates cached sections
+    package = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    for name in sorted(os.listdir(package)):
+        if name.endswith('.py'):
+            with open(os.path.join(package, name), 'rb') as f:
+                h.update(name.encode('utf-8') + b'\0' + f.read())
+    return h.hexdigest()
+
+
+def workbook_fingerprints(workbooks):
+    """{workbook: {dataset: sheet fingerprint}} ("" for a missing sheet)"""
+    fingerprints = {}
+    for workbook in workbooks:
+        sheet_hashes = fingerprint_sheets(workbook)
+        fingerprints[os.path.abspath(workbook)] = {
+            dataset: sheet_hashes.get(sheet, "") for dataset, sheet in SHEETS.items()
+        }
+    return fingerprints
+
+
+def dataset_fingerprints(fingerprints):
+    """One fingerprint per dataset covering that sheet in every workbook, in order"""
+    combined = {}
+    for dataset in SHEETS:
+        h = hashlib.sha256()
+        for workbook, sheets in fingerprints.items():
+            h.update(f"{workbook}\0{sheets[dataset]}\0".encode('utf-8'))
+        combined[dataset] = h.hexdigest()
+    return combined
+
+
+def _section_key(section, fingerprints, version, output_dir="."):
+    h = hashlib.sha256(version.encode())
+    for name in SECTION_INPUTS[section]:
+        h.update(fingerprints[name].encode())
+    if section in SHARD_SECTIONS:
+        h.update(f"\0{os.path.abspath(output_dir)}".encode('utf-8'))
+    return h.hexdigest()
+
+
+class BuildCache:
+    """
+    On-disk cache of parsed sheets and rendered page sections
+
+    Layout of CACHE_DIR:
+        manifest.json             sheet fingerprints and output of the last build
+        <dataset>-<workbook>.pkl  cleaned DataFrame for each sheet of each workbook
+        sections.pkl              rendered HTML/JSON fragment for each section
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.manifest = self._read_json("manifest.json") or {}
+        self._sections = None
+
+    @property
+    def sections(self):
+        # Only read once a build needs its sections or the shards they list
+        if self._sections is None:
+            self._sections = self._read_pickle("sections.pkl") or {}
+        return self._sections
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _read_json(self, name):
+        try:
+            with open(self._path(name), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_pickle(self, name):
+        # Plain pickle: the sections are only text, so reading them (all a
+        # build that finds nothing changed does) never imports pandas
+        try:
+            with open(self._path(name), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def is_current(self, fingerprints, version, output_file):
+        return (
+            os.path.exists(output_file)
+            and self.manifest.get("version") == version
+            and self.manifest.get("output") == os.path.abspath(output_file)
+            and self.manifest.get("sheets") == fingerprints
+            and self.shards_current(os.path.dirname(os.path.abspath(output_file)))
+        )
+
+    def shards_current(self, output_dir):
+        """Whether the shards of the cached shard/app manifest are all still in output_dir"""
+        return all(shards_exist(json.loads(html), output_dir)
+                   for section, (key, html) in self.sections.items() if section in SHARD_SECTIONS)
+
+    @staticmethod
+    def _frame_name(workbook, dataset):
+        workbook_id = hashlib.sha1(os.path.abspath(workbook).encode('utf-8')).hexdigest()[:12]
+        return f"{dataset}-{workbook_id}.pkl"
+
+    def load_frame(self, workbook, dataset, fingerprint):
+        cached = self.manifest.get("sheets", {}).get(os.path.abspath(workbook), {})
+        if cached.get(dataset) != fingerprint:
+            return None
+        return self._read_pickle(self._frame_name(workbook, dataset))
+
+    def store_frame(self, workbook, dataset, df):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        df.to_pickle(self._path(self._frame_name(workbook, dataset)))
+
+    def get_section(self, section, key):
+        cached = self.sections.get(section)
+        if cached and cached[0] == key:
+            return cached[1]
+        return None
+
+    def save(self, fingerprints, version, output_file, sections):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._path("sections.pkl"), 'wb') as f:
+            pickle.dump(sections, f, protocol=pickle.HIGHEST_PROTOCOL)
+        manifest = {
+            "version": version,
+            "output": os.path.abspath(output_file),
+            "sheets": fingerprints,
+        }
+        with open(self._path("manifest.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+
+class MemoryCache(BuildCache):
+    """BuildCache kept in memory, for watch mode's repeated rebuilds"""
+
+    def __init__(self):
+        self.manifest = {}
+        self._sections = {}
+        self.frames = {}
+
+    def load_frame(self, workbook, dataset, fingerprint):
+        cached = self.manifest.get("sheets", {}).get(os.path.abspath(workbook), {})
+        if cached.get(dataset) != fingerprint:
+            return None
+        return self.frames.get((os.path.abspath(workbook), dataset))
+
+    def store_frame(self, workbook, dataset, df):
+        self.frames[os.path.abspath(workbook), dataset] = df
+
+    def save(self, fingerprints, version, output_file, sections):
+        self._sections = sections
+        self.manifest = {
+            "version": version,
+            "output": os.path.abspath(output_file),
+            "sheets": fingerprints,
+        }
+        # Forget workbooks that are no longer part of the build
+        self.frames = {key: df for key, df in self.frames.items() if key[0] in fingerprints}
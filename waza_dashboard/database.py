@@ -0,0 +1,461 @@
+"""
+SQLite results database (--db)
+
+Workbooks are imported sheet by sheet, skipping sheets that have not
+changed since the last import; builds then read the combined datasets back
+from the database.
+"""
+import itertools
+import json
+import os
+import sqlite3
+import time
+
+from .aggregate import (AGE_GROUPS, FIRST_FLAG, LEADERBOARD_SIZE, PR_FLAG, athlete_details, compare_seasons,
+                        compute_leaderboards, previous_seasons, progression_from_points, result_seasons)
+from .cache import workbook_fingerprints
+from .load import apply_schema, find_workbooks, parse_sheet, run_jobs
+from .profiling import PROFILER
+from .results import event_metadata, numeric_results
+from .schema import RESULT_COLUMN, SHEETS, VALUE_COLUMN
+
+
+# Every row remembers the workbook (source) it was imported from, so
+# re-importing a changed sheet replaces just that workbook's rows. Dates are
+# stored as 'YYYY-MM-DD HH:MM:SS' text; results as entered (numbers, or the
+# text of Excel time cells) plus their value in seconds or meters.
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    sheets TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS athletes (
+    source INTEGER NOT NULL REFERENCES sources (id),
+    name TEXT NOT NULL,
+    birth_date TEXT,
+    gender TEXT
+);
+CREATE TABLE IF NOT EXISTS meets (
+    source INTEGER NOT NULL REFERENCES sources (id),
+    name TEXT NOT NULL,
+    date TEXT,
+    season TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    source INTEGER NOT NULL REFERENCES sources (id),
+    athlete TEXT NOT NULL,
+    event TEXT NOT NULL,
+    meet TEXT,
+    result,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS events (
+    name TEXT PRIMARY KEY,
+    higher_is_better INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    dataset TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS athletes_name ON athletes (name);
+CREATE INDEX IF NOT EXISTS athletes_source ON athletes (source);
+CREATE INDEX IF NOT EXISTS meets_name ON meets (name, date);
+CREATE INDEX IF NOT EXISTS meets_date ON meets (date);
+CREATE INDEX IF NOT EXISTS meets_source ON meets (source);
+CREATE INDEX IF NOT EXISTS results_athlete ON results (athlete, event);
+CREATE INDEX IF NOT EXISTS results_event ON results (event, value);
+CREATE INDEX IF NOT EXISTS results_meet ON results (meet);
+CREATE INDEX IF NOT EXISTS results_source ON results (source);
+"""
+
+# The rows that count, combined across workbooks like combine_workbooks:
+# athletes and meets from the last imported workbook listing them, results
+# from the first (repeats inside one workbook stay). Worked out once per
+# load into temporary tables that the queries of the load share.
+DB_KEPT = """
+DROP TABLE IF EXISTS temp.kept_athletes;
+DROP TABLE IF EXISTS temp.kept_meets;
+DROP TABLE IF EXISTS temp.kept_results;
+CREATE TEMP TABLE kept_athletes AS
+    SELECT * FROM (
+        SELECT athletes.*, athletes.rowid AS row_id,
+               ROW_NUMBER() OVER (PARTITION BY name ORDER BY source DESC, rowid DESC) AS copy
+        FROM athletes)
+    WHERE copy = 1;
+CREATE TEMP TABLE kept_meets AS
+    SELECT * FROM (
+        SELECT meets.*, meets.rowid AS row_id,
+               ROW_NUMBER() OVER (PARTITION BY name, date ORDER BY source DESC, rowid DESC) AS copy
+        FROM meets)
+    WHERE copy = 1;
+CREATE INDEX temp.kept_meets_name ON kept_meets (name);
+CREATE TEMP TABLE kept_results AS
+    SELECT * FROM (
+        SELECT results.*, results.rowid AS row_id,
+               MIN(source) OVER (PARTITION BY athlete, meet, event, result) AS first_source
+        FROM results)
+    WHERE source = first_source;
+"""
+
+# With a single workbook imported nothing needs combining
+DB_KEPT_SINGLE = """
+DROP TABLE IF EXISTS temp.kept_athletes;
+DROP TABLE IF EXISTS temp.kept_meets;
+DROP TABLE IF EXISTS temp.kept_results;
+CREATE TEMP TABLE kept_athletes AS SELECT athletes.*, athletes.rowid AS row_id FROM athletes;
+CREATE TEMP TABLE kept_meets AS SELECT meets.*, meets.rowid AS row_id FROM meets;
+CREATE INDEX temp.kept_meets_name ON kept_meets (name);
+CREATE TEMP TABLE kept_results AS SELECT results.*, results.rowid AS row_id FROM results;
+"""
+
+# The results joined to their meets (a result repeats for every date its
+# meet is listed on), numbered in the order sort_results lists them; with
+# each result's season (see season_labels), the year of its meet and the
+# season before (see previous_seasons) from meet_details, and its athlete's
+# gender and birth year (see athlete_details) from people. score is the
+# value with lower = better.
+DB_MERGED = """
+DROP TABLE IF EXISTS temp.merged;
+CREATE TEMP TABLE merged AS
+    SELECT r.source, r.row_id, r.athlete, r.event, r.meet, r.result, r.value,
+           m.name AS meet_name, m.date, m.season AS meet_season, d.season, d.year, d.previous,
+           p.gender, p.birth_year, e.higher_is_better AS higher,
+           CASE WHEN e.higher_is_better THEN r.value * -1.0 ELSE r.value END AS score,
+           ROW_NUMBER() OVER (ORDER BY m.date IS NULL, m.date DESC, r.meet IS NULL, r.meet, r.event, r.athlete,
+                                       r.value IS NULL, r.value, r.source, r.row_id) - 1 AS position,
+           ROW_NUMBER() OVER (PARTITION BY r.row_id ORDER BY m.row_id) AS copy
+    FROM kept_results r
+    LEFT JOIN kept_meets m ON m.name = r.meet
+    LEFT JOIN meet_details d ON d.row_id = m.row_id
+    LEFT JOIN people p ON p.name = r.athlete
+    LEFT JOIN events e ON e.name = r.event;
+CREATE INDEX temp.merged_position ON merged (position);
+"""
+
+# The flag of every meet entry (see flag_marks): an athlete's best mark of
+# a meet against the best of their earlier meets in the event
+DB_FLAGS = f"""
+DROP TABLE IF EXISTS temp.flags;
+CREATE TEMP TABLE flags AS
+    WITH entered AS (
+        SELECT position, athlete, event, meet, date, score,
+               ROW_NUMBER() OVER (PARTITION BY athlete, event, date, meet ORDER BY score, position) AS pick
+        FROM merged
+        WHERE meet IS NOT NULL AND date IS NOT NULL AND score IS NOT NULL),
+    bests AS (
+        SELECT position, score,
+               MIN(score) OVER (PARTITION BY athlete, event ORDER BY date, meet
+                                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS earlier
+        FROM entered
+        WHERE pick = 1)
+    SELECT e.position, e.meet,
+           CASE WHEN b.position IS NULL THEN 0
+                WHEN b.earlier IS NULL THEN {FIRST_FLAG}
+                WHEN b.score < b.earlier THEN {PR_FLAG}
+                ELSE 0 END AS flag
+    FROM entered e LEFT JOIN bests b ON b.position = e.position;
+CREATE INDEX temp.flags_position ON flags (position);
+"""
+
+# The per-meet and per-season counts of TeamSummary, and the season-best
+# changes of flag_marks
+DB_MEET_COUNTS = f"""
+SELECT meet AS MEET, MIN(date) AS DATE, MAX(first_season) AS season,
+       COUNT(DISTINCT athlete) AS athletes, COUNT(DISTINCT event) AS events, COUNT(*) AS results,
+       COUNT(CASE WHEN flag = {PR_FLAG} THEN 1 END) AS prs,
+       COUNT(CASE WHEN flag = {FIRST_FLAG} THEN 1 END) AS first_marks
+FROM (
+    SELECT r.position, r.meet, r.date, r.athlete, r.event, f.flag,
+           FIRST_VALUE(r.season) OVER (PARTITION BY r.meet ORDER BY r.season IS NULL, r.position) AS first_season
+    FROM merged r LEFT JOIN flags f ON f.position = r.position
+    WHERE r.meet IS NOT NULL)
+GROUP BY meet
+ORDER BY MIN(date) IS NULL, MIN(date) DESC, MIN(position)
+"""
+
+DB_SEASON_COUNTS = f"""
+SELECT r.season, COUNT(DISTINCT r.meet) AS meets, COUNT(DISTINCT r.athlete) AS athletes, COUNT(*) AS results,
+       COUNT(CASE WHEN f.flag = {PR_FLAG} THEN 1 END) AS prs, MAX(r.date) AS latest
+FROM merged r LEFT JOIN flags f ON f.position = r.position
+WHERE r.season IS NOT NULL
+GROUP BY r.season
+ORDER BY MIN(r.position)
+"""
+
+DB_SEASON_CHANGES = """
+WITH bests AS (
+    SELECT athlete, event, season, MAX(previous) AS previous, MIN(score) AS score
+    FROM merged
+    WHERE meet IS NOT NULL AND date IS NOT NULL AND score IS NOT NULL
+    GROUP BY athlete, event, season)
+SELECT b.season, (p.score - b.score) / ABS(p.score) * 100 AS change
+FROM bests b JOIN bests p ON p.athlete = b.athlete AND p.event = b.event AND p.season = b.previous
+WHERE (p.score - b.score) / ABS(p.score) * 100 IS NOT NULL
+"""
+
+# The points of progression_series with the running bests; {keep} and
+# {order} pick and order the marks of a day at a meet
+DB_PROGRESSION = """
+SELECT event AS EVENT, athlete AS ATHLETE, meet AS MEET, date AS DATE, value, higher,
+       MIN(score) OVER (PARTITION BY event, athlete ORDER BY date, {order} ROWS UNBOUNDED PRECEDING)
+           * (CASE WHEN higher THEN -1.0 ELSE 1.0 END) AS best,
+       MIN(score) OVER (PARTITION BY event, athlete, season ORDER BY date, {order} ROWS UNBOUNDED PRECEDING)
+           * (CASE WHEN higher THEN -1.0 ELSE 1.0 END) AS season_best
+FROM (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY event, athlete, meet, date ORDER BY score, position) AS pick
+    FROM merged
+    WHERE value IS NOT NULL AND date IS NOT NULL)
+WHERE {keep}
+ORDER BY event, athlete, date, {order}
+"""
+
+# Best mark per athlete and event; ties go to the earliest date (see compute_prs)
+DB_PRS = f"""
+SELECT athlete AS ATHLETE, event AS EVENT, result AS "{RESULT_COLUMN}", meet AS MEET, date AS DATE,
+       value AS "{VALUE_COLUMN}"
+FROM (
+    SELECT *, ROW_NUMBER() OVER (
+                  PARTITION BY athlete, event
+                  ORDER BY score, date IS NULL, date, meet IS NULL, meet, position) AS place
+    FROM merged
+    WHERE value IS NOT NULL)
+WHERE place = 1
+ORDER BY athlete, event
+"""
+
+# The results that can place on a board of compute_leaderboards: the marks
+# equal to an athlete's best on a board of one season, gender and age group
+# that ranks in the top {size} there. Boards that roll these up rank the
+# athlete no higher, so their places come from these marks too.
+DB_LEADERBOARD_ENTRIES = """
+WITH scored AS MATERIALIZED (
+    SELECT position, athlete, score,
+           DENSE_RANK() OVER (ORDER BY event, season, gender, age_group) AS board
+    FROM (SELECT *, CASE WHEN year - birth_year IS NULL THEN -1 {age_groups} END AS age_group
+          FROM merged
+          WHERE score IS NOT NULL)),
+places AS (
+    SELECT board, athlete, best, RANK() OVER (PARTITION BY board ORDER BY best) AS place
+    FROM (SELECT board, athlete, MIN(score) AS best FROM scored GROUP BY board, athlete))
+SELECT s.position
+FROM scored s JOIN places p ON p.board = s.board AND p.athlete = s.athlete
+WHERE s.score = p.best AND p.place <= {size}
+ORDER BY s.position
+"""
+
+# Columns of each dataset as the workbook sheets name them
+DB_COLUMNS = {
+    "athletes": {"name": "Athlete", "birth_date": "BirthDate", "gender": "Gender"},
+    "meets": {"name": "Meet", "date": "DATE", "season": "Season"},
+    "results": {"athlete": "ATHLETE", "event": "EVENT", "meet": "MEET", "result": RESULT_COLUMN,
+                "value": VALUE_COLUMN},
+}
+
+
+def _db_values(df, column):
+    """A sheet column as values SQLite can store (None for blanks, dates as text)"""
+    import pandas as pd
+    if column not in df:
+        return [None] * len(df)
+    values = df[column]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        values = values.dt.strftime('%Y-%m-%d %H:%M:%S')
+    values = values.astype(object)
+    # Numbers stay numbers; names, categories and Excel time cells become text
+    return [v if v is None or isinstance(v, (int, float)) else str(v)
+            for v in values.where(values.notna(), None).tolist()]
+
+
+class ResultsDatabase:
+    """
+    SQLite store of the Athletes, Events and Results sheets of any number of workbooks
+
+    Sheets are imported with replace_sheet (only the ones whose fingerprint
+    changed need to be); load reads the combined datasets back with the
+    results already joined to their meets, and personal records worked out
+    by an indexed query. load always reads every row: the build renders only
+    the sections whose datasets changed, but they need the other datasets too.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(DB_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _source(self, workbook):
+        path = os.path.abspath(workbook)
+        self.conn.execute("INSERT OR IGNORE INTO sources (path) VALUES (?)", (path,))
+        return self.conn.execute("SELECT id, sheets FROM sources WHERE path = ?", (path,)).fetchone()
+
+    def sheet_fingerprint(self, workbook, dataset):
+        """Fingerprint of the sheet as last imported from workbook (None if never imported)"""
+        row = self.conn.execute("SELECT sheets FROM sources WHERE path = ?",
+                                (os.path.abspath(workbook),)).fetchone()
+        return json.loads(row[0]).get(dataset) if row else None
+
+    def replace_sheet(self, workbook, dataset, df, fingerprint):
+        """
+        Replace the rows workbook's sheet gave dataset with df (a cleaned
+        sheet, or None if the sheet is missing) in one transaction.
+        """
+        columns = DB_COLUMNS[dataset]
+        with self.conn:
+            source, sheets = self._source(workbook)
+            self.conn.execute(f"DELETE FROM {dataset} WHERE source = ?", (source,))
+            if df is not None and len(df):
+                if dataset == "results":
+                    df = df.assign(**{VALUE_COLUMN: numeric_results(df)})
+                    events = event_metadata(df['EVENT'])
+                    self.conn.executemany(
+                        "INSERT INTO events (name, higher_is_better) VALUES (?, ?) "
+                        "ON CONFLICT (name) DO UPDATE SET higher_is_better = excluded.higher_is_better",
+                        zip(events.index, events['higher_is_better'].astype(int).tolist()))
+                values = [_db_values(df, sheet_column) for sheet_column in columns.values()]
+                self.conn.executemany(
+                    f"INSERT INTO {dataset} (source, {', '.join(columns)}) VALUES (?{', ?' * len(columns)})",
+                    zip(itertools.repeat(source), *values))
+            sheets = json.loads(sheets)
+            sheets[dataset] = fingerprint
+            self.conn.execute("UPDATE sources SET sheets = ? WHERE id = ?", (json.dumps(sheets), source))
+            self.conn.execute("INSERT INTO revisions (dataset, revision) VALUES (?, 1) "
+                              "ON CONFLICT (dataset) DO UPDATE SET revision = revision + 1", (dataset,))
+
+    def fingerprints(self):
+        """{dataset: revision}; a revision changes whenever an import changes the dataset"""
+        revisions = dict(self.conn.execute("SELECT dataset, revision FROM revisions"))
+        return {dataset: str(revisions.get(dataset, 0)) for dataset in SHEETS}
+
+    def _query(self, sql):
+        import pandas as pd
+        return pd.read_sql_query(sql, self.conn)
+
+    def load(self, per_meet=False):
+        """
+        The combined datasets as load_data returns them, plus what the build
+        would otherwise work out from them, aggregated by queries:
+
+            results_with_dates  results joined to their meets, newest first (see merge_results)
+            prs                 personal records (see compute_prs)
+            meet_stats          team summaries (see compute_meet_stats)
+            progression         progression series (see progression_series; per_meet as there)
+            leaderboards        leaderboards (see compute_leaderboards), from just the results
+                                that can place on them
+        """
+        import numpy as np
+        import pandas as pd
+        def select(dataset, table):
+            return ", ".join(f'{table}.{column} AS "{name}"' for column, name in DB_COLUMNS[dataset].items())
+
+        sources = self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        self.conn.executescript(DB_KEPT_SINGLE if sources <= 1 else DB_KEPT)
+
+        frames = {
+            "athletes": self._query(f"SELECT {select('athletes', 'a')} FROM kept_athletes a ORDER BY source, row_id"),
+            "meets": self._query(f"SELECT a.row_id, {select('meets', 'a')} FROM kept_meets a ORDER BY source, row_id"),
+        }
+        results = self.conn.execute("SELECT COUNT(*) FROM kept_results").fetchone()[0]
+        for dataset, rows in (("athletes", len(frames["athletes"])), ("meets", len(frames["meets"])),
+                              ("results", results)):
+            if rows == 0:
+                raise ValueError(f"The database {self.path} has no {SHEETS[dataset]} rows (import a workbook first)")
+        for name in ("athletes", "meets"):
+            frames[name] = apply_schema(name, frames[name])
+
+        # Seasons and athlete details are worked out here, once per meet and athlete
+        meets = frames["meets"]
+        seasons = pd.Series(result_seasons(meets), dtype=object)
+        self.conn.executescript("""
+            DROP TABLE IF EXISTS temp.meet_details;
+            DROP TABLE IF EXISTS temp.people;
+            CREATE TEMP TABLE meet_details (row_id INTEGER PRIMARY KEY, season TEXT, year REAL, previous TEXT);
+            CREATE TEMP TABLE people (name TEXT PRIMARY KEY, gender TEXT, birth_year REAL);""")
+        self.conn.executemany("INSERT INTO meet_details VALUES (?, ?, ?, ?)", zip(
+            meets.pop('row_id').tolist(), seasons.tolist(),
+            pd.to_datetime(meets['DATE'], errors='coerce').dt.year.astype(object).where(seasons.notna(), None).tolist(),
+            previous_seasons(seasons).astype(object).where(seasons.notna(), None).tolist()))
+        people = athlete_details(frames["athletes"])
+        self.conn.executemany("INSERT INTO people VALUES (?, ?, ?)", zip(
+            people.index.tolist(), people['gender'].tolist(),
+            people['birth_year'].astype(object).where(people['birth_year'].notna(), None).tolist()))
+
+        with PROFILER.stage("merge"):
+            self.conn.executescript(DB_MERGED)
+            # The page lists every result, so they are read once, in order
+            merged = self._query(f"""
+                SELECT source, row_id, copy, athlete AS ATHLETE, event AS EVENT, meet AS MEET,
+                       result AS "{RESULT_COLUMN}", value AS "{VALUE_COLUMN}",
+                       meet_name AS Meet, date AS DATE, meet_season AS Season
+                FROM merged ORDER BY position""")
+            first = merged[merged.pop('copy').to_numpy() == 1]
+            order = np.lexsort((first['row_id'].to_numpy(), first['source'].to_numpy()))
+            frames["results"] = apply_schema("results", first.iloc[order][list(DB_COLUMNS["results"].values())]
+                                             .reset_index(drop=True))
+            frames["results_with_dates"] = apply_schema("results", apply_schema(
+                "meets", merged.drop(columns=['source', 'row_id'])))
+        results_with_dates = frames["results_with_dates"]
+
+        with PROFILER.stage("aggregate"):
+            frames["prs"] = self._query(DB_PRS)
+            frames["prs"]["DATE"] = pd.to_datetime(frames["prs"]["DATE"], errors='coerce')
+
+            self.conn.executescript(DB_FLAGS)
+            meet_counts = self._query(DB_MEET_COUNTS).set_index('MEET')
+            meet_counts.index = meet_counts.index.astype(object)
+            meet_counts['DATE'] = pd.to_datetime(meet_counts['DATE'])
+            meet_counts['season'] = meet_counts['season'].astype(object).where(meet_counts['season'].notna(), None)
+            season_counts = self._query(DB_SEASON_COUNTS).set_index('season')
+            season_counts.index = pd.Index(season_counts.index, dtype=object, name=None)
+            season_counts['latest'] = pd.to_datetime(season_counts['latest'])
+            changes = self._query(DB_SEASON_CHANGES)
+            frames["meet_stats"] = {
+                "entries": self._query("SELECT position AS row, meet AS MEET, flag FROM flags ORDER BY position"),
+                "meets": meet_counts,
+                "seasons": compare_seasons(season_counts, changes),
+                "changes": changes,
+            }
+
+            points = self._query(DB_PROGRESSION.format(keep="pick = 1" if per_meet else "1",
+                                                       order="score, position" if per_meet else "position"))
+            points['DATE'] = pd.to_datetime(points['DATE'])
+            points['higher'] = points['higher'].astype(bool)
+            frames["progression"] = progression_from_points(points)
+
+            age_groups = " ".join(f"WHEN year - birth_year <= {oldest} THEN {code}"
+                                  for code, (_, oldest) in enumerate(AGE_GROUPS) if oldest is not None)
+            entries = self._query(DB_LEADERBOARD_ENTRIES.format(
+                age_groups=f"{age_groups} ELSE {len(AGE_GROUPS) - 1}", size=LEADERBOARD_SIZE))
+            frames["leaderboards"] = compute_leaderboards(results_with_dates.iloc[entries['position'].to_numpy()],
+                                                          frames["athletes"])
+        return frames
+
+
+def import_workbooks(inputs, database, jobs=None):
+    """
+    Import the sheets of the given workbooks into the database, skipping
+    sheets unchanged since they were last imported; returns the number of
+    sheets imported. Sheets are parsed in parallel (see run_jobs).
+    """
+    # A workbook listed twice is imported once
+    workbooks = list(dict.fromkeys(os.path.abspath(workbook) for workbook in find_workbooks(inputs)))
+    fingerprints = workbook_fingerprints(workbooks)
+    with ResultsDatabase(database) as db:
+        tasks = [(workbook, dataset) for workbook in workbooks for dataset in SHEETS
+                 if db.sheet_fingerprint(workbook, dataset) != fingerprints[os.path.abspath(workbook)][dataset]]
+        print(f"Importing {len(tasks)} changed sheet(s) of {len(workbooks)} workbook(s) into {database}")
+        for (workbook, dataset), (df, timings) in zip(tasks, run_jobs(parse_sheet, tasks, jobs)):
+            start = time.perf_counter()
+            db.replace_sheet(workbook, dataset, df, fingerprints[os.path.abspath(workbook)][dataset])
+            rows = "no such sheet" if df is None else f"{len(df)} rows"
+            print(f"  {os.path.basename(workbook)} / {SHEETS[dataset]}: {rows}, parsed in "
+                  f"{timings['read'] + timings['clean']:.2f}s, stored in {time.perf_counter() - start:.2f}s")
+    return len(tasks)
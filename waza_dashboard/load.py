@@ -0,0 +1,286 @@
+"""
+Loading the workbooks
+
+Each sheet is streamed with openpyxl, cleaned and given the dtypes of
+SHEET_SCHEMAS. Sheets are parsed in a process pool when there are enough of
+them (see run_jobs), and the sheets of several workbooks are combined into
+one frame per dataset.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .profiling import PROFILER
+from .results import result_values
+from .schema import DEDUPLICATE_ON, RESULT_COLUMN, SHEET_SCHEMAS, SHEETS, VALUE_COLUMN
+
+
+# Without --jobs, work is only spread over a process pool when there are at
+# least this many tasks (more than one workbook's sheets); starting the pool
+# costs more than parsing a single workbook, above all where workers are
+# spawned (Windows, macOS)
+POOL_MIN_TASKS = 4
+
+# A sheet ends at the first run of this many blank rows (formatted but empty
+# rows below the data are common in hand-edited workbooks)
+BLANK_ROW_RUN = 100
+
+
+def clean_sheet(dataset, df):
+    # Clean data - remove empty rows
+    if dataset == "athletes":
+        df = df.dropna(subset=['Athlete'])
+    elif dataset == "meets":
+        df = df.dropna(subset=['Meet'])
+    elif dataset == "results":
+        df = df.dropna(subset=['ATHLETE', 'EVENT'])
+        # Convert EVENT column to string for consistent comparison
+        df['EVENT'] = df['EVENT'].astype(str)
+        # Parse the results once (see parse_results)
+        df[VALUE_COLUMN] = result_values(df[RESULT_COLUMN])
+    return df
+
+
+def find_workbooks(inputs):
+    """Expand workbook paths and directories (every .xlsx inside, sorted by name)"""
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    workbooks = []
+    for path in inputs:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path)
+                           if name.lower().endswith('.xlsx') and not name.startswith('~$'))
+            workbooks.extend(os.path.join(path, name) for name in names)
+        else:
+            workbooks.append(path)
+    if not workbooks:
+        raise FileNotFoundError(f"No .xlsx workbooks found in {', '.join(inputs)}")
+    return workbooks
+
+
+def apply_schema(dataset, df):
+    """Convert the columns listed in SHEET_SCHEMAS to their declared dtypes"""
+    import pandas as pd
+    for column, dtype in SHEET_SCHEMAS[dataset].items():
+        if column not in df or dtype is None:
+            continue
+        if dtype == "datetime":
+            converted = pd.to_datetime(df[column], errors='coerce')
+            # Leave a column holding text that isn't a date as it is
+            if converted.notna().sum() == df[column].notna().sum():
+                df[column] = converted
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def _cell_value(value):
+    # Match pd.read_excel: whole floats become ints, empty text is blank
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and not value.strip():
+        return None
+    return value
+
+
+def read_sheet(workbook, dataset):
+    """
+    Stream one sheet with openpyxl's read-only mode, keeping only the
+    columns declared in SHEET_SCHEMAS.
+
+    Blank rows are skipped and reading stops at the first run of
+    BLANK_ROW_RUN of them. Raises ValueError if the sheet does not exist.
+    """
+    return next(iter_sheet(workbook, dataset))
+
+
+def iter_sheet(workbook, dataset, chunk_rows=None, dtype=None):
+    """
+    Read one sheet like read_sheet, as DataFrames of at most chunk_rows rows
+    (all rows in one frame if None). At least one frame is yielded, empty
+    for a sheet without data. dtype=object keeps the cells as they are
+    instead of letting each frame infer its column dtypes.
+    """
+    import openpyxl
+    import pandas as pd
+    wb = openpyxl.load_workbook(workbook, read_only=True, data_only=True)
+    try:
+        sheet = SHEETS[dataset]
+        if sheet not in wb.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet}' not found")
+        ws = wb[sheet]
+
+        header = next(ws.iter_rows(max_row=1, values_only=True), ())
+        positions = {}
+        for i, name in enumerate(header):
+            if name in SHEET_SCHEMAS[dataset]:
+                positions.setdefault(name, i)
+        columns = {name: [] for name in positions}
+        width = max(positions.values(), default=0) + 1
+
+        blank_run = 0
+        rows = chunks = 0
+        for row in ws.iter_rows(min_row=2, max_col=width, values_only=True):
+            values = [_cell_value(row[i]) if i < len(row) else None for i in positions.values()]
+            if all(value is None for value in values):
+                blank_run += 1
+                if blank_run >= BLANK_ROW_RUN:
+                    break
+                continue
+            blank_run = 0
+            for column, value in zip(columns.values(), values):
+                column.append(value)
+            rows += 1
+            if rows == chunk_rows:
+                yield pd.DataFrame(columns, dtype=dtype)
+                columns = {name: [] for name in positions}
+                rows = 0
+                chunks += 1
+    finally:
+        wb.close()
+    if rows or not chunks:
+        yield pd.DataFrame(columns, dtype=dtype)
+
+
+def read_sheet_pandas(workbook, dataset):
+    """The previous loader: the whole sheet through pd.read_excel (kept for benchmarks)"""
+    import pandas as pd
+    return pd.read_excel(workbook, sheet_name=SHEETS[dataset])
+
+
+def parse_sheet(workbook, dataset, reader=read_sheet):
+    """
+    Read and clean one sheet.
+
+    Returns (DataFrame, {"read": seconds, "clean": seconds}); the DataFrame
+    is None if the sheet is missing.
+    """
+    start = time.perf_counter()
+    try:
+        df = reader(workbook, dataset)
+    except ValueError:
+        # Both readers raise ValueError for a worksheet that does not exist
+        return None, {"read": time.perf_counter() - start, "clean": 0.0}
+    read = time.perf_counter()
+    df = apply_schema(dataset, clean_sheet(dataset, df))
+    return df, {"read": read - start, "clean": time.perf_counter() - read}
+
+
+def run_jobs(func, tasks, jobs=None):
+    """
+    func(*task) for every task, in a process pool when jobs allows more than one.
+
+    jobs=None uses one process per CPU, or none with fewer than
+    POOL_MIN_TASKS tasks; results come back in task order.
+    """
+    if jobs is None and len(tasks) < POOL_MIN_TASKS:
+        jobs = 1
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        return [func(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(func, *zip(*tasks)))
+
+
+def combine_workbooks(parts):
+    """
+    Union each dataset across workbooks ({dataset: [DataFrame per workbook]}).
+
+    Athletes (by name) and meets (by name and date) listed in several
+    workbooks keep the row from the last one. A result listed in several
+    workbooks is kept only from the first; repeats inside one workbook stay.
+    """
+    import pandas as pd
+    frames = {}
+    for dataset, dfs in parts.items():
+        dfs = [df for df in dfs if df is not None]
+        if not dfs:
+            raise ValueError(f"No workbook has a '{SHEETS[dataset]}' sheet")
+        if len(dfs) == 1:
+            frames[dataset] = dfs[0]
+            continue
+
+        df = pd.concat([df.assign(_source=i) for i, df in enumerate(dfs)], ignore_index=True)
+        keys = [column for column in DEDUPLICATE_ON[dataset] if column in df]
+        if dataset == "results":
+            first_source = df.groupby(keys, dropna=False, sort=False)['_source'].transform('min')
+            df = df[df['_source'] == first_source]
+        else:
+            df = df.drop_duplicates(subset=keys, keep='last')
+        # Categories differ between workbooks, so concat gave plain objects
+        frames[dataset] = apply_schema(dataset, df.drop(columns='_source').reset_index(drop=True))
+    return frames
+
+
+def load_data(workbooks, fingerprints=None, cache=None, jobs=None, datasets=tuple(SHEETS)):
+    """
+    Read, clean and combine the Athletes, Events and Results sheets of every workbook.
+
+    Sheets are parsed in parallel (see run_jobs) and the parse time of each is
+    printed. When a cache is given, sheets whose fingerprint matches the last
+    build are read back from the cache instead of being parsed again.
+    datasets limits loading to some of the sheets.
+    """
+    if isinstance(workbooks, str):
+        workbooks = [workbooks]
+
+    parsed = {}
+    tasks = []
+    for workbook in workbooks:
+        for dataset in datasets:
+            df = None
+            if cache is not None:
+                df = cache.load_frame(workbook, dataset, fingerprints[os.path.abspath(workbook)][dataset])
+            if df is not None:
+                parsed[workbook, dataset] = df
+                print(f"  {os.path.basename(workbook)} / {SHEETS[dataset]}: unchanged (cached)")
+            else:
+                tasks.append((workbook, dataset))
+
+    for (workbook, dataset), (df, timings) in zip(tasks, run_jobs(parse_sheet, tasks, jobs)):
+        parsed[workbook, dataset] = df
+        rows = "no such sheet" if df is None else f"{len(df)} rows"
+        print(f"  {os.path.basename(workbook)} / {SHEETS[dataset]}: {rows}, "
+              f"parsed in {timings['read'] + timings['clean']:.2f}s")
+        PROFILER.add_sheet(workbook, SHEETS[dataset], 0 if df is None else len(df), timings)
+        if cache is not None and df is not None:
+            cache.store_frame(workbook, dataset, df)
+
+    return combine_workbooks({
+        dataset: [parsed[workbook, dataset] for workbook in workbooks] for dataset in datasets
+    })
+
+
+def merge_results(results_df, meets_df):
+    # Merge results with meets to get dates (and seasons for search)
+    with PROFILER.stage("merge"):
+        results_with_dates = results_df.merge(
+            meets_df[[column for column in ('Meet', 'DATE', 'Season') if column in meets_df]],
+            left_on='MEET',
+            right_on='Meet',
+            how='left'
+        )
+
+    # Sort results by date (newest first)
+    with PROFILER.stage("sort"):
+        return sort_results(results_with_dates)
+
+
+def sort_results(results_with_dates):
+    """
+    Results newest first, and results of the same day by meet, event,
+    athlete and mark.
+
+    The order only depends on the results themselves, not on the order of
+    the rows in the workbooks or database, so the same data always gives
+    byte-identical pages and shards.
+    """
+    keys = [column for column in ('DATE', 'MEET', 'EVENT', 'ATHLETE', VALUE_COLUMN) if column in results_with_dates]
+    return results_with_dates.sort_values(keys, ascending=[key != 'DATE' for key in keys], na_position='last',
+                                          kind='mergesort')
+
+
+def sort_meets(meets_df):
+    """Meets newest first, meets on the same day by name (see sort_results)"""
+    keys = [column for column in ('DATE', 'Meet') if column in meets_df]
+    return meets_df.sort_values(keys, ascending=[key != 'DATE' for key in keys], na_position='last', kind='mergesort')
@@ -0,0 +1,578 @@
+"""
+Low-memory builds (--low-memory)
+
+The Results sheets are read in chunks and worked through a few thousand
+results at a time instead of being loaded whole. The sections are made with
+the same encoders and index builders as a normal build (ResultsPayload,
+SearchIndexBuilder, TeamSummary, meet_details), fed one part of the results
+at a time.
+"""
+import codecs
+import heapq
+import itertools
+import json
+import operator
+import os
+import pickle
+import time
+
+from .aggregate import (
+    TeamSummary, compare_seasons, compute_leaderboards, compute_prs, flag_marks, leaderboard_entries,
+    progression_series,
+)
+from .load import apply_schema, clean_sheet, iter_sheet, load_data, sort_meets, sort_results
+from .page import results_date
+from .profiling import PROFILER
+from .results import event_spreads, print_validation, validate_results
+from .schema import DEDUPLICATE_ON, RESULT_COLUMN, SHEETS, VALUE_COLUMN
+from .search import SearchIndexBuilder, search_indexes, table_search_fields
+from .sections import (
+    DATA_SECTIONS, PAGE_SECTIONS, RankingInputs, ResultsPayload, _file_chunks, all_time_boards, leaderboard_events,
+    leaderboard_filters, meet_details, meet_marks, pr_index, render_athlete_options, render_athlete_rows,
+    render_event_options, render_meet_rows, render_stats, render_tables_shard, render_team_summary,
+)
+from .shards import ShardWriter
+
+
+# --low-memory reads the Results sheets this many rows at a time, works
+# through the results of an event in groups of athletes holding about as
+# many, and merges the sorted groups holding about as many rows at once
+LOW_MEMORY_CHUNK_ROWS = 50_000
+
+
+def _pickled_frames(path):
+    """Yield the frames pickled one after another into path"""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def spill_results(workbooks, meets_df, folder, chunk_rows=LOW_MEMORY_CHUNK_ROWS):
+    """
+    Read the Results sheets chunk_rows rows at a time into one file per event.
+
+    A first pass stores each sheet's batches as read; the dtype each column
+    would have had if the whole sheet had been read at once (see read_sheet)
+    is only known at its end. A second pass converts each batch to those
+    dtypes, cleans it like a loaded sheet (see clean_sheet), merges it with
+    the meets like merge_results (a meet listed on several dates lists its
+    results once per date, numbered by _copy) and appends it to its event's
+    file in folder. Only one batch is in memory at a time. Rows keep their
+    workbook (_source) and position in the combined sheets (_row).
+
+    Returns ({event: path}, {event: {athlete: rows}}, the MEET and DATE of
+    the results without repeats).
+    """
+    import numpy as np
+    import pandas as pd
+    raw = []
+    for source, workbook in enumerate(workbooks):
+        start = time.perf_counter()
+        batches = iter_sheet(workbook, "results", chunk_rows, dtype=object)
+        try:
+            first = next(batches)
+        except ValueError:
+            print(f"  {os.path.basename(workbook)} / {SHEETS['results']}: no such sheet")
+            continue
+        # One cell of each Python type per column is enough to infer its dtype
+        examples = {column: {} for column in first}
+        path = os.path.join(folder, f"sheet-{source}.pkl")
+        with open(path, 'wb') as f:
+            for batch in itertools.chain([first], batches):
+                for column, values in batch.items():
+                    examples[column].update(zip(map(type, values), values))
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+        dtypes = {column: pd.DataFrame({column: list(values.values())})[column].dtype
+                  for column, values in examples.items()}
+        raw.append((source, workbook, path, dtypes, time.perf_counter() - start))
+    if not raw:
+        raise ValueError(f"No workbook has a '{SHEETS['results']}' sheet")
+
+    meets = meets_df[[column for column in ('Meet', 'DATE', 'Season') if column in meets_df]]
+    files, handles, counts = {}, {}, {}
+    occasions = pd.DataFrame({'MEET': pd.Series(dtype=object), 'DATE': pd.to_datetime([])})
+    rows = 0
+    try:
+        for source, workbook, path, dtypes, read in raw:
+            start = time.perf_counter()
+            kept = count = 0
+            for batch in _pickled_frames(path):
+                batch = clean_sheet("results", batch.astype(dtypes))
+                batch['_source'] = source
+                batch['_row'] = np.arange(rows + kept, rows + kept + len(batch))
+                kept += len(batch)
+                count += 1
+                batch = batch.merge(meets, left_on='MEET', right_on='Meet', how='left').drop(columns='Meet')
+                batch['_copy'] = batch.groupby('_row', sort=False).cumcount()
+                occasions = pd.concat([occasions, batch[['MEET', 'DATE']].astype({'MEET': object})],
+                                      ignore_index=True).drop_duplicates()
+                for (event, athlete), size in batch.groupby(['EVENT', 'ATHLETE'], sort=False).size().items():
+                    athletes = counts.setdefault(event, {})
+                    athletes[athlete] = athletes.get(athlete, 0) + size
+                for event, part in batch.groupby('EVENT', sort=False):
+                    if event not in handles:
+                        files[event] = os.path.join(folder, f"event-{len(files)}.pkl")
+                        handles[event] = open(files[event], 'wb')
+                    pickle.dump(part, handles[event], protocol=pickle.HIGHEST_PROTOCOL)
+            os.remove(path)
+            rows += kept
+            clean = time.perf_counter() - start
+            print(f"  {os.path.basename(workbook)} / {SHEETS['results']}: {kept} rows in {count} batches, "
+                  f"parsed in {read + clean:.2f}s")
+            PROFILER.add_sheet(workbook, SHEETS['results'], kept, {"read": read, "clean": clean})
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return files, counts, occasions
+
+
+def meet_occasions(occasions):
+    """
+    The MEET and DATE of the results (see spill_results) in the order
+    sort_results lists them: newest first, meets of a day by name, then
+    undated meets, then results without a meet. `occasion` numbers them in
+    that order, which is the order the merged results come in (see
+    merge_runs).
+    """
+    import numpy as np
+    keys = ['DATE', 'MEET']
+    occasions = occasions.sort_values(keys, ascending=[key != 'DATE' for key in keys], na_position='last',
+                                      kind='mergesort').reset_index(drop=True)
+    occasions['occasion'] = np.arange(len(occasions))
+    return occasions
+
+
+def athlete_groups(counts, chunk_rows):
+    """
+    {athlete: group} for an event's athletes ({athlete: rows}) split in name
+    order into groups of at most chunk_rows rows (more only for an athlete
+    with more results than that; their results are never split)
+    """
+    groups = {}
+    group = rows = 0
+    for athlete in sorted(counts):
+        if rows and rows + counts[athlete] > chunk_rows:
+            group += 1
+            rows = 0
+        groups[athlete] = group
+        rows += counts[athlete]
+    return groups
+
+
+def split_event(path, groups, prefix):
+    """Split an event's spill file into one file per group of athletes (see athlete_groups); returns their paths"""
+    import pandas as pd
+    paths = [f"{prefix}-{group}.pkl" for group in range(max(groups.values()) + 1)]
+    groups = pd.Series(groups)
+    handles = {}
+    try:
+        for batch in _pickled_frames(path):
+            for group, part in batch.groupby(batch['ATHLETE'].astype(object).map(groups).to_numpy(), sort=False):
+                if group not in handles:
+                    handles[group] = open(paths[group], 'wb')
+                pickle.dump(part, handles[group], protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    os.remove(path)
+    return paths
+
+
+def group_results(path, sort=True):
+    """
+    A group of athletes' results in an event from their file (see
+    split_event): combined across workbooks like combine_workbooks, and
+    sorted like sort_results.
+    """
+    import pandas as pd
+    df = pd.concat(_pickled_frames(path), ignore_index=True)
+    if df['_source'].nunique() > 1:
+        keys = [column for column in DEDUPLICATE_ON["results"] if column in df]
+        first_source = df.groupby(keys, dropna=False, sort=False)['_source'].transform('min')
+        df = df[df['_source'] == first_source]
+    df = apply_schema("results", df.drop(columns='_source'))
+    return sort_results(df).reset_index(drop=True) if sort else df.reset_index(drop=True)
+
+
+def write_run(path, run, block_rows):
+    """Pickle a frame sorted by occasion to path in blocks of block_rows rows (see merge_runs)"""
+    with open(path, 'wb') as f:
+        for start in range(0, len(run), block_rows):
+            pickle.dump(run.iloc[start:start + block_rows], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def merge_runs(paths):
+    """
+    Merge runs (see write_run) into one stream ordered by occasion and, for
+    equal occasions, by run.
+
+    Yields frames of the runs' columns plus `run` (the position in paths);
+    a frame never splits an occasion. Only about one block per run is held
+    at a time: a run that is still being read keeps at least two occasions
+    buffered, and everything before the lowest last occasion among them is
+    complete.
+    """
+    import numpy as np
+    import pandas as pd
+    readers = {run: _pickled_frames(path) for run, path in enumerate(paths)}
+    buffers = {}
+    while readers or buffers:
+        for run in list(readers):
+            buffer = buffers.get(run)
+            while buffer is None or buffer['occasion'].iat[0] == buffer['occasion'].iat[-1]:
+                block = next(readers[run], None)
+                if block is None:
+                    del readers[run]
+                    break
+                buffer = block if buffer is None else pd.concat([buffer, block], ignore_index=True)
+            if buffer is not None:
+                buffers[run] = buffer
+        bound = min((buffers[run]['occasion'].iat[-1] for run in readers), default=None)
+
+        parts = []
+        for run in sorted(buffers):
+            buffer = buffers.pop(run)
+            cut = len(buffer) if bound is None else int(np.searchsorted(buffer['occasion'].to_numpy(), bound))
+            if cut:
+                parts.append(buffer.iloc[:cut].assign(run=run))
+            if cut < len(buffer):
+                buffers[run] = buffer.iloc[cut:]
+        if parts:
+            yield pd.concat(parts, ignore_index=True).sort_values('occasion', kind='mergesort', ignore_index=True)
+
+
+class JsonObjectSpool:
+    """
+    A JSON object written to a file one member at a time, and read back as
+    chunks with its members in the order they were added or in a given order
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.members = {}
+
+    def add(self, key, text):
+        """Add member `key` whose value is the JSON `text`"""
+        self.add_chunks(key, [text])
+
+    def add_chunks(self, key, chunks):
+        """Add member `key` whose value is JSON given as text chunks"""
+        start = self.file.tell()
+        self.file.write((json.dumps(key, ensure_ascii=False) + ":").encode('utf-8'))
+        for chunk in chunks:
+            self.file.write(chunk.encode('utf-8'))
+        self.members[key] = (start, self.file.tell())
+
+    def chunks(self, order=None, size=1 << 20):
+        self.file.close()
+        yield "{"
+        with open(self.path, 'rb') as f:
+            for i, key in enumerate(self.members if order is None else order):
+                if i:
+                    yield ","
+                start, end = self.members[key]
+                f.seek(start)
+                decoder = codecs.getincrementaldecoder('utf-8')()
+                while start < end:
+                    data = f.read(min(size, end - start))
+                    start += len(data)
+                    yield decoder.decode(data, final=start >= end)
+        yield "}"
+
+
+class EventProgression:
+    """
+    An event's progression series (see progression_series) put together
+    from those of groups of its athletes, added in name order: the event's
+    meets are numbered in the order they first appear across the groups,
+    and the series are spooled to a file at path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meets = {}
+        self.higher_is_better = None
+        self.athletes = 0
+
+    def add(self, progression):
+        """Add the progression_series of the next group of athletes"""
+        for entry in progression.values():
+            self.higher_is_better = entry["higher_is_better"]
+            ids = [self.meets.setdefault(name, len(self.meets)) for name in entry["meets"]]
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for athlete, series in entry["series"].items():
+                    series["meet"] = [ids[meet] if meet >= 0 else -1 for meet in series["meet"]]
+                    f.write(("," if self.athletes else "") + json.dumps(athlete, ensure_ascii=False) + ":"
+                            + json.dumps(series, separators=(',', ':'), ensure_ascii=False))
+                    self.athletes += 1
+
+    def chunks(self):
+        """The event's entry of progression_series as JSON chunks"""
+        yield ('{"higher_is_better":' + json.dumps(self.higher_is_better) + ',"meets":'
+               + json.dumps(list(self.meets), separators=(',', ':'), ensure_ascii=False) + ',"series":{')
+        yield from _file_chunks(self.path)
+        yield "}}"
+
+
+class AthletePrs:
+    """
+    The PR index (see pr_index) put together from the PRs of groups of
+    athletes (see compute_prs), each pickled to a file in folder in athlete
+    order in blocks of block_rows athletes. items() merges the files by
+    athlete, so only a block of each is held at a time; an athlete's PRs keep
+    the order their groups were added in.
+    """
+
+    def __init__(self, folder, block_rows):
+        self.folder = folder
+        self.block_rows = block_rows
+        self.paths = []
+
+    def add(self, prs):
+        records = list(pr_index(None, prs).items())
+        self.paths.append(os.path.join(self.folder, f"prs-{len(self.paths)}.pkl"))
+        with open(self.paths[-1], 'wb') as f:
+            for start in range(0, len(records), self.block_rows):
+                pickle.dump(records[start:start + self.block_rows], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def items(self):
+        """(athlete, [PR records]) in athlete order"""
+        runs = [itertools.chain.from_iterable(_pickled_frames(path)) for path in self.paths]
+        merged = heapq.merge(*runs, key=operator.itemgetter(0))
+        for athlete, group in itertools.groupby(merged, key=operator.itemgetter(0)):
+            yield athlete, [record for _, records in group for record in records]
+
+    def chunks(self):
+        """The PR index as JSON chunks"""
+        yield "{"
+        for i, (athlete, records) in enumerate(self.items()):
+            yield (("," if i else "") + json.dumps(athlete, ensure_ascii=False) + ":"
+                   + json.dumps(records, separators=(',', ':'), ensure_ascii=False))
+        yield "}"
+
+
+def render_low_memory(workbooks, folder, output_dir=".", mode="single", per_meet=False, compress=False,
+                      chunk_rows=LOW_MEMORY_CHUNK_ROWS, jobs=None, validation_report=None):
+    """
+    Render the sections of PAGE_SECTIONS[mode] without holding every result in memory.
+
+    The Athletes and Events sheets are loaded as usual, and the Results
+    sheets are read in batches into one file per event (see spill_results).
+    Each event is split into groups of athletes of about chunk_rows results
+    (see athlete_groups); a group is loaded on its own to check its results
+    against the event's medians (see event_spreads), work out its PRs,
+    progression series, leaderboard entries (see leaderboard_entries) and
+    which marks were PRs (see flag_marks), and is written back sorted by
+    meet (see write_run). Merging those runs gives the results in the order
+    of sort_results, which are fed a frame at a time to the results payload,
+    its search index, the team summary and the meet details (see
+    ResultsPayload, SearchIndexBuilder, TeamSummary and meet_details, which
+    a normal build uses on all results at once).
+
+    What is held at once is bounded by chunk_rows (a batch of a sheet, a
+    group, the merge's buffers, a pass over the search codes) plus what
+    grows with the distinct values rather than the results: the names of
+    athletes and meets, distinct marks, the season-on-season changes of
+    athlete-events, the meets not merged yet, and the leaderboards of one
+    event and its numeric marks (for their median, see event_spreads).
+
+    Returns (sections, date of the latest results); the same page and shards
+    as render_sections gives. Streamed sections and the files they read are
+    in folder, which must be kept until the page is written.
+    """
+    import numpy as np
+    import pandas as pd
+    with PROFILER.stage("load"):
+        frames = load_data(workbooks, jobs=jobs, datasets=("athletes", "meets"))
+        athletes_df, meets_df = frames["athletes"], sort_meets(frames["meets"])
+        files, counts, occasions = spill_results(workbooks, meets_df, folder, chunk_rows)
+    occasions = meet_occasions(occasions)
+
+    events = sorted(files)
+    runs = sum(max(athlete_groups(counts[event], chunk_rows).values()) + 1 for event in events)
+    block_rows = max(100, chunk_rows // max(runs, 1))
+    shards = None if mode == "single" else ShardWriter(output_dir, compress)
+    spools = {}
+    paths = {"athletes": {}, "events": {}, "rankings": {}, "meets": {}}
+
+    def publish(folder_name, name, data):
+        publish_chunks(folder_name, name, [json.dumps(data, separators=(',', ':'), ensure_ascii=False)])
+
+    def publish_chunks(folder_name, name, chunks):
+        if shards is not None:
+            paths[folder_name][name] = shards.add_chunks(folder_name, name, chunks)
+        else:
+            if folder_name not in spools:
+                spools[folder_name] = JsonObjectSpool(os.path.join(folder, f"{folder_name}.json"))
+            spools[folder_name].add_chunks(name, chunks)
+
+    reports, filters, changes, runs = [], [], [], []
+    prs = AthletePrs(folder, block_rows)
+    results = 0
+    for position, event in enumerate(events):
+        with PROFILER.stage("aggregate events"):
+            groups = athlete_groups(counts.pop(event), chunk_rows)
+            parts = split_event(files[event], groups, os.path.join(folder, f"event-{position}"))
+            # Outliers are judged against the whole event (see validate_results)
+            values = []
+            for path in parts:
+                df = group_results(path, sort=False)
+                values.append(df.loc[df['_copy'] == 0, VALUE_COLUMN].to_numpy(dtype=float))
+            values = pd.Series(np.concatenate(values))
+            spreads = event_spreads(values, pd.Series(event, index=values.index))
+
+            progression = EventProgression(os.path.join(folder, f"progression-{position}.json"))
+            entries = None
+            for part, path in enumerate(parts):
+                df = group_results(path)
+                os.remove(path)
+                originals = df[df['_copy'] == 0]
+                results += len(originals)
+                report = validate_results(originals, spreads=spreads)
+                reports.append(report.assign(_row=originals.loc[report.index, '_row'].to_numpy()))
+
+                marks, part_changes = flag_marks(df)
+                # Few distinct seasons: categories hold each label once
+                changes.append(part_changes.astype({'season': 'category'}))
+                if df[VALUE_COLUMN].notna().any():
+                    prs.add(compute_prs(df))
+                    progression.add(progression_series(df, per_meet))
+                    found = leaderboard_entries(df, athletes_df)
+                    if entries is not None:
+                        # In the event's order, as leaderboard_entries needs
+                        found = pd.concat([entries, found]).sort_values(['_row', '_copy'], kind='mergesort')
+                        found = leaderboard_entries(sort_results(found), athletes_df)
+                    entries = found
+
+                run = df[['ATHLETE', 'EVENT', 'MEET', 'DATE', RESULT_COLUMN, VALUE_COLUMN]].astype(
+                    {'ATHLETE': object, 'EVENT': object, 'MEET': object})
+                run = run.assign(season=marks['season'].to_numpy(), flag=marks['flag'].to_numpy())
+                run.insert(0, 'occasion', run[['DATE', 'MEET']].merge(occasions, how='left', on=['DATE', 'MEET'])
+                           ['occasion'].to_numpy())
+                runs.append(os.path.join(folder, f"run-{position}-{part}.pkl"))
+                write_run(runs[-1], run, block_rows)
+                del df, run
+
+            if progression.higher_is_better is not None:
+                publish_chunks("events", event, progression.chunks())
+            if entries is not None:
+                boards = compute_leaderboards(entries, athletes_df)
+                filters.append(boards[['season', 'gender', 'age_group', 'DATE']])
+                # The single-file page works out all but the all-time boards (see render_rankings)
+                for name, leaderboards in leaderboard_events(all_time_boards(boards) if shards is None
+                                                             else boards).items():
+                    publish("rankings", name, leaderboards)
+
+    print(f"Loaded: {len(athletes_df)} athletes, {len(meets_df)} meets, {results} results")
+    with PROFILER.stage("validate"):
+        report = (pd.concat(reports).sort_values('_row', kind='mergesort').drop(columns='_row') if reports
+                  else validate_results(pd.DataFrame(columns=['ATHLETE', 'EVENT', 'MEET', RESULT_COLUMN])))
+        print_validation(report, validation_report)
+
+    # A meet's details are written once its last date is merged
+    named = occasions[occasions['MEET'].notna()]
+    last = named.groupby('MEET', sort=False)['occasion'].max().sort_values(kind='mergesort')
+    closing = list(zip(last.tolist(), last.index.tolist()))
+    no_boards = pd.DataFrame({'season': [], 'gender': [], 'age_group': [], 'DATE': pd.to_datetime([])})
+    rankings_filters = leaderboard_filters(pd.concat(filters) if filters else no_boards)
+    payload = ResultsPayload(folder)
+    ranking_inputs = RankingInputs(rankings_filters, athletes_df, folder) if shards is None else None
+    search = SearchIndexBuilder(folder, chunk_rows)
+    summary = TeamSummary()
+    pending = []
+    closed = 0
+    with PROFILER.stage("merge"):
+        for frame in merge_runs(runs):
+            rows = np.flatnonzero(frame['flag'].to_numpy() >= 0)
+            pending.append(meet_marks(frame, pd.DataFrame({
+                'row': rows, 'MEET': frame['MEET'].to_numpy()[rows], 'flag': frame['flag'].to_numpy()[rows],
+            }), payload.rows))
+            payload.add(frame)
+            if ranking_inputs is not None:
+                ranking_inputs.add(frame, frame['season'].to_numpy())
+            search.add(table_search_fields("resultsTable", frame))
+            summary.add(frame)
+
+            complete = []
+            while closed < len(closing) and closing[closed][0] <= frame['occasion'].iat[-1]:
+                complete.append(closing[closed][1])
+                closed += 1
+            if complete:
+                marks = pd.concat(pending, ignore_index=True)
+                done = marks['MEET'].isin({str(meet) for meet in complete}).to_numpy()
+                for meet, details in meet_details(marks[done], summary.meets(complete), mode == "single").items():
+                    publish("meets", meet, details)
+                pending = [marks[~done]]
+        for path in runs:
+            os.remove(path)
+
+    no_changes = pd.DataFrame({'season': pd.Series(dtype=object), 'change': pd.Series(dtype=float)})
+    seasons = compare_seasons(summary.season_counts(), pd.concat(changes) if changes else no_changes)
+    meet_order = [str(meet) for meet in summary.meets().index]
+    search_tables = {"athletesTable": athletes_df, "meetsTable": meets_df}
+
+    def json_text(data):
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+    def spooled(folder_name, order=None):
+        return spools[folder_name].chunks(order) if folder_name in spools else iter(["{}"])
+
+    def results_index():
+        start = time.perf_counter()
+        size = 0
+        for chunk in search.chunks():
+            size += len(chunk.encode('utf-8'))
+            yield chunk
+        print(f"Search index resultsTable: {search.rows} rows, {size / 1024:.1f} KB, "
+              f"built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def search_index():
+        text = json_text(search_indexes(search_tables))
+        yield text[:-1] + ',"resultsTable":'
+        yield from results_index()
+        yield "}"
+
+
+    def manifest(tables=None):
+        manifest = {"results": shards.add_chunks("", "results", payload.chunks()),
+                    "search": shards.add_chunks("", "search", results_index())}
+        if tables is not None:
+            manifest["tables"] = shards.add("", "tables", tables)
+        for athlete, records in prs.items():
+            paths["athletes"][athlete] = shards.add("athletes", athlete, json_text(
+                {"athlete": athlete, "prs": records}))
+        manifest.update(athletes=paths["athletes"], events=paths["events"],
+                        rankings={"filters": rankings_filters, "events": paths["rankings"]},
+                        meets={meet: paths["meets"][meet] for meet in meet_order})
+        return json_text(shards.finish(manifest))
+
+    renderers = {
+        "stats": lambda: render_stats(athletes_df, meets_df, range(results)),
+        "team_summary": lambda: render_team_summary(None, {"seasons": seasons}),
+        "athlete_rows": lambda: render_athlete_rows(athletes_df),
+        "meet_rows": lambda: render_meet_rows(meets_df),
+        "athlete_options": lambda: render_athlete_options(athletes_df),
+        "event_options": lambda: render_event_options(pd.DataFrame({'EVENT': events}, dtype=object)),
+        "search_index": search_index if mode == "single" else lambda: json_text(search_indexes(search_tables)),
+        "results_json": payload.chunks,
+        "pr_index": prs.chunks,
+        "progression": lambda: spooled("events"),
+        "rankings": lambda: ranking_inputs.chunks(spooled("rankings")),
+        "meet_index": lambda: spooled("meets", meet_order),
+        "shard_manifest": manifest,
+        "app_manifest": lambda: manifest(render_tables_shard(athletes_df, meets_df)),
+    }
+    sections = {}
+    for name in PAGE_SECTIONS[mode]:
+        stage = f"{'serialize' if name in DATA_SECTIONS else 'render'} {name}"
+        with PROFILER.stage(stage):
+            sections[name] = renderers[name]()
+        if not isinstance(sections[name], str):
+            sections[name] = PROFILER.timed_chunks(stage, sections[name])
+
+    dated = pd.DataFrame({'MEET': named['MEET'].drop_duplicates().tolist()}, dtype=object)
+    return sections, results_date({"meets": frames["meets"], "results": dated})
@@ -0,0 +1,277 @@
+"""
+Writing the page
+
+The fixed pieces of the templates with the rendered sections in between,
+minified if asked, plus the app mode's stylesheet, script and service worker.
+"""
+import filecmp
+import functools
+import hashlib
+import json
+import os
+
+from .profiling import PROFILER
+from .shards import COMPRESSED_SUFFIXES, SHARD_DIR, precompress, remove_compressed, _shard_file, write_if_changed
+from .templates import (
+    APP_BOOT_JS, APP_DATA_CLOSE, APP_DATA_OPEN, ATHLETES_OPEN, INLINE_DATA_CLOSE, INLINE_DATA_OPEN,
+    MEET_INDEX_OPEN_JS, MEETS_OPEN, MEETS_TABLE_OPEN, PAGE_HEAD, PR_INDEX_OPEN, PROGRESSION_ATHLETES_OPEN,
+    PROGRESSION_CLOSE, PROGRESSION_OPEN, PROGRESSION_OPEN_JS, PRS_OPEN, RANKINGS_CLOSE, RANKINGS_OPEN_JS,
+    RESULTS_OPEN, SCRIPT_CLOSE, SCRIPT_OPEN, SERVICE_WORKER_JS, SHARDED_DATA_CLOSE, SHARDED_DATA_OPEN,
+    TABLE_ROWS_CLOSE, TABLE_ROWS_NEXT, TABLE_ROWS_OPEN,
+)
+
+
+# The "app" mode writes the stylesheet and page script here (content-hashed
+# names) plus a service worker next to the page
+ASSET_DIR = "assets"
+
+SERVICE_WORKER_FILE = "sw.js"
+
+
+def render_footer(updated):
+    """Page footer; updated is the date of the latest results (see results_date), None if unknown"""
+    if updated is not None:
+        through = f"Results through {updated:%B} {updated.day}, {updated.year}"
+    else:
+        through = "No dated results yet"
+    return f"""        <div class="footer">
+            <p>{through}</p>
+            <p style="margin-top: 10px;">WAZA Track Club © 2025</p>
+        </div>
+    </div>
+"""
+
+
+def results_date(frames):
+    """
+    Date of the latest meet that has results, or None.
+
+    The footer shows this rather than the time of the build, so a rebuild
+    with unchanged results writes an identical page.
+    """
+    import pandas as pd
+    meets = frames["meets"]
+    if 'DATE' not in meets or 'Meet' not in meets:
+        return None
+    dates = pd.to_datetime(meets.loc[meets['Meet'].isin(frames["results"]['MEET'].unique()), 'DATE'],
+                           errors='coerce')
+    latest = dates.max()
+    return None if pd.isna(latest) else latest
+
+
+def app_stylesheet():
+    """The page's CSS as a stylesheet file (app mode)"""
+    return PAGE_HEAD[PAGE_HEAD.index("<style>") + len("<style>"):PAGE_HEAD.index("</style>")]
+
+
+def app_script():
+    """
+    The page script of the app mode as a static file: the sharded build's
+    script without any data, plus APP_BOOT_JS to load the tables.
+    """
+    functions = SCRIPT_OPEN[SCRIPT_OPEN.index("<script>") + len("<script>"):
+                            SCRIPT_OPEN.index("        // Build-time search indexes")]
+    return (functions
+            + "        // Build-time search indexes per table, filled in as the shards load\n"
+            + "        const searchIndexes = {};\n"
+            + SHARDED_DATA_CLOSE.lstrip(";")
+            + SCRIPT_CLOSE[:SCRIPT_CLOSE.index("    </script>")]
+            + APP_BOOT_JS % SERVICE_WORKER_FILE)
+
+
+def write_app_assets(output_file, manifest, minify=False, compress=False):
+    """
+    Write the app mode's stylesheet and script under ASSET_DIR and the service
+    worker next to the page; returns {"css": path, "js": path} relative to the page.
+
+    manifest is the shard manifest (see write_shards). Assets left over from
+    earlier builds are removed.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    css, js = app_stylesheet(), app_script()
+    if minify:
+        css, js = minify_chunk("css", css), minify_chunk("script", js)
+    assets = {"css": f"{ASSET_DIR}/{_shard_file('app', css, '.css')}",
+              "js": f"{ASSET_DIR}/{_shard_file('app', js, '.js')}"}
+    page = os.path.basename(output_file)
+    manifest_path = f"{SHARD_DIR}/manifest.json"
+    build = hashlib.sha1(json.dumps([assets, manifest], sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    worker = SERVICE_WORKER_JS % (build, json.dumps(["./", page]), json.dumps(sorted(assets.values())),
+                                  manifest_path, json.dumps([f"{ASSET_DIR}/", f"{SHARD_DIR}/"]))
+    if minify:
+        worker = minify_chunk("script", worker)
+
+    files = {assets["css"]: css, assets["js"]: js, SERVICE_WORKER_FILE: worker}
+    os.makedirs(os.path.join(output_dir, ASSET_DIR), exist_ok=True)
+    for path, text in files.items():
+        full_path = os.path.join(output_dir, *path.split('/'))
+        write_if_changed(full_path, text)
+        if compress:
+            precompress(full_path)
+        else:
+            remove_compressed(full_path)
+    for file_name in os.listdir(os.path.join(output_dir, ASSET_DIR)):
+        asset = file_name
+        for suffix in COMPRESSED_SUFFIXES:
+            asset = asset.removesuffix(suffix)
+        if asset.startswith("app-") and f"{ASSET_DIR}/{asset}" not in files:
+            os.remove(os.path.join(output_dir, ASSET_DIR, file_name))
+    return assets
+
+
+# Kinds of _page_parts chunks that are JSON inlined in the page script
+INLINE_JSON_KINDS = ("search index", "tables", "embedded data")
+
+
+def script_safe(text):
+    """
+    JSON text made safe to inline in a <script> element: every < (only ever
+    inside a string) becomes \\u003c, so no name can end the element with
+    </script> or open a comment with <!--.
+    """
+    return text.replace("<", "\\u003c")
+
+
+def _page_parts(sections, updated, assets=None):
+    """
+    Yield (kind, chunk) for the page; kind is what the size report groups by.
+
+    assets are the app mode's stylesheet and script (see write_app_assets),
+    which the page links to instead of carrying them.
+    """
+    def emit(kind, part):
+        safe = script_safe if kind in INLINE_JSON_KINDS else str
+        if isinstance(part, str):
+            yield kind, safe(part)
+        else:
+            for chunk in part:
+                yield kind, safe(chunk)
+
+    style_start = PAGE_HEAD.index("<style>")
+    style_end = PAGE_HEAD.index("</style>") + len("</style>")
+    yield "html", PAGE_HEAD[:style_start]
+    if assets:
+        yield "html", f'<link rel="stylesheet" href="{assets["css"]}">'
+    else:
+        yield "css", PAGE_HEAD[style_start:style_end]
+    yield "html", PAGE_HEAD[style_end:]
+    yield from emit("html", sections["stats"])
+    # Table bodies start empty; the page script renders them one page at a time
+    yield "html", ATHLETES_OPEN
+    yield "html", MEETS_OPEN
+    yield from emit("html", sections["team_summary"])
+    yield "html", MEETS_TABLE_OPEN
+    yield "html", RESULTS_OPEN
+    yield "html", PRS_OPEN
+    yield from emit("html", sections["athlete_options"])
+    yield "html", PROGRESSION_OPEN
+    yield from emit("html", sections["event_options"])
+    yield "html", PROGRESSION_ATHLETES_OPEN
+    yield from emit("html", sections["athlete_options"])
+    yield "html", PROGRESSION_CLOSE
+    yield from emit("html", sections["event_options"])
+    yield "html", RANKINGS_CLOSE
+    yield "html", render_footer(updated)
+    if assets:
+        yield "script", APP_DATA_OPEN
+        yield from emit("embedded data", sections["app_manifest"])
+        yield "script", APP_DATA_CLOSE % assets["js"]
+        return
+    yield "script", SCRIPT_OPEN
+    yield from emit("search index", sections["search_index"])
+    yield "script", TABLE_ROWS_OPEN
+    yield from emit("tables", sections["athlete_rows"])
+    yield "script", TABLE_ROWS_NEXT
+    yield from emit("tables", sections["meet_rows"])
+    yield "script", TABLE_ROWS_CLOSE
+    if "shard_manifest" in sections:
+        yield "script", SHARDED_DATA_OPEN
+        yield from emit("embedded data", sections["shard_manifest"])
+        yield "script", SHARDED_DATA_CLOSE
+    else:
+        yield "script", INLINE_DATA_OPEN
+        yield from emit("embedded data", sections["results_json"])
+        yield "script", PR_INDEX_OPEN
+        yield from emit("embedded data", sections["pr_index"])
+        yield "script", PROGRESSION_OPEN_JS
+        yield from emit("embedded data", sections["progression"])
+        yield "script", RANKINGS_OPEN_JS
+        yield from emit("embedded data", sections["rankings"])
+        yield "script", MEET_INDEX_OPEN_JS
+        yield from emit("embedded data", sections["meet_index"])
+        yield "script", INLINE_DATA_CLOSE
+    yield "script", SCRIPT_CLOSE
+
+
+@functools.lru_cache(maxsize=256)
+def minify_chunk(kind, text):
+    """
+    Strip the indentation and blank lines (and in scripts, whole-line // comments) from a chunk.
+
+    Line breaks between statements are kept so no semicolons are needed.
+    Whitespace at either end shrinks to one newline (or space) because the
+    chunk next to it may be data that is written as it is.
+    """
+    lines = (line.strip() for line in text.split('\n'))
+    body = "\n".join(line for line in lines if line and not (kind == "script" and line.startswith("//")))
+
+    def edge(space):
+        return "\n" if "\n" in space else space[:1]
+    start = text[:len(text) - len(text.lstrip())]
+    end = text[len(text.rstrip()):]
+    if not body:
+        return edge(text)
+    return edge(start) + body + edge(end)
+
+
+def iter_page(sections, updated, sizes=None, minify=False, assets=None):
+    """
+    Yield the page as a sequence of chunks (sections may be strings or chunk iterables).
+
+    If a sizes dict is given, the UTF-8 bytes of each kind of content (html,
+    css, script, tables, search index, embedded data) are added up in it.
+    minify strips the whitespace from the page's HTML, CSS and script (the
+    data sections are already compact JSON). assets: see _page_parts.
+    """
+    for kind, chunk in _page_parts(sections, updated, assets):
+        if minify and kind in ("html", "css", "script"):
+            chunk = minify_chunk(kind, chunk)
+        if sizes is not None:
+            sizes[kind] = sizes.get(kind, 0) + len(chunk.encode('utf-8'))
+        yield chunk
+
+
+def write_chunks(path, chunks):
+    """
+    Write an iterable of text chunks to path; returns the number of characters written.
+
+    The chunks go to a temporary file that replaces path only if its contents
+    differ, so an unchanged page keeps its modification time (and is not
+    uploaded or committed again) and a half-written page is never served.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    written = 0
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    if os.path.exists(path) and filecmp.cmp(temporary, path, shallow=False):
+        os.remove(temporary)
+    else:
+        os.replace(temporary, path)
+    return written
+
+
+def write_page(output_file, sections, updated, mode="single", minify=False, compress=False):
+    """Write the page (and the app mode's assets, which the page links to) from its rendered sections"""
+    with PROFILER.stage("write"):
+        assets = None
+        if mode == "app":
+            assets = write_app_assets(output_file, json.loads(sections["app_manifest"]), minify, compress)
+        write_chunks(output_file, iter_page(sections, updated, PROFILER.sizes if PROFILER.active else None,
+                                            minify, assets))
+        if compress:
+            precompress(output_file)
+        else:
+            remove_compressed(output_file)
@@ -0,0 +1,132 @@
+"""
+Wall time and memory per build stage (--profile)
+
+PROFILER is shared by every stage of the build; it records nothing until
+start() is called.
+"""
+import contextlib
+import json
+import os
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _rss_mb():
+    """Current resident memory of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    """Highest resident memory of this process so far in MB (0 where unknown)"""
+    if resource is None:
+        return 0.0
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if os.uname().sysname == "Darwin" else rss / 1e3
+
+
+class BuildProfile:
+    """
+    Wall time and memory per build stage, recorded while --profile is on.
+
+    Stages nest; each stage's seconds exclude the stages run inside it, so
+    they add up to the build's wall time. Nothing is recorded until start().
+    """
+
+    def __init__(self):
+        self.active = False
+
+    def start(self):
+        self.active = True
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.sheets = []
+        self.sizes = {}
+        self._nested = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.active:
+            yield
+            return
+        self._nested.append(0.0)
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "rss_delta_mb": 0.0})
+            entry["seconds"] += elapsed - nested
+            entry["calls"] += 1
+            entry["rss_delta_mb"] += _rss_mb() - rss_before
+            entry["rss_mb"] = _rss_mb()
+            entry["peak_rss_mb"] = _peak_rss_mb()
+
+    def timed_chunks(self, name, chunks):
+        """Yield chunks, counting the time spent producing them towards stage `name`"""
+        if not self.active:
+            yield from chunks
+            return
+        chunks = iter(chunks)
+        while True:
+            with self.stage(name):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def add_sheet(self, workbook, sheet, rows, timings):
+        if self.active:
+            self.sheets.append({"workbook": workbook, "sheet": sheet, "rows": rows,
+                                "read_seconds": timings["read"], "clean_seconds": timings["clean"]})
+
+    def report(self, path, output_file):
+        """Write the JSON report to path and print a summary"""
+        total = time.perf_counter() - self.started
+        stages = [{"stage": name, **{key: round(value, 4) if isinstance(value, float) else value
+                                     for key, value in entry.items()}}
+                  for name, entry in self.stages.items()]
+        report = {
+            "generated": datetime.now().isoformat(timespec='seconds'),
+            "output": output_file,
+            "total_seconds": round(total, 4),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "stages": stages,
+            # Sheets may be parsed in parallel, so these are per-process times
+            "sheets": self.sheets,
+            "output_bytes": {"total": sum(self.sizes.values()), **self.sizes},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"\nBuild profile ({total:.2f}s, peak RSS {report['peak_rss_mb']:.0f} MB):")
+        print(f"  {'stage':<28} {'seconds':>8} {'calls':>6} {'RSS MB':>8} {'+MB':>7}")
+        for entry in sorted(stages, key=lambda entry: -entry["seconds"]):
+            print(f"  {entry['stage']:<28} {entry['seconds']:>8.3f} {entry['calls']:>6} "
+                  f"{entry['rss_mb']:>8.0f} {entry['rss_delta_mb']:>+7.0f}")
+        if self.sheets:
+            read = sum(sheet["read_seconds"] for sheet in self.sheets)
+            clean = sum(sheet["clean_seconds"] for sheet in self.sheets)
+            print(f"  (sheets: read {read:.3f}s, clean {clean:.3f}s summed over {len(self.sheets)} sheets)")
+        if self.sizes:
+            print(f"  {output_file}: {report['output_bytes']['total'] / 1024:.1f} KB = "
+                  + ", ".join(f"{kind} {size / 1024:.1f} KB" for kind, size in
+                              sorted(self.sizes.items(), key=lambda item: -item[1])))
+        print(f"Profile written to {path}")
+
+
+# Build-wide profiler; inactive (and nearly free) unless --profile starts it
+PROFILER = BuildProfile()
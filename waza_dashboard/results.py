@@ -0,0 +1,175 @@
+"""
+Result marks: parsing and checking
+
+Results are entered as numbers, Excel time cells or text such as "1:05.3";
+they are read into seconds or meters (see parse_results), and the ones that
+look wrong are reported (see validate_results).
+"""
+from .schema import RESULT_COLUMN, VALUE_COLUMN
+
+
+# Event metadata: events whose name contains one of these are field events
+# measured in meters (higher is better); everything else is timed in seconds
+# (lower is better)
+MEASURED_EVENT_KEYWORDS = ("shot", "discus", "javelin", "hammer", "throw", "jump", "vault")
+
+# Results as entered, e.g. "65.3", "1:05.3", "1:02:03.5", "12.4s", "5.21 m"
+RESULT_PATTERN = (r'^(?:(?:(?P<h>\d+):)?(?P<m>\d+):)?(?P<s>\d+(?:\.\d*)?|\.\d+)'
+                  r'\s*(?P<unit>m|meters?|metres?|s|secs?|seconds?)?$')
+
+# --validate: results further than this many robust standard deviations from
+# their event's median are reported as outliers
+OUTLIER_THRESHOLD = 5.0
+
+VALIDATION_FILE = "results-check.csv"
+
+
+def event_metadata(events):
+    """
+    Table of scoring rules for the given events, indexed by EVENT.
+
+    kind is "measured" or "timed"; higher_is_better follows from it.
+    """
+    import pandas as pd
+    events = pd.Index(pd.unique(pd.Series(events, dtype=object).dropna().astype(str)), name='EVENT')
+    lowered = events.str.lower()
+    measured = pd.Series(False, index=events)
+    for keyword in MEASURED_EVENT_KEYWORDS:
+        measured |= lowered.str.contains(keyword, regex=False)
+    return pd.DataFrame({
+        'kind': measured.map({True: 'measured', False: 'timed'}),
+        'higher_is_better': measured,
+    })
+
+
+def parse_results(results):
+    """
+    Parse a result column into seconds or meters.
+
+    Reads numbers, Excel time cells, and text such as "65.3", "1:05.3",
+    "1:02:03.5", "12.4s" or "5.21 m". Returns a frame with value (float, NaN
+    if unreadable) and unit: "time" when the entry shows it is a time (a
+    colon, a seconds suffix or an Excel time), "distance" for a meters
+    suffix, and missing for a bare number.
+    """
+    import numpy as np
+    import pandas as pd
+    values = pd.to_numeric(results, errors='coerce').astype(float)
+    unit = pd.Series(None, index=results.index, dtype=object)
+    text_rows = values.isna() & results.notna()
+    if text_rows.any():
+        text = results[text_rows].astype(str).str.strip()
+        parts = text.str.extract(RESULT_PATTERN)
+        hours, minutes, seconds = (pd.to_numeric(parts[name], errors='coerce') for name in ('h', 'm', 's'))
+        parsed = seconds + minutes.fillna(0) * 60 + hours.fillna(0) * 3600
+        # 1:75.2 or 1:75:00 are typos, not times
+        parsed[(minutes.notna() & (seconds >= 60)) | (hours.notna() & (minutes >= 60))] = np.nan
+        suffix = parts['unit'].str.lower().str[0]
+        unit[text_rows] = np.where(minutes.notna() | (suffix == 's'), 'time',
+                                   np.where(suffix == 'm', 'distance', None))
+        # Whatever the pattern missed, e.g. Excel durations past a day
+        missed = parsed.isna()
+        if missed.any():
+            durations = pd.to_timedelta(text[missed], errors='coerce').dt.total_seconds()
+            parsed[missed] = durations
+            unit[missed[missed].index[durations.notna().to_numpy()]] = 'time'
+        values[text_rows] = parsed
+    return pd.DataFrame({'value': values, 'unit': unit})
+
+
+def result_values(results):
+    """
+    Result column as floats (seconds or meters), see parse_results.
+
+    Cells Excel stored as times (e.g. 00:05:22.71) become seconds.
+    """
+    return parse_results(results)['value']
+
+
+def numeric_results(df):
+    """
+    Numeric results of a results frame: the VALUE_COLUMN worked out when the
+    sheet was loaded, or parsed now for frames that don't have it.
+    """
+    if VALUE_COLUMN in df:
+        return df[VALUE_COLUMN].astype(float)
+    return result_values(df[RESULT_COLUMN])
+
+
+def display_results(results):
+    """
+    A result column as the page shows it: numbers stay numbers, anything
+    else (text such as "1:05.3", Excel time cells) as it was entered, and
+    blanks None.
+    """
+    # Not Series.map: it would turn 14 into 14.0 whenever no text is among the values
+    import pandas as pd
+    return pd.Series([None if pd.isna(v) else v if isinstance(v, (int, float)) else str(v) for v in results],
+                     index=results.index, dtype=object)
+
+
+def event_spreads(values, events):
+    """
+    Median and robust standard deviation (1.4826 x median absolute
+    deviation) of the positive values of each event, indexed by event name
+    (see validate_results).
+    """
+    import pandas as pd
+    valid = values.where(values > 0)
+    median = valid.groupby(events).median()
+    spread = (valid - events.map(median)).abs().groupby(events).median() * 1.4826
+    return pd.DataFrame({'median': median, 'spread': spread})
+
+
+def validate_results(results_df, threshold=OUTLIER_THRESHOLD, spreads=None):
+    """
+    Results that look wrong, one row each with ATHLETE, EVENT, MEET, the
+    result as entered, its value and the problem:
+
+        unreadable                 not a number, time or distance
+        not positive               zero or negative
+        time for a field event     e.g. "1:05.3" for the long jump
+        distance for a timed event e.g. "5.2m" for the 400
+        outlier                    further than `threshold` robust standard deviations
+                                   (1.4826 x median absolute deviation) from the
+                                   event's median
+
+    A row is listed once, for the first of these that applies. spreads are
+    the events' medians and spreads (see event_spreads) if results_df holds
+    only some of their results.
+    """
+    import numpy as np
+    parsed = parse_results(results_df[RESULT_COLUMN])
+    values = parsed['value']
+    events = results_df['EVENT'].astype(str)
+    measured = events.map(event_metadata(events)['higher_is_better']).astype(bool)
+
+    if spreads is None:
+        spreads = event_spreads(values, events)
+    spread = events.map(spreads['spread'])
+    deviation = (values.where(values > 0) - events.map(spreads['median'])).abs() / spread.where(spread > 0)
+
+    problem = np.select(
+        [values.isna() & results_df[RESULT_COLUMN].notna(),
+         values <= 0,
+         measured & (parsed['unit'] == 'time'),
+         ~measured & (parsed['unit'] == 'distance'),
+         deviation > threshold],
+        ['unreadable', 'not positive', 'time for a field event', 'distance for a timed event', 'outlier'],
+        default='')
+    flagged = problem != ''
+    report = results_df.loc[flagged, [c for c in ('ATHLETE', 'EVENT', 'MEET', RESULT_COLUMN) if c in results_df]]
+    return report.astype(object).assign(value=values[flagged], problem=problem[flagged])
+
+
+def print_validation(report, path=None):
+    """Print how many results look wrong (by problem) and write the rows to a CSV file if a path is given"""
+    if len(report) == 0:
+        print("Results check: no problems found")
+    else:
+        counts = report['problem'].value_counts()
+        print("Results check: " + ", ".join(f"{count} {problem}" for problem, count in counts.items())
+              + ("" if path else " (--validate lists them)"))
+    if path:
+        report.to_csv(path, index=False)
+        print(f"Results check written to {path}")
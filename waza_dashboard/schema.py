@@ -0,0 +1,35 @@
+"""
+Sheets and columns of the workbooks
+
+Each of the Athletes, Events and Results sheets gives one dataset. Only the
+columns listed in SHEET_SCHEMAS are read, stored as the dtypes given there.
+"""
+
+# Workbook sheet for each dataset (the "Events" sheet actually contains meets)
+SHEETS = {
+    "athletes": "Athletes",
+    "meets": "Events",
+    "results": "Results",
+}
+
+RESULT_COLUMN = 'Result (Seconds / Meters)'
+
+# Columns read from each sheet and the dtype each is stored as; other columns
+# in the workbook are never loaded. None keeps the values as read (results mix
+# numbers with Excel time cells).
+SHEET_SCHEMAS = {
+    "athletes": {"Athlete": "category", "BirthDate": "datetime", "Gender": "category"},
+    "meets": {"Meet": "category", "DATE": "datetime", "Season": "category"},
+    "results": {"ATHLETE": "category", "EVENT": "category", "MEET": "category", RESULT_COLUMN: None},
+}
+
+# Numeric value of each result (seconds or meters), added when the Results
+# sheet is loaded so later stages don't parse the column again
+VALUE_COLUMN = 'value'
+
+# Columns that identify the same row when it appears in several workbooks
+DEDUPLICATE_ON = {
+    "athletes": ['Athlete'],
+    "meets": ['Meet', 'DATE'],
+    "results": ['ATHLETE', 'MEET', 'EVENT', RESULT_COLUMN],
+}
@@ -0,0 +1,253 @@
+"""
+Build-time search indexes of the page's tables
+
+The page answers a search from a token index of the text each table shows
+instead of scanning every row; search_rows answers it the same way in Python.
+"""
+import itertools
+import json
+import os
+import re
+import time
+
+from .results import display_results
+from .schema import RESULT_COLUMN
+
+
+# Columns the athlete and meet tables of the page show (as _as_text formats
+# them); the results table shows athlete, event, result, meet and date
+TABLE_COLUMNS = {
+    "athletesTable": ('Athlete', 'BirthDate', 'Gender'),
+    "meetsTable": ('Meet', 'DATE', 'Season'),
+}
+
+
+def _as_text(df, column):
+    """Format a whole column the way f"{value}" formats a single cell"""
+    import pandas as pd
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    col = df[column]
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col.dt.strftime('%Y-%m-%d %H:%M:%S').fillna('NaT')
+    return col.astype(str).fillna('nan')
+
+
+def _tokens(text):
+    # Same words as the page's /[\p{L}\p{N}]+/gu on upper-cased text
+    return re.findall(r'[^\W_]+', str(text).upper())
+
+
+def _value_ids(values, ids):
+    """
+    Ids of a Series' values from ids ({value: id}), numbering the values it
+    does not have yet in the order they first appear (as pd.factorize does);
+    -1 for missing values.
+    """
+    import numpy as np
+    import pandas as pd
+    # Only the distinct values of these rows are looked up, so a chunk costs
+    # the same however many values ids already holds
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    value_ids = [ids.setdefault(value, len(ids)) for value in uniques.tolist()]
+    return np.array(value_ids + [-1], dtype=np.int64)[codes]
+
+
+class SearchIndexBuilder:
+    """
+    A search index (see build_search_index) built a chunk of rows at a time.
+
+    add() takes the searchable columns of the next rows and numbers the
+    distinct values of each column as they first appear; the code of every
+    row is kept in memory, or with a folder appended to a file there, so only
+    the distinct values are held. The postings are then gathered chunk_rows
+    rows at a time (all at once if None), in passes over those codes.
+    """
+
+    def __init__(self, folder=None, chunk_rows=None):
+        self.folder = folder
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self.values = []
+        self.codes = []
+
+    def add(self, fields):
+        """Add the next rows, given as one Series per searchable column"""
+        import numpy as np
+        if not self.values:
+            self.values = [{} for _ in fields]
+            self.codes = [[] if self.folder is None else os.path.join(self.folder, f"search-{field}.bin")
+                          for field in range(len(fields))]
+        for values, ids, codes in zip(fields, self.values, self.codes):
+            codes_of_rows = _value_ids(values, ids).astype(np.int32)
+            if self.folder is None:
+                codes.append(codes_of_rows)
+            else:
+                with open(codes, 'ab') as f:
+                    codes_of_rows.tofile(f)
+        self.rows += len(fields[0]) if fields else 0
+
+    def _code_blocks(self, field):
+        import numpy as np
+        if self.folder is None:
+            yield from self.codes[field]
+            return
+        with open(self.codes[field], 'rb') as f:
+            while True:
+                block = np.fromfile(f, dtype=np.int32, count=self.chunk_rows or -1)
+                if not len(block):
+                    return
+                yield block
+
+    def _postings(self, field):
+        """Yield the delta-encoded row ids of each value of a column, in id order"""
+        import numpy as np
+        keys = len(self.values[field])
+        counts = np.zeros(keys, dtype=np.int64)
+        for block in self._code_blocks(field):
+            counts += np.bincount(block[block >= 0], minlength=keys)
+        # Each pass gathers the rows of the next values holding about chunk_rows rows
+        limit = self.chunk_rows or max(self.rows, 1)
+        start = 0
+        while start < keys:
+            end = start + max(1, int(np.searchsorted(np.cumsum(counts[start:]), limit, side='right')))
+            rows, codes, offset = [], [], 0
+            for block in self._code_blocks(field):
+                hit = (block >= start) & (block < end)
+                rows.append(np.flatnonzero(hit) + offset)
+                codes.append(block[hit])
+                offset += len(block)
+            rows, codes = np.concatenate(rows), np.concatenate(codes)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(start, end + 1))
+            rows = rows[order]
+            for key in range(end - start):
+                yield np.diff(rows[bounds[key]:bounds[key + 1]], prepend=0).tolist()
+            start = end
+
+    def _token_refs(self):
+        token_keys = {}
+        key = 0
+        for ids in self.values:
+            for value in ids:
+                for token in set(_tokens(value)):
+                    token_keys.setdefault(token, []).append(key)
+                key += 1
+        tokens = sorted(token_keys)
+        return tokens, [token_keys[token] for token in tokens]
+
+    def index(self):
+        """The search index (see build_search_index)"""
+        tokens, refs = self._token_refs()
+        return {
+            "rows": self.rows,
+            "tokens": tokens,
+            "refs": refs,
+            "postings": [postings for field in range(len(self.values)) for postings in self._postings(field)],
+        }
+
+    def chunks(self, chunk_keys=5000):
+        """The search index as JSON chunks (json.dumps of index()), chunk_keys postings at a time"""
+        tokens, refs = self._token_refs()
+        yield (f'{{"rows":{self.rows},"tokens":' + json.dumps(tokens, separators=(',', ':'), ensure_ascii=False)
+               + ',"refs":' + json.dumps(refs, separators=(',', ':')) + ',"postings":[')
+        postings = itertools.chain.from_iterable(self._postings(field) for field in range(len(self.values)))
+        first = True
+        for batch in iter(lambda: list(itertools.islice(postings, chunk_keys)), []):
+            yield ("" if first else ",") + json.dumps(batch, separators=(',', ':'))[1:-1]
+            first = False
+        yield "]}"
+
+
+def build_search_index(fields):
+    """
+    Token inverted index over columns of a table.
+
+    fields holds one Series per searchable column, in table row order (row id
+    = position). Every distinct value of a column is a key with a posting
+    list of the rows holding it; every word of a value points at that key.
+
+        rows       number of rows
+        tokens     sorted upper-cased words; a word of a query finds every token containing it
+        refs       for each token, the keys whose value contains it
+        postings   for each key, its row ids delta-encoded (ascending)
+
+    SearchIndexBuilder builds the same index from the rows in chunks.
+    """
+    builder = SearchIndexBuilder()
+    if fields:
+        builder.add(fields)
+    return builder.index()
+
+
+def search_rows(index, query, row_text):
+    """
+    Row ids matching query, the same way the page's searchIndex() does it:
+    the rows whose displayed text contains the query.
+
+    row_text(row id) gives the displayed text of a row, upper-cased.
+    """
+    phrase = query.strip().upper()
+    if not phrase:
+        return None
+    terms = _tokens(phrase)
+    lookups = []
+    for term in terms:
+        keys = {key for token, refs in zip(index["tokens"], index["refs"]) if term in token for key in refs}
+        lookups.append((sum(len(index["postings"][key]) for key in keys), keys))
+    matches = None
+    for size, keys in sorted(lookups, key=lambda lookup: lookup[0]):
+        if matches is not None and size > len(matches):
+            break
+        found = set()
+        for key in keys:
+            found.update(itertools.accumulate(index["postings"][key]))
+        matches = found if matches is None else matches & found
+    if matches is None:
+        matches = range(index["rows"])
+    if terms != [phrase]:
+        matches = {row for row in matches if phrase in row_text(row)}
+    return sorted(matches)
+
+
+def _day_text(values):
+    import pandas as pd
+    return pd.to_datetime(values, errors='coerce').dt.strftime('%Y-%m-%d')
+
+
+def _result_text(values):
+    """
+    Results (see display_results) as the page's results table shows them:
+    14, not 14.0, and text as entered; None when missing
+    """
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(values)
+    text = [value if isinstance(value, str) else str(int(value)) if float(value).is_integer() else repr(value)
+            for value in uniques.tolist()]
+    return pd.Series(np.array(text + [None], dtype=object)[codes], index=values.index)
+
+
+def table_search_fields(table, df):
+    """Searchable columns of each page table: the text of every column the table shows"""
+    import pandas as pd
+    if table in TABLE_COLUMNS:
+        return [_as_text(df, name) for name in TABLE_COLUMNS[table]]
+
+    def column(name):
+        return df[name] if name in df else pd.Series(index=df.index, dtype=object)
+
+    results = _result_text(display_results(column(RESULT_COLUMN)))
+    return [column('ATHLETE'), column('EVENT'), results, column('MEET'), _day_text(column('DATE'))]
+
+
+def search_indexes(tables):
+    """{table id: search index} for the given {table id: DataFrame}, with a size report"""
+    indexes = {}
+    for table, df in tables.items():
+        start = time.perf_counter()
+        indexes[table] = build_search_index(table_search_fields(table, df))
+        text = json.dumps(indexes[table], separators=(',', ':'), ensure_ascii=False)
+        print(f"Search index {table}: {len(df)} rows, {len(indexes[table]['tokens'])} tokens, "
+              f"{len(text.encode('utf-8')) / 1024:.1f} KB, built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return indexes
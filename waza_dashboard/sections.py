@@ -0,0 +1,707 @@
+"""
+The page's sections
+
+Each section is an HTML fragment or JSON data for the page script.
+SECTION_INPUTS lists the datasets each depends on, so an incremental build
+only renders the sections whose sheets changed.
+"""
+import functools
+import json
+import os
+import time
+from html import escape
+
+from .aggregate import (AGE_GROUPS, ALL, LEADERBOARD_SIZE, age_group_codes, athlete_details, compute_leaderboards,
+                        compute_meet_stats, compute_prs, progression_series, result_seasons)
+from .load import merge_results, sort_meets
+from .profiling import PROFILER
+from .results import display_results, event_metadata, numeric_results
+from .schema import RESULT_COLUMN
+from .search import TABLE_COLUMNS, _as_text, _value_ids, search_indexes
+from .shards import ShardWriter
+
+
+# Which datasets each generated section of the page depends on
+SECTION_INPUTS = {
+    "stats": ("athletes", "meets", "results"),
+    "athlete_rows": ("athletes",),
+    "meet_rows": ("meets",),
+    "athlete_options": ("athletes",),
+    "event_options": ("results",),
+    "results_json": ("results", "meets"),
+    "pr_index": ("results", "meets"),
+    "progression": ("results", "meets"),
+    "rankings": ("athletes", "meets", "results"),
+    "team_summary": ("results", "meets"),
+    "meet_index": ("results", "meets"),
+    "shard_manifest": ("athletes", "meets", "results"),
+    "app_manifest": ("athletes", "meets", "results"),
+    "search_index": ("athletes", "meets", "results"),
+}
+
+# Sections that also write the shards under output_dir/SHARD_DIR; a cached copy
+# is only reused for the same output directory and while its shards exist
+SHARD_SECTIONS = ("shard_manifest", "app_manifest")
+
+# Sections that are JSON data for the page script (the rest are HTML)
+DATA_SECTIONS = ("results_json", "pr_index", "progression", "rankings", "meet_index", "shard_manifest",
+                 "app_manifest", "search_index")
+
+# Sections each output mode puts in the page. "single" embeds every result;
+# "sharded" writes a small shell page and fetches JSON shards on demand;
+# "app" also moves the tables into a shard and the CSS/script into cacheable
+# asset files, and adds a service worker for repeat and offline visits.
+PAGE_SECTIONS = {
+    "single": ("stats", "team_summary", "athlete_rows", "meet_rows", "athlete_options", "event_options",
+               "search_index", "results_json", "pr_index", "progression", "rankings", "meet_index"),
+    "sharded": ("stats", "team_summary", "athlete_rows", "meet_rows", "athlete_options", "event_options",
+                "search_index", "shard_manifest"),
+    "app": ("stats", "team_summary", "athlete_options", "event_options", "app_manifest"),
+}
+
+# Large payloads are serialized and written this many rows at a time
+RENDER_CHUNK_ROWS = 5000
+
+
+def render_stats(athletes_df, meets_df, results_df):
+    return f"""        <div class="stats">
+            <div class="stat-card">
+                <div class="stat-number">{len(athletes_df)}</div>
+                <div class="stat-label">Athletes</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{len(meets_df)}</div>
+                <div class="stat-label">Meets</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{len(results_df)}</div>
+                <div class="stat-label">Results</div>
+            </div>
+        </div>
+"""
+
+
+def table_rows_json(df, columns):
+    """JSON array of rows of display text for the paged tables in the page"""
+    import pandas as pd
+    if len(df) == 0:
+        return "[]"
+    cells = pd.DataFrame({column: formatter(df, column).astype(object) for column, formatter in columns})
+    return json.dumps(cells.values.tolist(), separators=(',', ':'), ensure_ascii=False)
+
+
+def render_athlete_rows(athletes_df):
+    return table_rows_json(athletes_df, [(column, _as_text) for column in TABLE_COLUMNS["athletesTable"]])
+
+
+def render_meet_rows(meets_df):
+    return table_rows_json(meets_df, [(column, _as_text) for column in TABLE_COLUMNS["meetsTable"]])
+
+
+def _options(values):
+    values = values.astype(str).map(escape)
+    return "".join(('<option value="' + values + '">' + values + '</option>\n').tolist())
+
+
+def render_athlete_options(athletes_df):
+    return _options(athletes_df['Athlete'].dropna())
+
+
+def render_event_options(results_df):
+    import pandas as pd
+    unique_events = pd.Series(sorted(str(e) for e in results_df['EVENT'].dropna().unique()), dtype=object)
+    return _options(unique_events)
+
+
+def _json_array(values, chunk_rows=RENDER_CHUNK_ROWS):
+    """Yield a JSON array of plain Python values in chunks"""
+    yield "["
+    for start in range(0, len(values), chunk_rows):
+        body = json.dumps(values[start:start + chunk_rows], separators=(',', ':'), ensure_ascii=False)[1:-1]
+        yield ("," if start else "") + body
+    yield "]"
+
+
+def _file_chunks(path, size=1 << 20):
+    """Yield the text of a file in chunks of `size` characters"""
+    with open(path, encoding='utf-8') as f:
+        yield from iter(lambda: f.read(size), '')
+
+
+class ResultsPayload:
+    """
+    The columnar results payload (see encode_results) built a frame of
+    results at a time, in the order they are listed.
+
+    Names are numbered as they first appear. With a folder, the per-result
+    columns are appended to files there as they are made rather than kept in
+    memory, so only the name tables are held.
+    """
+
+    NAMES = {"athletes": 'ATHLETE', "events": 'EVENT', "meets": 'MEET'}
+    COLUMNS = ("athlete", "event", "meet", "result", "day")
+
+    def __init__(self, folder=None):
+        self.folder = folder
+        self.rows = 0
+        self.ids = {column: {} for column in self.NAMES.values()}
+        self.columns = {column: [] for column in self.COLUMNS}
+
+    def _path(self, column):
+        return os.path.join(self.folder, f"payload-{column}.json")
+
+    def add(self, results_with_dates):
+        """Add the next results (merged with their meets, see merge_results)"""
+        import pandas as pd
+        dates = pd.to_datetime(results_with_dates['DATE'], errors='coerce')
+        days = dates.to_numpy().astype('datetime64[D]').astype('int64')
+        encoded = {
+            "athlete": _value_ids(results_with_dates['ATHLETE'], self.ids['ATHLETE']).tolist(),
+            "event": _value_ids(results_with_dates['EVENT'], self.ids['EVENT']).tolist(),
+            "meet": _value_ids(results_with_dates['MEET'], self.ids['MEET']).tolist(),
+            "result": display_results(results_with_dates[RESULT_COLUMN]).tolist(),
+            "day": pd.Series(days, dtype=object).where(dates.notna().to_numpy(), None).tolist(),
+        }
+        for column, values in encoded.items():
+            if self.folder is None:
+                self.columns[column].extend(values)
+            elif values:
+                with open(self._path(column), 'a', encoding='utf-8') as f:
+                    f.write(("," if self.rows else "")
+                            + json.dumps(values, separators=(',', ':'), ensure_ascii=False)[1:-1])
+        self.rows += len(results_with_dates)
+
+    def names(self):
+        return {key: [str(name) for name in self.ids[column]] for key, column in self.NAMES.items()}
+
+    def chunks(self):
+        """The payload as JSON chunks"""
+        for i, (key, names) in enumerate(self.names().items()):
+            yield ("{" if i == 0 else ",") + json.dumps(key) + ":"
+            yield from _json_array(names)
+        for column in self.COLUMNS:
+            yield "," + json.dumps(column) + ":"
+            if self.folder is None:
+                yield from _json_array(self.columns[column])
+            else:
+                yield "["
+                if self.rows:
+                    yield from _file_chunks(self._path(column))
+                yield "]"
+        yield "}"
+
+
+def encode_results(results_with_dates):
+    """
+    Columnar, dictionary-encoded form of the merged results.
+
+    Returns a dict of plain lists: name tables for athletes, events and meets,
+    per-result ids into them (-1 for a missing meet), the result as the page
+    shows it (see display_results) and the meet date as days since 1970-01-01
+    (None when unknown).
+    """
+    payload = ResultsPayload()
+    payload.add(results_with_dates)
+    return {**payload.names(), **payload.columns}
+
+
+def render_results_json(results_with_dates):
+    """Yield the columnar results payload (see encode_results) as JSON chunks"""
+    payload = ResultsPayload()
+    payload.add(results_with_dates)
+    yield from payload.chunks()
+
+
+def payload_report(results_with_dates, repeats=5):
+    """Print size and JSON parse time of the row-oriented vs columnar payload"""
+    def measure(text):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            json.loads(text)
+        return len(text.encode('utf-8')), (time.perf_counter() - start) / repeats
+
+    records = results_with_dates.to_json(orient='records', date_format='iso')
+    columnar = "".join(render_results_json(results_with_dates))
+    old_size, old_parse = measure(records)
+    new_size, new_parse = measure(columnar)
+    print(f"Results payload: records {old_size / 1024:.1f} KB (parse {old_parse * 1000:.1f} ms)"
+          f" -> columnar {new_size / 1024:.1f} KB (parse {new_parse * 1000:.1f} ms),"
+          f" {new_size / old_size:.0%} of the old size")
+
+
+def pr_index(results_with_dates, prs=None):
+    """
+    {athlete: [[event, result, meet, 'YYYY-MM-DD'], ...]} sorted by event
+
+    prs are the PRs if already worked out (see compute_prs), e.g. by the database.
+    """
+    import pandas as pd
+    if prs is None:
+        prs = compute_prs(results_with_dates)
+    days = pd.to_datetime(prs['DATE'], errors='coerce').dt.strftime('%Y-%m-%d')
+    records = pd.DataFrame({
+        'EVENT': prs['EVENT'].astype(object),
+        'result': display_results(prs[RESULT_COLUMN]),
+        'MEET': prs['MEET'].astype(object),
+        'day': days.astype(object),
+    })
+    records = records.where(records.notna(), None).values.tolist()
+
+    index = {}
+    for athlete, record in zip(prs['ATHLETE'].tolist(), records):
+        index.setdefault(athlete, []).append(record)
+    return index
+
+
+def render_pr_index(results_with_dates, prs=None):
+    """JSON lookup of each athlete's PRs so the page never scans all results"""
+    return json.dumps(pr_index(results_with_dates, prs), separators=(',', ':'), ensure_ascii=False)
+
+
+def render_progression(results_with_dates, per_meet=False, progression=None):
+    """JSON progression series per event (see progression_series; progression if already worked out)"""
+    if progression is None:
+        progression = progression_series(results_with_dates, per_meet)
+    return json.dumps(progression, separators=(',', ':'), ensure_ascii=False)
+
+
+def leaderboard_index(results_with_dates, athletes_df=None, boards=None):
+    """
+    Leaderboards for the Rankings tab (see compute_leaderboards; boards if
+    already worked out):
+
+        {"filters": {"seasons": [newest first], "genders": [...], "age_groups": [...]},
+         "events": {event: {"higher_is_better": bool,
+                            "boards": {"season|gender|age group": [[rank, athlete, result, meet, 'YYYY-MM-DD'], ...]}}}}
+    """
+    if boards is None:
+        boards = compute_leaderboards(results_with_dates, athletes_df)
+    return {"filters": leaderboard_filters(boards), "events": leaderboard_events(boards)}
+
+
+def leaderboard_filters(boards):
+    """The Rankings tab's filters (see leaderboard_index) for the boards of compute_leaderboards"""
+    def present(column):
+        return set(boards[column].tolist()) - {ALL}
+
+    latest = boards[boards['season'] != ALL].groupby('season')['DATE'].max()
+    return {
+        "seasons": latest.sort_values(ascending=False, kind='mergesort').index.tolist(),
+        "genders": sorted(present('gender')),
+        "age_groups": [label for label, _ in AGE_GROUPS if label in present('age_group')],
+    }
+
+
+def leaderboard_events(boards):
+    """{event: {"higher_is_better": bool, "boards": {...}}} for the boards of compute_leaderboards"""
+    import pandas as pd
+    records = pd.DataFrame({
+        'rank': boards['rank'].astype(object),
+        'ATHLETE': boards['ATHLETE'].astype(object),
+        'result': display_results(boards[RESULT_COLUMN]),
+        'MEET': boards['MEET'].astype(object),
+        'day': boards['DATE'].dt.strftime('%Y-%m-%d').astype(object),
+    })
+    records = records.where(records.notna(), None).values.tolist()
+    keys = (boards['season'] + '|' + boards['gender'] + '|' + boards['age_group']).tolist()
+    higher = event_metadata(boards['EVENT'])['higher_is_better']
+    events = {}
+    for event, key, record in zip(boards['EVENT'].tolist(), keys, records):
+        entry = events.get(event)
+        if entry is None:
+            entry = events[event] = {"higher_is_better": bool(higher[event]), "boards": {}}
+        entry["boards"].setdefault(key, []).append(record)
+    return events
+
+
+def all_time_boards(boards):
+    """The boards of compute_leaderboards that ignore season, gender and age group"""
+    return boards[((boards['season'] == ALL) & (boards['gender'] == ALL) & (boards['age_group'] == ALL)).to_numpy()]
+
+
+class RankingInputs:
+    """
+    What the single-file page needs to work out the leaderboards it does not
+    embed (see render_rankings), built a frame of results at a time in the
+    order the results payload lists them: each result's season and age
+    group as ids into the filters (-1 = on no board), the numeric mark of
+    the results whose shown result is not that number (value_row, value),
+    and each athlete's gender as an id into the filters.
+
+    With a folder, the per-result columns are appended to files there as
+    they are made rather than kept in memory.
+    """
+
+    COLUMNS = ("season", "age_group", "value_row", "value")
+
+    def __init__(self, filters, athletes_df=None, folder=None, size=LEADERBOARD_SIZE):
+        import pandas as pd
+        self.filters = filters
+        self.size = size
+        self.folder = folder
+        self.rows = 0
+        self.written = {column: False for column in self.COLUMNS}
+        self.columns = {column: [] for column in self.COLUMNS}
+        self.seasons = pd.Index(filters["seasons"], dtype=object)
+        self.age_groups = [filters["age_groups"].index(label) if label in filters["age_groups"] else -1
+                           for label, _ in AGE_GROUPS] + [-1]
+        people = athlete_details(athletes_df)
+        ids = {gender: i for i, gender in enumerate(filters["genders"])}
+        self.genders = {athlete: ids[gender] for athlete, gender in people['gender'].items() if gender in ids}
+        self.birth_years = people['birth_year']
+
+    def _path(self, column):
+        return os.path.join(self.folder, f"rankings-{column}.json")
+
+    def add(self, results_with_dates, seasons):
+        """Add the next results (merged with their meets) and their seasons (see result_seasons)"""
+        import numpy as np
+        import pandas as pd
+        dates = pd.to_datetime(results_with_dates['DATE'], errors='coerce')
+        birth_years = self.birth_years.reindex(results_with_dates['ATHLETE'].astype(str)).to_numpy(dtype=float)
+        ages = age_group_codes(dates.dt.year.to_numpy(dtype=float) - birth_years)
+        shown = display_results(results_with_dates[RESULT_COLUMN]).tolist()
+        values = numeric_results(results_with_dates).tolist()
+        # The page reads the rest of the marks from the results themselves
+        marks = [(row, None if value != value else value) for row, (result, value) in enumerate(zip(shown, values))
+                 if not (isinstance(result, (int, float)) and result == value)]
+        encoded = {
+            "season": self.seasons.get_indexer(pd.Index(seasons, dtype=object)).tolist(),
+            "age_group": np.asarray(self.age_groups)[ages].tolist(),
+            "value_row": [self.rows + row for row, _ in marks],
+            "value": [value for _, value in marks],
+        }
+        for column, column_values in encoded.items():
+            if self.folder is None:
+                self.columns[column].extend(column_values)
+            elif column_values:
+                with open(self._path(column), 'a', encoding='utf-8') as f:
+                    f.write(("," if self.written[column] else "")
+                            + json.dumps(column_values, separators=(',', ':'), ensure_ascii=False)[1:-1])
+                self.written[column] = True
+        self.rows += len(results_with_dates)
+
+    def chunks(self, events):
+        """
+        The Rankings data of the single-file page as JSON chunks, around the
+        boards it embeds (events, JSON chunks of leaderboard_events)
+        """
+        yield '{"filters":' + json.dumps(self.filters, separators=(',', ':'), ensure_ascii=False) + ',"events":'
+        yield from events
+        yield f',"size":{self.size},"genders":' + json.dumps(self.genders, separators=(',', ':'), ensure_ascii=False)
+        for column in self.COLUMNS:
+            yield "," + json.dumps(column) + ":"
+            if self.folder is None:
+                yield from _json_array(self.columns[column])
+            else:
+                yield "["
+                if self.written[column]:
+                    yield from _file_chunks(self._path(column))
+                yield "]"
+        yield "}"
+
+
+def render_rankings(results_with_dates, athletes_df, boards=None):
+    """
+    Yield the leaderboards of the single-file page as JSON chunks: the
+    filters and all-time boards of leaderboard_index, and the RankingInputs
+    the page works out the other boards from.
+    """
+    if boards is None:
+        boards = compute_leaderboards(results_with_dates, athletes_df)
+    inputs = RankingInputs(leaderboard_filters(boards), athletes_df)
+    inputs.add(results_with_dates, result_seasons(results_with_dates))
+    events = json.dumps(leaderboard_events(all_time_boards(boards)), separators=(',', ':'), ensure_ascii=False)
+    return inputs.chunks([events])
+
+
+def _runs(keys, records):
+    """(key, records[start:end]) for every run of equal keys; records line up with keys"""
+    import numpy as np
+    import pandas as pd
+    codes, names = pd.factorize(keys)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=np.int64)
+    ends = np.r_[starts[1:], len(codes)]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield str(names[codes[start]]), records[start:end]
+
+
+def meet_marks(results_with_dates, entries, first_row=0):
+    """
+    The marks listed in the meet details (see meet_index): MEET, EVENT,
+    ATHLETE, score (the numeric result, negated where higher is better),
+    result (as shown, see display_results), DATE, row and flag of each of the
+    entries of compute_meet_stats. first_row is
+    the position in the results payload of the first of results_with_dates.
+    """
+    import numpy as np
+    import pandas as pd
+    rows = entries['row'].to_numpy()
+    values = numeric_results(results_with_dates).to_numpy()[rows]
+    marks = pd.DataFrame({
+        'MEET': entries['MEET'].astype(str).to_numpy(),
+        'EVENT': results_with_dates['EVENT'].astype(str).to_numpy()[rows],
+        'ATHLETE': results_with_dates['ATHLETE'].astype(str).to_numpy()[rows],
+        'score': values,
+        'result': display_results(results_with_dates[RESULT_COLUMN]).to_numpy()[rows],
+        'DATE': pd.to_datetime(results_with_dates['DATE'], errors='coerce').to_numpy()[rows],
+        'row': rows + first_row,
+        'flag': entries['flag'].to_numpy(),
+    })
+    higher = event_metadata(marks['EVENT'])['higher_is_better']
+    marks['score'] *= np.where(marks['EVENT'].map(higher).astype(bool), -1.0, 1.0)
+    return marks
+
+
+def meet_details(marks, meets, inline=False):
+    """
+    {meet: details} (see meet_index) for the meets of a per-meet summary
+    (see TeamSummary.meets), in its order, from their marks (see meet_marks).
+    """
+    import pandas as pd
+    marks = marks.sort_values(['MEET', 'EVENT', 'score', 'ATHLETE', 'DATE', 'row'], kind='mergesort')
+    if inline:
+        records = marks[['row', 'flag']].values.tolist()
+    else:
+        records = pd.DataFrame({
+            'EVENT': marks['EVENT'].to_numpy(),
+            'ATHLETE': marks['ATHLETE'].to_numpy(),
+            'result': marks['result'].to_numpy(),
+            'flag': marks['flag'].to_numpy(),
+        }).astype(object).values.tolist()
+    details = dict(_runs(marks['MEET'], records))
+
+    summary = pd.DataFrame({
+        'date': meets['DATE'].dt.strftime('%Y-%m-%d').astype(object),
+        'season': meets['season'].astype(object),
+    }, index=meets.index)
+    summary = summary.where(summary.notna(), None)
+    index = {}
+    for meet, date, season, athletes, events, results, prs, first_marks in zip(
+            meets.index.astype(str), summary['date'], summary['season'], meets['athletes'].tolist(),
+            meets['events'].tolist(), meets['results'].tolist(), meets['prs'].tolist(),
+            meets['first_marks'].tolist()):
+        entry = index[meet] = {"date": date, "season": season, "athletes": athletes, "events": events,
+                               "results": results, "prs": prs, "first_marks": first_marks}
+        marks = details.get(meet, [])
+        if inline:
+            entry["rows"] = [row for row, _ in marks]
+            entry["flags"] = [flag for _, flag in marks]
+        else:
+            entry["entries"] = marks
+    return index
+
+
+def meet_index(results_with_dates, stats=None, inline=False):
+    """
+    Details of every meet for the Meets tab (see compute_meet_stats):
+
+        {meet: {"date": 'YYYY-MM-DD', "season": ..., "athletes": n, "events": n, "results": n, "prs": n,
+                "first_marks": n, "entries": [[event, athlete, result, flag], ...]}}
+
+    entries are the meet's marks by event, best first; flag is PR_FLAG,
+    FIRST_FLAG or 0. inline (for the single-file page, which already holds
+    every result) replaces entries with "rows", positions in the results
+    payload, and "flags".
+    """
+    if stats is None:
+        stats = compute_meet_stats(results_with_dates)
+    return meet_details(meet_marks(results_with_dates, stats["entries"]), stats["meets"], inline)
+
+
+def render_meet_index(results_with_dates, stats=None):
+    """JSON meet details for the single-file page (see meet_index)"""
+    return json.dumps(meet_index(results_with_dates, stats, inline=True), separators=(',', ':'), ensure_ascii=False)
+
+
+def render_team_summary(results_with_dates, stats=None):
+    """The Meets tab's per-season summary table (see compute_meet_stats)"""
+    import pandas as pd
+    if stats is None:
+        stats = compute_meet_stats(results_with_dates)
+
+    def percent(value):
+        return "&ndash;" if pd.isna(value) else f"{value:+.1f}%"
+
+    seasons = stats["seasons"]
+    rows = []
+    for season, meets, athletes, results, prs, compared, improved, improvement in zip(
+            seasons.index, seasons['meets'], seasons['athletes'], seasons['results'], seasons['prs'],
+            seasons['compared'], seasons['improved'], seasons['improvement']):
+        improved = "&ndash;" if pd.isna(improved) else f"{improved:.0f}%"
+        rows.append(f"""                        <tr>
+                            <td>{escape(str(season))}</td>
+                            <td>{meets}</td>
+                            <td>{athletes}</td>
+                            <td>{results}</td>
+                            <td>{prs}</td>
+                            <td>{compared}</td>
+                            <td>{improved}</td>
+                            <td>{percent(improvement)}</td>
+                        </tr>
+""")
+    return f"""                <h3 style="margin-bottom: 10px;">Season summary</h3>
+                <p style="color: #666;">Returning: athlete-events also entered in the previous season of the same kind;
+                    improved and median change compare their season bests.</p>
+                <table style="margin-bottom: 30px;">
+                    <thead>
+                        <tr>
+                            <th>Season</th>
+                            <th>Meets</th>
+                            <th>Athletes</th>
+                            <th>Results</th>
+                            <th>PRs</th>
+                            <th>Returning</th>
+                            <th>Improved</th>
+                            <th>Median change</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+{"".join(rows)}                    </tbody>
+                </table>
+"""
+
+
+def write_shards(results_with_dates, output_dir, per_meet=False, compress=False, tables=None, athletes_df=None,
+                 prs=None, meet_stats=None, progression=None, leaderboards=None):
+    """
+    Write the JSON shards of the sharded build under output_dir/SHARD_DIR.
+
+        results-<hash>.json          all results (columnar, see encode_results)
+        search-<hash>.json           search index of the results table
+        tables-<hash>.json           the `tables` text, if given (app mode)
+        athletes/<name>-<hash>.json  {"athlete": ..., "prs": [...]} for the PR tab
+        events/<name>-<hash>.json    that event's progression series for the chart
+        rankings/<name>-<hash>.json  that event's leaderboards (see leaderboard_index)
+        meets/<name>-<hash>.json     that meet's details (see meet_index)
+        manifest.json                paths of all of the above, and the Rankings tab's filters
+
+    <hash> is a hash of the shard's contents (see ShardWriter). Shards left
+    over from earlier builds are removed. With compress, every shard also
+    gets .gz/.br copies (see precompress). prs: see pr_index; meet_stats:
+    see compute_meet_stats; progression: see progression_series;
+    leaderboards: see compute_leaderboards (each worked out here if not
+    given). Returns the manifest; its paths are relative to the page.
+    """
+    shards = ShardWriter(output_dir, compress)
+    manifest = {
+        "results": shards.add_chunks("", "results", render_results_json(results_with_dates)),
+        "search": shards.add("", "search",
+                             json.dumps(search_indexes({"resultsTable": results_with_dates})["resultsTable"],
+                                        separators=(',', ':'), ensure_ascii=False)),
+    }
+    if tables is not None:
+        manifest["tables"] = shards.add("", "tables", tables)
+    manifest["athletes"] = {}
+    manifest["events"] = {}
+
+    for athlete, records in pr_index(results_with_dates, prs).items():
+        manifest["athletes"][athlete] = shards.add("athletes", athlete, json.dumps(
+            {"athlete": athlete, "prs": records}, separators=(',', ':'), ensure_ascii=False))
+
+    if progression is None:
+        progression = progression_series(results_with_dates, per_meet)
+    for event, series in sorted(progression.items()):
+        manifest["events"][event] = shards.add("events", event,
+                                               json.dumps(series, separators=(',', ':'), ensure_ascii=False))
+
+    rankings = leaderboard_index(results_with_dates, athletes_df, leaderboards)
+    manifest["rankings"] = {"filters": rankings["filters"], "events": {}}
+    for event, leaderboards in sorted(rankings["events"].items()):
+        manifest["rankings"]["events"][event] = shards.add("rankings", event, json.dumps(
+            leaderboards, separators=(',', ':'), ensure_ascii=False))
+
+    manifest["meets"] = {}
+    for meet, details in meet_index(results_with_dates, meet_stats).items():
+        manifest["meets"][meet] = shards.add("meets", meet,
+                                             json.dumps(details, separators=(',', ':'), ensure_ascii=False))
+    return shards.finish(manifest)
+
+
+def render_tables_shard(athletes_df, meets_df):
+    """JSON of the athlete and meet table rows and their search indexes (app mode's tables shard)"""
+    search = json.dumps(search_indexes({"athletesTable": athletes_df, "meetsTable": meets_df}),
+                        separators=(',', ':'), ensure_ascii=False)
+    return (f'{{"athletesTable":{render_athlete_rows(athletes_df)},"meetsTable":{render_meet_rows(meets_df)},'
+            f'"search":{search}}}')
+
+
+def render_sections(frames, stale, output_dir=".", mode="single", per_meet=False, compress=False):
+    """
+    Render the sections listed in `stale`; results are merged only if needed.
+
+    The results payload comes back as a generator of chunks so the caller
+    can stream it straight to disk. The shard_manifest section also writes
+    the shards under output_dir (with precompressed copies if compress).
+    Frames loaded from the database come with the merged results, PRs, meet
+    stats, progression series and leaderboards (see ResultsDatabase.load),
+    which are used instead of working them out.
+    """
+    athletes_df, meets_df, results_df = frames["athletes"], frames["meets"], frames["results"]
+
+    # Sort meets by date (newest first)
+    with PROFILER.stage("sort"):
+        meets_df = sort_meets(meets_df)
+
+    results_with_dates = None
+    if stale & {"results_json", "pr_index", "progression", "rankings", "team_summary", "meet_index",
+                "shard_manifest", "app_manifest"} \
+            or ("search_index" in stale and mode == "single"):
+        results_with_dates = frames.get("results_with_dates")
+        if results_with_dates is None:
+            results_with_dates = merge_results(results_df, meets_df)
+    prs = frames.get("prs")
+
+    # The team summary, meet details and meet shards share one pass over the results
+    @functools.lru_cache(maxsize=None)
+    def meet_stats():
+        return frames["meet_stats"] if "meet_stats" in frames else compute_meet_stats(results_with_dates)
+
+    @functools.lru_cache(maxsize=None)
+    def progression():
+        return frames["progression"] if "progression" in frames else progression_series(results_with_dates, per_meet)
+
+    @functools.lru_cache(maxsize=None)
+    def leaderboards():
+        if "leaderboards" in frames:
+            return frames["leaderboards"]
+        return compute_leaderboards(results_with_dates, athletes_df)
+
+    # The sharded page fetches the results index with the results
+    search_tables = {"athletesTable": athletes_df, "meetsTable": meets_df}
+    if mode == "single":
+        search_tables["resultsTable"] = results_with_dates
+
+    renderers = {
+        "stats": lambda: render_stats(athletes_df, meets_df, results_df),
+        "athlete_rows": lambda: render_athlete_rows(athletes_df),
+        "meet_rows": lambda: render_meet_rows(meets_df),
+        "athlete_options": lambda: render_athlete_options(athletes_df),
+        "event_options": lambda: render_event_options(results_df),
+        "results_json": lambda: render_results_json(results_with_dates),
+        "pr_index": lambda: render_pr_index(results_with_dates, prs),
+        "progression": lambda: render_progression(results_with_dates, per_meet, progression()),
+        "rankings": lambda: render_rankings(results_with_dates, athletes_df, leaderboards()),
+        "team_summary": lambda: render_team_summary(results_with_dates, meet_stats()),
+        "meet_index": lambda: render_meet_index(results_with_dates, meet_stats()),
+        "shard_manifest": lambda: json.dumps(write_shards(results_with_dates, output_dir, per_meet, compress,
+                                                          athletes_df=athletes_df, prs=prs,
+                                                          meet_stats=meet_stats(), progression=progression(),
+                                                          leaderboards=leaderboards()),
+                                             separators=(',', ':'), ensure_ascii=False),
+        "app_manifest": lambda: json.dumps(write_shards(results_with_dates, output_dir, per_meet, compress,
+                                                        render_tables_shard(athletes_df, meets_df), athletes_df,
+                                                        prs, meet_stats(), progression(), leaderboards()),
+                                           separators=(',', ':'), ensure_ascii=False),
+        "search_index": lambda: json.dumps(search_indexes(search_tables), separators=(',', ':'),
+                                           ensure_ascii=False),
+    }
+    rendered = {}
+    for name in stale:
+        stage = f"{'serialize' if name in DATA_SECTIONS else 'render'} {name}"
+        with PROFILER.stage(stage):
+            rendered[name] = renderers[name]()
+        if not isinstance(rendered[name], str):
+            # Streamed sections do their work while the page is written
+            rendered[name] = PROFILER.timed_chunks(stage, rendered[name])
+    return rendered
@@ -0,0 +1,184 @@
+"""
+Shards of the sharded and app builds
+
+JSON files next to the page, named after their contents so hosts and
+browsers can cache them forever, with optional precompressed copies.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from .profiling import PROFILER
+
+try:
+    import brotli
+except ImportError:  # optional: --precompress then only writes .gz files
+    brotli = None
+
+
+# Sharded output keeps its JSON shards in this folder next to the page
+SHARD_DIR = "data"
+
+# Precompressed copies written next to the page and shards by --precompress
+# (.br only when the brotli module is installed)
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+def _manifest_paths(manifest):
+    """Every shard path in a manifest of write_shards"""
+    if isinstance(manifest, dict):
+        for value in manifest.values():
+            yield from _manifest_paths(value)
+    elif isinstance(manifest, str) and manifest.startswith(f"{SHARD_DIR}/"):
+        yield manifest
+
+
+def shards_exist(manifest, output_dir):
+    """Whether the manifest and every shard it lists are still on disk under output_dir"""
+    paths = [f"{SHARD_DIR}/manifest.json", *_manifest_paths(manifest)]
+    return all(os.path.exists(os.path.join(output_dir, *path.split('/'))) for path in paths)
+
+
+def _shard_file(name, text, extension=".json", sha1=None):
+    """
+    File name for a shard or asset: readable slug plus a hash of its contents.
+
+    A shard whose data changes gets a new name, so hosts and browsers can
+    cache shards forever and only the changed ones are downloaded again.
+    sha1 is the hash of contents that are not held as text (text is then None).
+    """
+    slug = re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or 'shard'
+    if sha1 is None:
+        sha1 = hashlib.sha1(text.encode('utf-8'))
+    return f"{slug}-{sha1.hexdigest()[:10]}{extension}"
+
+
+def write_if_changed(path, text):
+    """Write text to path unless the file already holds exactly that; returns True if written"""
+    data = text.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def precompress(path):
+    """
+    Write path.gz (and path.br if brotli is installed) for static hosts to serve as-is.
+
+    Copies newer than path are kept. Returns the number of files written.
+    """
+    written = 0
+    source_mtime = os.stat(path).st_mtime_ns
+    for suffix in COMPRESSED_SUFFIXES:
+        target = path + suffix
+        if suffix == ".br" and brotli is None:
+            continue
+        if os.path.exists(target) and os.stat(target).st_mtime_ns > source_mtime:
+            continue
+        with open(path, 'rb') as src, open(target, 'wb') as dst:
+            if suffix == ".gz":
+                # No name or timestamp in the header: same input, same bytes
+                with gzip.GzipFile(filename='', mode='wb', fileobj=dst, compresslevel=9, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, 1 << 20)
+            else:
+                compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=11)
+                for block in iter(lambda: src.read(1 << 20), b''):
+                    dst.write(compressor.process(block))
+                dst.write(compressor.finish())
+        written += 1
+    return written
+
+
+def remove_compressed(path):
+    """Delete precompressed copies of path (they would be served instead of the new file)"""
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+class ShardWriter:
+    """
+    Writes the shards of a sharded build under output_dir/SHARD_DIR as they are made.
+
+    Each shard is named after its contents (see _shard_file) and only written
+    if no shard of that name exists yet; with compress every shard also gets
+    .gz/.br copies (see precompress). finish() writes the manifest and
+    removes shards left over from earlier builds.
+    """
+
+    FOLDERS = ("", "athletes", "events", "rankings", "meets")
+
+    def __init__(self, output_dir, compress=False):
+        self.output_dir = output_dir
+        self.compress = compress
+        self.paths = set()
+        self.written = 0
+        self.compressed = 0
+
+    def _store(self, path, write):
+        full_path = os.path.join(self.output_dir, *path.split('/'))
+        with PROFILER.stage("write"):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            self.written += write(full_path)
+            if self.compress:
+                self.compressed += precompress(full_path)
+            else:
+                remove_compressed(full_path)
+        self.paths.add(path)
+        return path
+
+    def add(self, folder, name, text):
+        """Write shard `name` ("" folder = SHARD_DIR itself); returns its path relative to the page"""
+        path = f"{SHARD_DIR}/{folder}{'/' if folder else ''}{_shard_file(name, text)}"
+        return self._store(path, lambda full_path: write_if_changed(full_path, text))
+
+    def add_chunks(self, folder, name, chunks):
+        """Like add, for a shard given as text chunks; they are streamed to disk, never joined"""
+        sha1 = hashlib.sha1()
+        temporary = os.path.join(self.output_dir, SHARD_DIR, f".{os.getpid()}.tmp")
+        os.makedirs(os.path.dirname(temporary), exist_ok=True)
+        with open(temporary, 'wb') as f:
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                sha1.update(data)
+                f.write(data)
+        path = f"{SHARD_DIR}/{folder}{'/' if folder else ''}{_shard_file(name, None, sha1=sha1)}"
+
+        def write(full_path):
+            # Same name, same contents: keep the existing file (and its mtime)
+            if os.path.exists(full_path):
+                os.remove(temporary)
+                return False
+            os.replace(temporary, full_path)
+            return True
+        return self._store(path, write)
+
+    def finish(self, manifest):
+        """Write manifest.json and remove shards of earlier builds; returns the manifest"""
+        self._store(f"{SHARD_DIR}/manifest.json", lambda full_path: write_if_changed(
+            full_path, json.dumps(manifest, indent=1, ensure_ascii=False)))
+
+        removed = 0
+        for folder in self.FOLDERS:
+            shard_folder = os.path.join(self.output_dir, SHARD_DIR, folder)
+            for file_name in os.listdir(shard_folder) if os.path.isdir(shard_folder) else []:
+                shard_name = file_name
+                for suffix in COMPRESSED_SUFFIXES:
+                    shard_name = shard_name.removesuffix(suffix)
+                if shard_name.endswith(".json") \
+                        and f"{SHARD_DIR}/{folder}{'/' if folder else ''}{shard_name}" not in self.paths:
+                    os.remove(os.path.join(shard_folder, file_name))
+                    removed += file_name == shard_name
+
+        print(f"Shards: {len(self.paths)} files, {self.written} updated, {removed} removed"
+              + (f", {self.compressed} compressed copies written" if self.compress else ""))
+        return manifest
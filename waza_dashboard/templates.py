@@ -0,0 +1,1239 @@
+"""
+HTML, CSS and JavaScript templates of the dashboard
+
+The page is written as these fixed pieces with the rendered sections and
+data in between (see generate_dashboard._page_parts); the app mode's
+stylesheet, script and service worker and the athlete pages are cut from
+or filled into them as well.
+"""
+import string
+
+PAGE_HEAD = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>WAZA Track Club - Results Dashboard</title>
+    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    <style>
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh;
+            padding: 20px;
+        }
+        .container {
+            max-width: 1400px;
+            margin: 0 auto;
+        }
+        h1 {
+            color: white;
+            text-align: center;
+            margin-bottom: 30px;
+            font-size: 2.5rem;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+        }
+        .stats {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 20px;
+            margin-bottom: 30px;
+        }
+        .stat-card {
+            background: white;
+            padding: 25px;
+            border-radius: 10px;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            text-align: center;
+        }
+        .stat-number {
+            font-size: 3rem;
+            font-weight: bold;
+            color: #667eea;
+        }
+        .stat-label {
+            color: #666;
+            margin-top: 10px;
+            font-size: 1rem;
+        }
+        .section {
+            background: white;
+            padding: 30px;
+            border-radius: 10px;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            margin-bottom: 30px;
+        }
+        h2 {
+            color: #333;
+            margin-bottom: 20px;
+            padding-bottom: 10px;
+            border-bottom: 2px solid #667eea;
+        }
+        .search-box {
+            width: 100%;
+            padding: 12px 20px;
+            font-size: 16px;
+            border: 2px solid #ddd;
+            border-radius: 5px;
+            margin-bottom: 20px;
+        }
+        .search-box:focus {
+            outline: none;
+            border-color: #667eea;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 20px;
+        }
+        th {
+            background: #667eea;
+            color: white;
+            padding: 12px;
+            text-align: left;
+            font-weight: 600;
+        }
+        td {
+            padding: 12px;
+            border-bottom: 1px solid #eee;
+        }
+        tr:hover {
+            background: #f8f9fa;
+        }
+        .pr-badge {
+            background: #ffd700;
+            color: #333;
+            padding: 4px 8px;
+            border-radius: 4px;
+            font-weight: bold;
+            font-size: 0.85rem;
+        }
+        .footer {
+            text-align: center;
+            color: white;
+            margin-top: 40px;
+            padding: 20px;
+        }
+        .tabs {
+            display: flex;
+            gap: 10px;
+            margin-bottom: 20px;
+        }
+        .tab {
+            padding: 10px 20px;
+            background: #f0f0f0;
+            border: none;
+            border-radius: 5px;
+            cursor: pointer;
+            font-size: 16px;
+        }
+        .tab.active {
+            background: #667eea;
+            color: white;
+        }
+        .tab-content {
+            display: none;
+        }
+        .tab-content.active {
+            display: block;
+        }
+        .pager {
+            display: flex;
+            align-items: center;
+            justify-content: space-between;
+            gap: 10px;
+            margin-top: 15px;
+            color: #666;
+        }
+        .pager button {
+            padding: 8px 16px;
+            background: #667eea;
+            color: white;
+            border: none;
+            border-radius: 5px;
+            cursor: pointer;
+        }
+        .pager button:disabled {
+            background: #ccc;
+            cursor: default;
+        }
+        #meetsTable tbody tr {
+            cursor: pointer;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🏃 WAZA Track Club - Results Dashboard</h1>
+
+"""
+
+ATHLETES_OPEN = """
+        <div class="section">
+            <div class="tabs">
+                <button class="tab active" onclick="showTab('athletes')">Athletes</button>
+                <button class="tab" onclick="showTab('meets')">Meets</button>
+                <button class="tab" onclick="showTab('results')">Results</button>
+                <button class="tab" onclick="showTab('prs')">Personal Records</button>
+                <button class="tab" onclick="showTab('progression')">Progression</button>
+                <button class="tab" onclick="showTab('rankings')">Rankings</button>
+            </div>
+
+            <div id="athletes-content" class="tab-content active">
+                <h2>Athletes</h2>
+                <input type="text" class="search-box" id="athleteSearch" placeholder="Search athletes..." oninput="filterTable('athletesTable', 'athleteSearch')">
+                <table id="athletesTable">
+                    <thead>
+                        <tr>
+                            <th>Name</th>
+                            <th>Birth Date</th>
+                            <th>Gender</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+"""
+
+MEETS_OPEN = """
+                    </tbody>
+                </table>
+            </div>
+
+            <div id="meets-content" class="tab-content">
+                <h2>Meets</h2>
+"""
+
+MEETS_TABLE_OPEN = """
+                <p style="color: #666; margin-bottom: 10px;">Click a meet to see its results and the PRs set there.</p>
+                <input type="text" class="search-box" id="meetSearch" placeholder="Search meets..." oninput="filterTable('meetsTable', 'meetSearch')">
+                <table id="meetsTable">
+                    <thead>
+                        <tr>
+                            <th>Meet Name</th>
+                            <th>Date</th>
+                            <th>Location</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+"""
+
+RESULTS_OPEN = """
+                    </tbody>
+                </table>
+                <div id="meetDetail"></div>
+            </div>
+
+            <div id="results-content" class="tab-content">
+                <h2>All Results</h2>
+                <input type="text" class="search-box" id="resultSearch" placeholder="Search results..." oninput="filterTable('resultsTable', 'resultSearch')">
+                <table id="resultsTable">
+                    <thead>
+                        <tr>
+                            <th>Athlete</th>
+                            <th>Event</th>
+                            <th>Result</th>
+                            <th>Meet</th>
+                            <th>Date</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+"""
+
+PRS_OPEN = """
+                    </tbody>
+                </table>
+            </div>
+
+            <div id="prs-content" class="tab-content">
+                <h2>Personal Records</h2>
+                <p style="color: #666; margin-bottom: 20px;">Select an athlete to see their personal records:</p>
+                <select id="prAthlete" class="search-box" onchange="showPRs()">
+                    <option value="">-- Select Athlete --</option>
+"""
+
+PROGRESSION_OPEN = """
+                </select>
+                <div id="prTable"></div>
+            </div>
+
+            <div id="progression-content" class="tab-content">
+                <h2>Progression Over Time</h2>
+                <p style="color: #666; margin-bottom: 20px;">Select an event and athletes to view progression:</p>
+
+                <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin-bottom: 20px;">
+                    <div>
+                        <label style="display: block; margin-bottom: 10px; font-weight: 600;">Event:</label>
+                        <select id="progressionEvent" class="search-box">
+                            <option value="">-- Select Event --</option>
+"""
+
+PROGRESSION_ATHLETES_OPEN = """
+                        </select>
+                    </div>
+                    <div>
+                        <label style="display: block; margin-bottom: 10px; font-weight: 600;">Athletes (hold Ctrl/Cmd to select multiple):</label>
+                        <select id="progressionAthletes" class="search-box" multiple style="height: 150px;">
+"""
+
+PROGRESSION_CLOSE = """
+                        </select>
+                    </div>
+                </div>
+                <button onclick="updateProgression()" style="width: 100%; padding: 15px; background: #667eea; color: white; border: none; border-radius: 5px; font-size: 16px; font-weight: 600; cursor: pointer; margin-bottom: 20px;">Generate Chart</button>
+                <div id="progressionChart" style="width: 100%; height: 500px;"></div>
+            </div>
+
+            <div id="rankings-content" class="tab-content">
+                <h2>Rankings</h2>
+                <p style="color: #666; margin-bottom: 20px;">Club leaderboards: each athlete's best mark in the event.</p>
+                <div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 20px; margin-bottom: 20px;">
+                    <select id="rankingEvent" class="search-box" onchange="showRankings()">
+                        <option value="">-- Select Event --</option>
+"""
+
+RANKINGS_CLOSE = """
+                    </select>
+                    <select id="rankingSeason" class="search-box" onchange="showRankings()"></select>
+                    <select id="rankingGender" class="search-box" onchange="showRankings()"></select>
+                    <select id="rankingAgeGroup" class="search-box" onchange="showRankings()"></select>
+                </div>
+                <div id="rankingTable"></div>
+            </div>
+        </div>
+
+"""
+
+SCRIPT_OPEN = """
+    <script>
+        // Tab switching
+        function showTab(tabName) {
+            // Hide all tabs
+            document.querySelectorAll('.tab-content').forEach(content => {
+                content.classList.remove('active');
+            });
+            document.querySelectorAll('.tab').forEach(tab => {
+                tab.classList.remove('active');
+            });
+
+            // Show selected tab
+            document.getElementById(tabName + '-content').classList.add('active');
+            event.target.classList.add('active');
+
+            if (tabName === 'results') {
+                ensureResultsTable();
+            }
+        }
+
+        // Names come from the workbook, so everything put into innerHTML is
+        // escaped first; a name containing markup shows as typed
+        const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+
+        function escapeHtml(value) {
+            return String(value ?? '').replace(/[&<>"']/g, c => HTML_ESCAPES[c]);
+        }
+
+        // Paged tables: rows are kept as data and only one page is in the DOM
+        const PAGE_SIZE = 100;
+        const SEARCH_DELAY_MS = 150;
+        const pagedTables = {};
+        const searchTimers = {};
+
+        function setTableRows(tableId, rows, searchId) {
+            const index = searchIndexes[tableId];
+            pagedTables[tableId] = {
+                rows: rows,
+                index: index,
+                // Without a build-time index, search one upper-cased line of text per row
+                text: index ? null : rows.map(row => row.join(' ').toUpperCase()),
+                matches: null,
+                page: 0
+            };
+            if (searchId && document.getElementById(searchId).value) {
+                applyFilter(tableId, searchId);
+            } else {
+                renderTablePage(tableId);
+            }
+        }
+
+        function renderTablePage(tableId) {
+            const state = pagedTables[tableId];
+            const table = document.getElementById(tableId);
+            const total = state.matches ? state.matches.length : state.rows.length;
+            const pages = Math.max(1, Math.ceil(total / PAGE_SIZE));
+            state.page = Math.min(Math.max(state.page, 0), pages - 1);
+            const start = state.page * PAGE_SIZE;
+            const end = Math.min(start + PAGE_SIZE, total);
+
+            const html = [];
+            for (let i = start; i < end; i++) {
+                const row = state.rows[state.matches ? state.matches[i] : i];
+                html.push('<tr><td>' + row.map(escapeHtml).join('</td><td>') + '</td></tr>');
+            }
+            table.querySelector('tbody').innerHTML = html.join('');
+
+            let pager = document.getElementById(tableId + 'Pager');
+            if (!pager) {
+                pager = document.createElement('div');
+                pager.id = tableId + 'Pager';
+                pager.className = 'pager';
+                table.insertAdjacentElement('afterend', pager);
+            }
+            pager.innerHTML = `
+                <button onclick="changePage('${tableId}', -1)" ${state.page === 0 ? 'disabled' : ''}>Previous</button>
+                <span>${total === 0 ? 'No matches' : `Showing ${start + 1}-${end} of ${total}`}</span>
+                <button onclick="changePage('${tableId}', 1)" ${state.page >= pages - 1 ? 'disabled' : ''}>Next</button>`;
+        }
+
+        function changePage(tableId, step) {
+            pagedTables[tableId].page += step;
+            renderTablePage(tableId);
+        }
+
+        function applyFilter(tableId, searchId) {
+            const state = pagedTables[tableId];
+            if (!state) {
+                return;  // rows not loaded yet; setTableRows applies the filter
+            }
+            const filter = document.getElementById(searchId).value.trim().toUpperCase();
+            state.matches = null;
+            if (state.index) {
+                state.matches = searchIndex(state.index, filter,
+                                            row => state.rows[row].join(' ').toUpperCase());
+            } else if (filter) {
+                state.matches = [];
+                state.text.forEach((text, i) => {
+                    if (text.indexOf(filter) > -1) {
+                        state.matches.push(i);
+                    }
+                });
+            }
+            state.page = 0;
+            renderTablePage(tableId);
+        }
+
+        // Search a build-time index (see build_search_index) for the rows whose
+        // rowText(row) contains the query, like a scan of the rows would: the
+        // rows holding a word that contains each word of the query are looked
+        // up, then checked against rowText unless the query is a single word.
+        // Words are looked up fewest postings first; a word with more postings
+        // than there are rows left is left to the rowText check.
+        // Returns matching row ids in table order, or null for an empty query.
+        function searchIndex(index, query, rowText) {
+            const phrase = query.trim().toUpperCase();
+            if (!phrase) {
+                return null;
+            }
+            const terms = phrase.match(/[\\p{L}\\p{N}]+/gu) || [];
+            const lookups = terms.map(term => {
+                const keys = new Set();
+                let size = 0;
+                for (let t = 0; t < index.tokens.length; t++) {
+                    if (index.tokens[t].includes(term)) {
+                        for (const key of index.refs[t]) {
+                            if (!keys.has(key)) {
+                                keys.add(key);
+                                size += index.postings[key].length;
+                            }
+                        }
+                    }
+                }
+                return { keys, size };
+            }).sort((a, b) => a.size - b.size);
+            let matches = null;
+            for (const { keys, size } of lookups) {
+                if (matches !== null && size > matches.length) {
+                    break;
+                }
+                const hit = new Uint8Array(index.rows);
+                const found = [];
+                for (const key of keys) {
+                    let row = 0;
+                    for (const delta of index.postings[key]) {
+                        row += delta;
+                        if (!hit[row]) {
+                            hit[row] = 1;
+                            found.push(row);
+                        }
+                    }
+                }
+                matches = matches === null ? found : matches.filter(row => hit[row]);
+                if (matches.length === 0) {
+                    break;
+                }
+            }
+            if (matches === null) {
+                // No letters or digits (e.g. "-"): every row is a candidate
+                matches = Array.from({ length: index.rows }, (_, row) => row);
+            }
+            if (terms.length !== 1 || terms[0] !== phrase) {
+                matches = matches.filter(row => rowText(row).indexOf(phrase) > -1);
+            }
+            return matches.sort((a, b) => a - b);
+        }
+
+        // Table filtering (debounced so typing stays responsive)
+        function filterTable(tableId, searchId) {
+            clearTimeout(searchTimers[tableId]);
+            searchTimers[tableId] = setTimeout(() => applyFilter(tableId, searchId), SEARCH_DELAY_MS);
+        }
+
+        function resultRows(results) {
+            return results.map(r => [
+                r.ATHLETE,
+                r.EVENT,
+                r['Result (Seconds / Meters)'] ?? '',
+                r.MEET ?? '',
+                r.DATE ? formatDay(r.DATE) : ''
+            ]);
+        }
+
+        // Results are embedded column-wise: athlete/event/meet are ids into
+        // the name lists (-1 = no meet), result is the mark as entered (a
+        // number, or text such as "1:05.3") and day counts days since
+        // 1970-01-01 (null = meet date unknown)
+        function decodeResults(data) {
+            const athlete = Int32Array.from(data.athlete);
+            const event = Int32Array.from(data.event);
+            const meet = Int32Array.from(data.meet);
+            const results = new Array(athlete.length);
+            for (let i = 0; i < athlete.length; i++) {
+                const day = data.day[i];
+                let date = null;
+                if (day != null) {
+                    const utc = new Date(day * 86400000);
+                    date = new Date(utc.getUTCFullYear(), utc.getUTCMonth(), utc.getUTCDate());
+                }
+                results[i] = {
+                    ATHLETE: data.athletes[athlete[i]],
+                    EVENT: data.events[event[i]],
+                    MEET: meet[i] < 0 ? null : data.meets[meet[i]],
+                    'Result (Seconds / Meters)': data.result[i],
+                    DATE: date
+                };
+            }
+            return results;
+        }
+
+        // YYYY-MM-DD in local time
+        function formatDay(date) {
+            const pad = n => String(n).padStart(2, '0');
+            return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+        }
+
+        // Build-time search indexes per table (the sharded build fetches the
+        // results index together with the results)
+        const searchIndexes = """
+
+TABLE_ROWS_OPEN = """;
+
+        // Athlete and meet table rows (display text per cell)
+        const tableRows = {
+            athletesTable: """
+
+TABLE_ROWS_NEXT = """,
+            meetsTable: """
+
+TABLE_ROWS_CLOSE = """
+        };
+        setTableRows('athletesTable', tableRows.athletesTable, 'athleteSearch');
+        setTableRows('meetsTable', tableRows.meetsTable, 'meetSearch');
+"""
+
+# Single-file mode: every result and PR is embedded in the page
+INLINE_DATA_OPEN = """
+        // Store all results for the progression chart (newest first)
+        const allResults = decodeResults("""
+
+PR_INDEX_OPEN = """);
+
+        // Personal records, precomputed at build time:
+        // {athlete: [[event, result, meet, 'YYYY-MM-DD'], ...]} sorted by event
+        const prIndex = """
+
+PROGRESSION_OPEN_JS = """;
+
+        // Progression chart series per event, precomputed at build time:
+        // {event: {higher_is_better, meets: [name], series: {athlete: {day, y, best, season_best, meet}}}}
+        // (day counts days since 1970-01-01, meet is an id into meets)
+        const progressionIndex = """
+
+RANKINGS_OPEN_JS = """;
+
+        // Leaderboards (see render_rankings): the filters and the all-time
+        // boards, {filters: {seasons, genders, age_groups}, events: {event: {higher_is_better,
+        //  boards: {'All|All|All': [[rank, athlete, result, meet, 'YYYY-MM-DD'], ...]}}}},
+        // and what the other boards are worked out from: size (places per
+        // board), genders {athlete: id},
+        // season and age_group per result in allResults (ids into the filters,
+        // -1 = none) and the numeric mark of the results at value_row whose
+        // result is not that number (null = none)
+        const rankingIndex = """
+
+MEET_INDEX_OPEN_JS = """;
+
+        // Meet details, precomputed at build time (see meet_index): {meet: {date, season,
+        //  athletes, events, results, prs, first_marks, rows, flags}}; rows are positions
+        //  in allResults (by event, best mark first), flags 1 = PR, 2 = first mark in the event
+        const meetIndex = """
+
+INLINE_DATA_CLOSE = """;
+
+        // Data access (the sharded build fetches the same data on demand)
+        function getAthletePRs(athleteName) {
+            return Promise.resolve(prIndex[athleteName]);
+        }
+
+        function getProgression(eventName) {
+            return Promise.resolve(progressionIndex[eventName]);
+        }
+
+        const rankingFilters = rankingIndex.filters;
+        const rankingValues = new Map(rankingIndex.value_row.map((row, i) => [row, rankingIndex.value[i]]));
+        const rankingCache = {};
+
+        function getRankings(eventName) {
+            const rankings = rankingIndex.events[eventName];
+            if (rankings && !rankingCache[eventName]) {
+                rankingCache[eventName] = {
+                    higher_is_better: rankings.higher_is_better,
+                    boards: Object.assign(eventBoards(eventName, rankings.higher_is_better), rankings.boards)
+                };
+            }
+            return Promise.resolve(rankingCache[eventName]);
+        }
+
+        // Every board of an event, as compute_leaderboards has them: each
+        // athlete's best mark (ties go to the earliest date), equal marks
+        // sharing a rank, down to rankingIndex.size places
+        function eventBoards(eventName, higherIsBetter) {
+            const marks = [];
+            allResults.forEach((r, row) => {
+                const value = rankingValues.has(row) ? rankingValues.get(row) : r['Result (Seconds / Meters)'];
+                if (r.EVENT === eventName && typeof value === 'number') {
+                    const time = r.DATE ? r.DATE.getTime() : Infinity;
+                    marks.push({ row: row, score: higherIsBetter ? -value : value, time: time });
+                }
+            });
+            const order = (x, y) => x === y ? 0 : x < y ? -1 : 1;
+            marks.sort((a, b) => order(a.score, b.score) || order(a.time, b.time) || a.row - b.row);
+
+            const boards = {};
+            const places = {};
+            for (const mark of marks) {
+                const r = allResults[mark.row];
+                const labels = [
+                    rankingFilters.seasons[rankingIndex.season[mark.row]],
+                    rankingFilters.genders[rankingIndex.genders[r.ATHLETE]],
+                    rankingFilters.age_groups[rankingIndex.age_group[mark.row]]
+                ];
+                // Unknown season/gender/age only count towards the All boards
+                for (let rollup = 0; rollup < 8; rollup++) {
+                    const key = labels.map((label, i) => rollup & (4 >> i) ? 'All' : label);
+                    if (key.includes(undefined)) {
+                        continue;
+                    }
+                    const name = key.join('|');
+                    const board = places[name] || (places[name] = { athletes: new Set(), rank: 0, score: null });
+                    if (board.athletes.has(r.ATHLETE)) {
+                        continue;
+                    }
+                    board.athletes.add(r.ATHLETE);
+                    if (mark.score !== board.score) {
+                        board.rank = board.athletes.size;
+                        board.score = mark.score;
+                    }
+                    if (board.rank <= rankingIndex.size) {
+                        (boards[name] || (boards[name] = [])).push([
+                            board.rank, r.ATHLETE, r['Result (Seconds / Meters)'], r.MEET,
+                            r.DATE ? formatDay(r.DATE) : null
+                        ]);
+                    }
+                }
+            }
+            return boards;
+        }
+
+        function getMeet(meetName) {
+            const meet = meetIndex[meetName];
+            if (!meet) {
+                return Promise.resolve(undefined);
+            }
+            const entries = meet.rows.map((row, i) => {
+                const r = allResults[row];
+                return [r.EVENT, r.ATHLETE, r['Result (Seconds / Meters)'] ?? '', meet.flags[i]];
+            });
+            return Promise.resolve(Object.assign({ entries: entries }, meet));
+        }
+
+        let resultsTableLoaded = false;
+
+        function ensureResultsTable() {
+            if (!resultsTableLoaded) {
+                resultsTableLoaded = true;
+                setTableRows('resultsTable', resultRows(allResults), 'resultSearch');
+            }
+        }
+"""
+
+# Sharded mode: the page only carries the shard manifest
+SHARDED_DATA_OPEN = """
+        // Data shards, fetched when a tab needs them:
+        // {results: path, search: path, athletes: {athlete: path}, events: {event: path},
+        //  rankings: {filters, events: {event: path}}, meets: {meet: path}}
+        const shardManifest = """
+
+SHARDED_DATA_CLOSE = """;
+        const shardRequests = {};
+
+        function fetchShard(path) {
+            if (!shardRequests[path]) {
+                shardRequests[path] = fetch(path).then(response => {
+                    if (!response.ok) {
+                        throw new Error(`Could not load ${path} (${response.status})`);
+                    }
+                    return response.json();
+                });
+            }
+            return shardRequests[path];
+        }
+
+        // Athlete shards: {athlete, prs: [[event, result, meet, 'YYYY-MM-DD'], ...]}
+        function getAthletePRs(athleteName) {
+            const path = shardManifest.athletes[athleteName];
+            return path ? fetchShard(path).then(shard => shard.prs) : Promise.resolve(undefined);
+        }
+
+        // Event shards hold that event's progression series (see progressionIndex
+        // in the single-file build)
+        function getProgression(eventName) {
+            const path = shardManifest.events[eventName];
+            return path ? fetchShard(path) : Promise.resolve(undefined);
+        }
+
+        // Ranking shards hold that event's leaderboards (see rankingIndex in
+        // the single-file build); the filters come with the manifest
+        const rankingFilters = shardManifest.rankings.filters;
+
+        function getRankings(eventName) {
+            const path = shardManifest.rankings.events[eventName];
+            return path ? fetchShard(path) : Promise.resolve(undefined);
+        }
+
+        // Meet shards hold that meet's details (see meetIndex in the single-file
+        // build), with entries: [[event, athlete, result, flag], ...]
+        function getMeet(meetName) {
+            const path = shardManifest.meets[meetName];
+            return path ? fetchShard(path) : Promise.resolve(undefined);
+        }
+
+        let resultsTableLoaded = false;
+
+        function ensureResultsTable() {
+            if (resultsTableLoaded) {
+                return;
+            }
+            resultsTableLoaded = true;
+            const tbody = document.querySelector('#resultsTable tbody');
+            tbody.innerHTML = '<tr><td colspan="5">Loading results...</td></tr>';
+            Promise.all([
+                fetchShard(shardManifest.results).then(decodeResults),
+                fetchShard(shardManifest.search)
+            ]).then(([results, index]) => {
+                searchIndexes.resultsTable = index;
+                setTableRows('resultsTable', resultRows(results), 'resultSearch');
+            }).catch(err => {
+                resultsTableLoaded = false;
+                tbody.innerHTML = `<tr><td colspan="5">${escapeHtml(err.message)}</td></tr>`;
+            });
+        }
+"""
+
+SCRIPT_CLOSE = """
+
+        // Show PRs for selected athlete
+        async function showPRs() {
+            const athleteName = document.getElementById('prAthlete').value;
+            const prTableDiv = document.getElementById('prTable');
+
+            if (!athleteName) {
+                prTableDiv.innerHTML = '';
+                return;
+            }
+
+            const prs = await getAthletePRs(athleteName);
+
+            // Ignore the response if the selection changed while loading
+            if (document.getElementById('prAthlete').value !== athleteName) {
+                return;
+            }
+
+            if (!prs || prs.length === 0) {
+                prTableDiv.innerHTML = '<p style="color: #999; margin-top: 20px;">No results found for this athlete.</p>';
+                return;
+            }
+
+            // Build PR table
+            let html = '<table style="margin-top: 20px;"><thead><tr><th>Event</th><th>PR</th><th>Meet</th><th>Date</th></tr></thead><tbody>';
+            prs.forEach(([event, result, meet, day]) => {
+                const date = day ? new Date(day + 'T00:00:00').toLocaleDateString() : 'N/A';
+                html += `<tr>
+                    <td>${escapeHtml(event)}</td>
+                    <td><span class="pr-badge">${escapeHtml(result)}</span></td>
+                    <td>${escapeHtml(meet)}</td>
+                    <td>${date}</td>
+                </tr>`;
+            });
+            html += '</tbody></table>';
+            prTableDiv.innerHTML = html;
+        }
+
+        // Format seconds as MM:SS.xx
+        function formatTime(seconds) {
+            const mins = Math.floor(seconds / 60);
+            const secs = (seconds % 60).toFixed(2);
+            return mins > 0 ? `${mins}:${secs.padStart(5, '0')}` : `${secs}s`;
+        }
+
+        // MM:SS tick labels for times over a minute, worked out before plotting
+        function timeTicks(traces) {
+            let min = Infinity;
+            let max = -Infinity;
+            traces.forEach(trace => trace.y.forEach(v => {
+                min = Math.min(min, v);
+                max = Math.max(max, v);
+            }));
+            if (!(max >= 60)) {
+                return {};
+            }
+            const steps = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600];
+            const step = steps.find(s => (max - min) / s <= 8) || 3600;
+            const tickvals = [];
+            for (let v = Math.floor(min / step) * step; v <= max + step; v += step) {
+                tickvals.push(v);
+            }
+            return { tickvals: tickvals, ticktext: tickvals.map(formatTime) };
+        }
+
+        // Progression chart: series are precomputed, so this only picks and labels them
+        async function updateProgression() {
+            const event = document.getElementById('progressionEvent').value;
+            const athleteSelect = document.getElementById('progressionAthletes');
+            const selectedAthletes = Array.from(athleteSelect.selectedOptions).map(opt => opt.value);
+
+            if (!event || selectedAthletes.length === 0) {
+                document.getElementById('progressionChart').innerHTML = '<p style="color: #999; padding: 40px; text-align: center;">Select an event and at least one athlete to view progression</p>';
+                return;
+            }
+
+            const progression = await getProgression(event);
+            const athletes = selectedAthletes.filter(athlete => progression && progression.series[athlete]);
+
+            if (athletes.length === 0) {
+                // More detailed error message
+                const athletePRs = await Promise.all(selectedAthletes.map(getAthletePRs));
+                const uniqueEvents = [...new Set(athletePRs.flatMap(prs => (prs || []).map(pr => String(pr[0]))))];
+                document.getElementById('progressionChart').innerHTML =
+                    `<p style="color: #999; padding: 40px; text-align: center;">
+                        No results found for ${escapeHtml(event)} with selected athletes.<br>
+                        <small>Available events for selected athletes: ${escapeHtml(uniqueEvents.join(', '))}</small>
+                    </p>`;
+                return;
+            }
+
+            // Each athlete gets their results plus PR-to-date and season-best steps
+            const formatMark = progression.higher_is_better ? v => `${v.toFixed(2)} m` : formatTime;
+            const traces = [];
+            athletes.forEach(athlete => {
+                const series = progression.series[athlete];
+                const x = series.day.map(day => day * 86400000);
+                traces.push({
+                    x: x,
+                    y: series.y,
+                    mode: 'lines+markers',
+                    name: athlete,
+                    legendgroup: athlete,
+                    type: 'scatter',
+                    text: series.meet.map(id => id < 0 ? '' : progression.meets[id]),
+                    customdata: series.y.map(formatMark),
+                    hovertemplate: '<b>%{text}</b><br>Date: %{x|%Y-%m-%d}<br>Result: %{customdata}<extra></extra>'
+                });
+                traces.push({
+                    x: x,
+                    y: series.best,
+                    mode: 'lines',
+                    line: { shape: 'hv', dash: 'dash', width: 1 },
+                    name: athlete + ' PR',
+                    legendgroup: athlete,
+                    type: 'scatter',
+                    hoverinfo: 'skip'
+                });
+                traces.push({
+                    x: x,
+                    y: series.season_best,
+                    mode: 'lines',
+                    line: { shape: 'hv', dash: 'dot', width: 1 },
+                    name: athlete + ' season best',
+                    legendgroup: athlete,
+                    type: 'scatter',
+                    hoverinfo: 'skip',
+                    visible: 'legendonly'
+                });
+            });
+
+            const yaxis = {
+                title: 'Performance',
+                autorange: progression.higher_is_better ? true : 'reversed'  // Lower is better for time events
+            };
+            if (!progression.higher_is_better) {
+                Object.assign(yaxis, timeTicks(traces.filter((trace, i) => i % 3 === 0)));
+            }
+
+            const layout = {
+                title: event + ' Progression',
+                xaxis: { title: 'Date', type: 'date' },  // x is milliseconds since 1970 (UTC)
+                yaxis: yaxis,
+                hovermode: 'closest',
+                showlegend: true,
+                plot_bgcolor: '#f8f9fa',
+                paper_bgcolor: 'white'
+            };
+
+            const config = {
+                responsive: true,
+                displayModeBar: true
+            };
+
+            Plotly.newPlot('progressionChart', traces, layout, config);
+        }
+
+        // Rankings: the boards are precomputed, so this only picks one and lists it
+        function fillRankingFilters() {
+            const fill = (id, all, values) => {
+                document.getElementById(id).innerHTML = [['All', all], ...values.map(v => [v, v])]
+                    .map(([value, text]) => `<option value="${escapeHtml(value)}">${escapeHtml(text)}</option>`)
+                    .join('');
+            };
+            fill('rankingSeason', 'All-time', rankingFilters.seasons);
+            fill('rankingGender', 'All genders', rankingFilters.genders);
+            fill('rankingAgeGroup', 'All ages', rankingFilters.age_groups);
+            // Newest season first
+            if (rankingFilters.seasons.length > 0) {
+                document.getElementById('rankingSeason').value = rankingFilters.seasons[0];
+            }
+        }
+
+        async function showRankings() {
+            const event = document.getElementById('rankingEvent').value;
+            const key = ['rankingSeason', 'rankingGender', 'rankingAgeGroup']
+                .map(id => document.getElementById(id).value).join('|');
+            const rankingTableDiv = document.getElementById('rankingTable');
+
+            if (!event) {
+                rankingTableDiv.innerHTML = '';
+                return;
+            }
+
+            const rankings = await getRankings(event);
+
+            // Ignore the response if the selection changed while loading
+            if (document.getElementById('rankingEvent').value !== event) {
+                return;
+            }
+
+            const board = rankings && rankings.boards[key];
+            if (!board) {
+                rankingTableDiv.innerHTML = '<p style="color: #999; margin-top: 20px;">No results for this selection.</p>';
+                return;
+            }
+
+            let html = '<table><thead><tr><th>#</th><th>Athlete</th><th>Mark</th><th>Meet</th><th>Date</th></tr></thead><tbody>';
+            board.forEach(([rank, athlete, result, meet, day]) => {
+                const date = day ? new Date(day + 'T00:00:00').toLocaleDateString() : 'N/A';
+                html += `<tr>
+                    <td>${rank}</td>
+                    <td>${escapeHtml(athlete)}</td>
+                    <td><span class="pr-badge">${escapeHtml(result)}</span></td>
+                    <td>${escapeHtml(meet)}</td>
+                    <td>${date}</td>
+                </tr>`;
+            });
+            html += '</tbody></table>';
+            rankingTableDiv.innerHTML = html;
+        }
+
+        // Meet details: the counts and PR flags are precomputed, so this only lists them
+        async function showMeet(meetName) {
+            const meetDetailDiv = document.getElementById('meetDetail');
+            meetDetailDiv.dataset.meet = meetName;
+            const meet = await getMeet(meetName);
+
+            // Ignore the response if another meet was clicked while loading
+            if (meetDetailDiv.dataset.meet !== meetName) {
+                return;
+            }
+
+            if (!meet) {
+                meetDetailDiv.innerHTML = `<p style="color: #999; margin-top: 20px;">No results recorded for ${escapeHtml(meetName)}.</p>`;
+                return;
+            }
+
+            let html = `<h2 style="margin-top: 30px;">${escapeHtml(meetName)}</h2>
+                <p style="color: #666;">${escapeHtml(meet.date)} ${escapeHtml(meet.season)}: ${meet.athletes} athletes,
+                    ${meet.events} events, ${meet.results} results, ${meet.prs} PRs, ${meet.first_marks} first marks</p>`;
+            html += '<table><thead><tr><th>Event</th><th>Athlete</th><th>Result</th><th></th></tr></thead><tbody>';
+            meet.entries.forEach(([event, athlete, result, flag]) => {
+                const badge = flag === 1 ? '<span class="pr-badge">PR</span>' : flag === 2 ? 'First mark' : '';
+                html += `<tr>
+                    <td>${escapeHtml(event)}</td>
+                    <td>${escapeHtml(athlete)}</td>
+                    <td>${escapeHtml(result)}</td>
+                    <td>${badge}</td>
+                </tr>`;
+            });
+            html += '</tbody></table>';
+            meetDetailDiv.innerHTML = html;
+            meetDetailDiv.scrollIntoView({ behavior: 'smooth' });
+        }
+
+        document.querySelector('#meetsTable tbody').addEventListener('click', e => {
+            const row = e.target.closest('tr');
+            if (row && row.cells.length > 1) {
+                showMeet(row.cells[0].textContent);
+            }
+        });
+
+        fillRankingFilters();
+    </script>
+</body>
+</html>
+"""
+
+# App mode: the page only carries the shard manifest; the script is a static
+# asset (see app_script) that is the sharded build's script plus APP_BOOT_JS
+APP_DATA_OPEN = """
+    <script>
+        // Data shards (see SHARDED_DATA_OPEN); tables holds the athlete and
+        // meet rows and their search indexes
+        const shardManifest = """
+
+APP_DATA_CLOSE = """;
+    </script>
+    <script src="%s"></script>
+</body>
+</html>
+"""
+
+APP_BOOT_JS = """
+        // Athlete and meet tables come from a shard as well
+        fetchShard(shardManifest.tables).then(shard => {
+            Object.assign(searchIndexes, shard.search);
+            setTableRows('athletesTable', shard.athletesTable, 'athleteSearch');
+            setTableRows('meetsTable', shard.meetsTable, 'meetSearch');
+        });
+
+        // Keep the page, its assets and data for repeat and offline visits
+        if ('serviceWorker' in navigator && location.protocol !== 'file:') {
+            navigator.serviceWorker.register('%s');
+        }
+"""
+
+# Service worker of the app mode. Assets and shards have content-hashed names
+# and never change, so they (and the Plotly script) are served from the cache;
+# the page and the manifest are fetched first and only come from the cache
+# when offline. Other requests are left to the browser. A new
+# build changes BUILD, which makes the browser install the new worker: it
+# downloads the files the cache does not have yet and drops the ones the new
+# build no longer uses.
+SERVICE_WORKER_JS = """// Written by generate_dashboard.py
+const BUILD = '%s';
+const CACHE = 'waza-dashboard';
+const PAGES = %s;
+const ASSETS = %s;
+const MANIFEST = '%s';
+const STATIC_FOLDERS = %s;
+
+function manifestPaths(manifest) {
+    return [manifest.results, manifest.search, manifest.tables,
+            ...Object.values(manifest.athletes), ...Object.values(manifest.events),
+            ...Object.values(manifest.rankings ? manifest.rankings.events : {}),
+            ...Object.values(manifest.meets || {})];
+}
+
+function absolute(path) {
+    return new URL(path, self.location).href;
+}
+
+async function wantedUrls(cache) {
+    const response = await cache.match(absolute(MANIFEST));
+    const manifest = response ? await response.json() : { athletes: {}, events: {} };
+    return new Set([...PAGES, ...ASSETS, MANIFEST, ...manifestPaths(manifest)]
+        .filter(path => path).map(absolute));
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE);
+        // The page and manifest change with every build. Only the shell is
+        // precached; shards are cached as the page fetches them
+        await cache.addAll([...PAGES, MANIFEST].map(path => new Request(path, { cache: 'no-cache' })));
+        const have = new Set((await cache.keys()).map(request => request.url));
+        await cache.addAll(ASSETS.map(absolute).filter(url => !have.has(url)));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE);
+        const wanted = await wantedUrls(cache);
+        for (const request of await cache.keys()) {
+            // Other origins (the Plotly CDN) are kept
+            if (new URL(request.url).origin === self.location.origin && !wanted.has(request.url)) {
+                await cache.delete(request);
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+    const url = new URL(request.url);
+    const networkFirst = request.mode === 'navigate' || url.href === absolute(MANIFEST);
+    const cacheFirst = url.origin !== self.location.origin
+        || STATIC_FOLDERS.some(folder => url.href.startsWith(absolute(folder)));
+    if (!networkFirst && !cacheFirst) {
+        return;
+    }
+    event.respondWith((async () => {
+        const cache = await caches.open(CACHE);
+        if (!networkFirst) {
+            const hit = await cache.match(request);
+            if (hit) {
+                return hit;
+            }
+        }
+        try {
+            const response = await fetch(request);
+            if (response.ok || response.type === 'opaque') {
+                await cache.put(request, response.clone());
+            }
+            return response;
+        } catch (err) {
+            const hit = await cache.match(request, { ignoreSearch: true });
+            if (hit) {
+                return hit;
+            }
+            throw err;
+        }
+    })());
+});
+"""
+
+# Athlete profile pages (and their index page): static HTML with no script;
+# the progression charts are inline SVG drawn at build time
+ATHLETE_PAGE = string.Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title - WAZA Track Club</title>
+    <style>
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
+            background: #f4f5fb;
+            color: #333;
+            padding: 20px;
+        }
+        .container {
+            max-width: 960px;
+            margin: 0 auto;
+        }
+        nav a {
+            color: #667eea;
+        }
+        h1 {
+            margin: 15px 0 5px;
+        }
+        .details {
+            color: #666;
+            margin-bottom: 20px;
+        }
+        .section {
+            background: white;
+            padding: 20px;
+            border-radius: 10px;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            margin-bottom: 20px;
+            overflow-x: auto;
+        }
+        h2 {
+            margin-bottom: 15px;
+            padding-bottom: 8px;
+            border-bottom: 2px solid #667eea;
+            font-size: 1.3rem;
+        }
+        h3 {
+            font-size: 1rem;
+            margin: 15px 0 5px;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+        }
+        th {
+            background: #667eea;
+            color: white;
+            padding: 8px;
+            text-align: left;
+            font-weight: 600;
+        }
+        td {
+            padding: 8px;
+            border-bottom: 1px solid #eee;
+        }
+        svg {
+            width: 100%;
+            height: auto;
+        }
+        .marks {
+            fill: none;
+            stroke: #667eea;
+            stroke-width: 1.5;
+        }
+        .best {
+            fill: none;
+            stroke: #d4a000;
+            stroke-width: 2;
+        }
+        .mark {
+            fill: #667eea;
+        }
+        .axis {
+            font-size: 11px;
+            fill: #666;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <nav><a href="$dashboard">&larr; Results dashboard</a> &middot; <a href="index.html">All athletes</a></nav>
+        <h1>$title</h1>
+        <p class="details">$details</p>
+$sections    </div>
+</body>
+</html>
+""")
@@ -0,0 +1,283 @@
+"""
+Watch mode: rebuild when a workbook is saved and preview with live reload
+
+generate_dashboard.watch() builds once and hands watch_and_serve() a rebuild
+function; this module only watches the input directories (inotify on Linux,
+polling elsewhere) and serves the output folder, adding a script to each
+page that reloads it after a rebuild.
+"""
+import ctypes
+import ctypes.util
+import functools
+import http.server
+import os
+import select
+import sqlite3
+import struct
+import threading
+import time
+import urllib.parse
+import zipfile
+from datetime import datetime
+
+# Quiet time after the last write to a workbook before rebuilding (Excel and
+# OneDrive write a file several times per save)
+WATCH_DEBOUNCE_SECONDS = 0.5
+WATCH_POLL_SECONDS = 0.5
+
+# Added to pages served by the preview server (never to the built files)
+LIVE_RELOAD_SCRIPT = """    <script>
+        // --watch preview: reload when a newer build is ready
+        (function () {
+            const build = %d;
+            const source = new EventSource('/__livereload');
+            source.onmessage = e => {
+                if (Number(e.data) > build) {
+                    source.close();
+                    location.reload();
+                }
+            };
+            fetch('/__livereload/loaded?build=' + build);
+        })();
+    </script>
+"""
+
+
+class InotifyWatcher:
+    """Files created, written, moved or deleted in some directories (Linux inotify via ctypes)"""
+    kind = "inotify"
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x2 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+    # Sent with wd -1 when the kernel's event queue filled up and events were lost
+    IN_Q_OVERFLOW = 0x4000
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+            self.directories[wd] = directory
+
+    def changes(self, timeout=None):
+        """Paths changed within timeout seconds (None waits for the next change)"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            # struct inotify_event: wd, mask, cookie, len, then the name
+            wd, mask, _, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0')
+            if mask & self.IN_Q_OVERFLOW:
+                # Some changes are unknown: report every file, so the rebuild
+                # re-checks all of them
+                paths.update(self._files())
+            elif wd in self.directories:
+                paths.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+            offset += 16 + length
+        return paths
+
+    def _files(self):
+        return {entry.path for directory in self.directories.values()
+                for entry in os.scandir(directory) if entry.is_file()}
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Same as InotifyWatcher for systems without inotify, by polling file sizes and mtimes"""
+    kind = "polling"
+
+    def __init__(self, directories):
+        self.directories = directories
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        files = {}
+        for directory in self.directories:
+            for entry in os.scandir(directory):
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def changes(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(WATCH_POLL_SECONDS if timeout is None else min(WATCH_POLL_SECONDS, timeout))
+            current = self._scan()
+            changed = {path for path in current.keys() | self.snapshot.keys()
+                       if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(directories):
+    try:
+        return InotifyWatcher(directories)
+    except (OSError, AttributeError):
+        # No inotify (macOS, Windows) or no watches left
+        return PollingWatcher(directories)
+
+
+class LiveReloadHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the output folder; pages get LIVE_RELOAD_SCRIPT added"""
+
+    def log_message(self, format, *args):
+        # Keep the console for build output
+        pass
+
+    def do_GET(self):
+        preview = self.server.preview
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/__livereload':
+            preview.stream_builds(self)
+        elif url.path == '/__livereload/loaded':
+            preview.page_loaded(urllib.parse.parse_qs(url.query).get('build', ['0'])[0])
+            self.send_response(204)
+            self.end_headers()
+        elif url.path.endswith('/') or url.path.endswith('.html'):
+            self.send_page()
+        else:
+            super().do_GET()
+
+    def send_page(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        try:
+            with open(path, 'rb') as f:
+                page = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        script = (LIVE_RELOAD_SCRIPT % self.server.preview.build).encode('utf-8')
+        end = page.rfind(b'</body>')
+        page = page[:end] + script + page[end:] if end >= 0 else page + script
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(page)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(page)
+
+
+class PreviewServer:
+    """Local HTTP server for watch mode; open pages reload after each rebuild"""
+
+    def __init__(self, directory, port):
+        self.build = 0
+        self.saved_at = {}
+        self.condition = threading.Condition()
+        handler = functools.partial(LiveReloadHandler, directory=directory)
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.preview = self
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reload(self, saved_at):
+        """Tell open pages a new build is ready; saved_at is when the save was seen"""
+        with self.condition:
+            self.build += 1
+            self.saved_at[self.build] = saved_at
+            self.condition.notify_all()
+
+    def page_loaded(self, build):
+        saved_at = self.saved_at.pop(int(build), None) if build.isdigit() else None
+        if saved_at is not None:
+            print(f"  Page refreshed {time.time() - saved_at:.2f}s after the save")
+
+    def stream_builds(self, request):
+        """Server-sent events: the current build number, then each new one"""
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/event-stream')
+        request.send_header('Cache-Control', 'no-cache')
+        request.end_headers()
+        sent = None
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda sent=sent: self.build != sent, timeout=15)
+                    build = self.build
+                # A comment line keeps idle connections open
+                message = f"data: {build}\n\n" if build != sent else ": ping\n\n"
+                request.wfile.write(message.encode('utf-8'))
+                request.wfile.flush()
+                sent = build
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _watched_directories(inputs):
+    return sorted({os.path.abspath(path) if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+                   for path in inputs})
+
+
+def _is_input(path, inputs):
+    """True if path is one of the input workbooks or a workbook in an input directory"""
+    name = os.path.basename(path)
+    for item in inputs:
+        if os.path.isdir(item):
+            if (os.path.dirname(path) == os.path.abspath(item) and name.lower().endswith('.xlsx')
+                    and not name.startswith('~$')):
+                return True
+        elif path == os.path.abspath(item):
+            return True
+    return False
+
+
+def watch_and_serve(inputs, output_file, rebuild, port=8000):
+    """
+    Serve the folder of output_file with live reload and call rebuild()
+    after every save of a workbook in inputs; runs until Ctrl+C.
+
+    inputs is a list of workbooks and/or directories of workbooks. rebuild()
+    returns False if it found nothing to rebuild; open pages reload after
+    every other rebuild.
+    """
+    preview = PreviewServer(os.path.dirname(os.path.abspath(output_file)), port)
+    directories = _watched_directories(inputs)
+    watcher = make_watcher(directories)
+    print(f"\nPreview: http://localhost:{port}/{os.path.basename(output_file)} (reloads after each rebuild)")
+    print(f"Watching {', '.join(directories)} ({watcher.kind}) - press Ctrl+C to stop")
+    try:
+        while True:
+            if not any(_is_input(path, inputs) for path in watcher.changes()):
+                continue
+            saved_at = time.time()
+            while watcher.changes(WATCH_DEBOUNCE_SECONDS):
+                pass
+
+            print(f"\n[{datetime.now():%H:%M:%S}] Workbook saved, rebuilding...")
+            start = time.perf_counter()
+            try:
+                rebuilt = rebuild()
+            except (zipfile.BadZipFile, OSError, ValueError, KeyError, sqlite3.Error) as err:
+                # e.g. a half-written or locked workbook; the next save retries
+                print(f"Rebuild failed: {err}")
+                continue
+            if rebuilt:
+                preview.reload(saved_at)
+                print(f"Rebuilt in {time.perf_counter() - start:.2f}s "
+                      f"({time.time() - saved_at:.2f}s after the save)")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+        preview.close()